@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+run_bench.py — throughput benchmarks for the Python hot paths, with JSON baselines.
+
+Each benchmark builds its input once, then times the hot path over several
+rounds (pytest-benchmark style: the best round sets the rate, median and
+stddev are reported alongside). Inputs are synthetic and seeded, so numbers
+are comparable run to run on the same machine.
+
+  parse_3006           charger_ctl.parse_3006, frames/s
+  parse_3006_batch     charger_ctl.parse_3006_batch (numpy), frames/s
+  encode_cmd06         r4830_command_tool.encode_cmd06, ops/s
+  decode_cmd06         r4830_command_tool.decode_cmd06, ops/s
+  btsnoop_extract_NMB  btsnoop_ble_extract mmap engine + JSONL encoding, MB/s
+                       (synthetic btsnoop file of N MB; --btsnoop-mb 10 100 1000)
+  rx_diff_load         rx_diff two-run collect over 100k events, events/s
+  rx_diff_batch_load   rx_diff batch loader over 100k events, events/s
+  jsonl_writer         two_run_rx_capture._JsonlWriter put() -> close(), events/s
+                       (also reports the writer's late / dropped counts)
+  append_jsonl         old per-event _append_jsonl, events/s (reference only)
+
+Baselines:
+  python3 bench/run_bench.py --save laptop            # -> bench/baselines/laptop.json
+  python3 bench/run_bench.py --compare laptop         # run, then flag >10% slowdowns (exit 1)
+  python3 bench/run_bench.py --compare laptop --current new.json --threshold 5
+  python3 bench/run_bench.py --only parse_3006 cmd06 --rounds 10
+
+Baselines are per machine: compare runs from the same box (the file records
+platform, Python and numpy/orjson versions so mismatches are visible).
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import fnmatch
+import gc
+import json
+import os
+import pathlib
+import platform
+import random
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+_REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+for _p in (_REPO_ROOT, _REPO_ROOT / "controller" / "backend", _REPO_ROOT / "swift" / "scripts"):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
+
+import btsnoop_ble_extract  # noqa: E402
+import capture_loader  # noqa: E402
+import charger_ctl  # noqa: E402
+import charger_sim  # noqa: E402
+import r4830_command_tool  # noqa: E402
+import rx_diff  # noqa: E402
+import two_run_rx_capture  # noqa: E402
+
+BASELINE_DIR = _REPO_ROOT / "bench" / "baselines"
+DEFAULT_THRESHOLD_PCT = 10.0
+RX_DIFF_EVENTS = 100_000
+
+
+@dataclass
+class Result:
+    name: str
+    unit: str
+    rate: float          # units per second, best round
+    median_rate: float
+    best_s: float
+    median_s: float
+    stddev_s: float
+    rounds: int
+    items: int           # units processed per round
+    counters: Dict[str, float] = field(default_factory=dict)  # side counts from the last round
+
+
+# A benchmark factory gets the parsed args and returns (unit, items per round, timed callable),
+# optionally followed by a dict the callable fills with counters to report, or None when it
+# can't run here (e.g. numpy missing).
+Setup = Callable[[argparse.Namespace], Optional[tuple]]
+BENCHMARKS: Dict[str, Setup] = {}
+
+
+def bench(name: str):
+    def register(fn: Setup) -> Setup:
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def time_rounds(fn: Callable[[], None], rounds: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(rounds):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+# --- synthetic inputs ---
+
+def telemetry_frames(n: int, seed: int = 1) -> List[bytes]:
+    sim = charger_sim.SimCharger(seed=seed)
+    sim.apply_cmd06(0x0C, struct.pack("<I", 1))  # output on, so every field moves
+    return [sim.telemetry() for _ in range(n)]
+
+
+def capture_events(n: int, seed: int = 2) -> List[dict]:
+    """A two_run_rx_capture-shaped session: keepalive/poll TX, 3006/6905/ack RX and markers."""
+    rng = random.Random(seed)
+    sim = charger_sim.SimCharger(seed=seed)
+    sim.apply_cmd06(0x0C, struct.pack("<I", 1))
+    keepalive = charger_ctl.KEEPALIVE
+    polls = [bytes.fromhex(h) for h in ("020101", "020404", "020505")]
+    events: List[dict] = [{"event": "run_start", "run": "run1", "ts": "2026-01-01T00:00:00"}]
+    i = 0
+    while len(events) < n - 1:
+        run = "run1" if len(events) < n // 2 else "run2"
+        if run == "run2" and events[-1].get("run") == "run1":
+            events.append({"event": "run_start", "run": "run2", "ts": "2026-01-01T00:10:00"})
+        i += 1
+        r = rng.random()
+        if r < 0.35:
+            evt = two_run_rx_capture._json_event(direction="TX", payload=keepalive, run_tag=run, note="keepalive")
+        elif r < 0.45:
+            evt = two_run_rx_capture._json_event(direction="TX", payload=polls[i % 3], run_tag=run, note="poll")
+        elif r < 0.80:
+            evt = two_run_rx_capture._json_event(direction="RX", payload=sim.telemetry(), run_tag=run, note=f"rx:{i}")
+        elif r < 0.90:
+            if rng.random() < 0.1:
+                sim.apply_cmd06(0x08, struct.pack("<f", rng.choice((1.0, 2.0, 5.0))))
+            evt = two_run_rx_capture._json_event(direction="RX", payload=sim.frame("settings"), run_tag=run, note=f"rx:{i}")
+        else:
+            evt = two_run_rx_capture._json_event(direction="RX", payload=charger_sim.ack_frame(0x08), run_tag=run, note=f"rx:{i}")
+        events.append(evt)
+    events.append({"event": "change_note", "run": "between", "note": "bench", "ts": "2026-01-01T00:20:00"})
+    return events
+
+
+def write_btsnoop(path: pathlib.Path, size_mb: int, seed: int = 3):
+    """Android-style btsnoop (H4, datalink 1002) of ATT traffic: keepalive writes,
+    3006 notifications, 6905 notifications split over three ACL fragments, and
+    HCI events in between. A ~1 MiB block is built once and repeated."""
+    rng = random.Random(seed)
+    sim = charger_sim.SimCharger(seed=seed)
+    rec = btsnoop_ble_extract.RECORD_HDR
+    acl_handle = 0x0040
+
+    def record(ts: int, flags: int, data: bytes) -> bytes:
+        return rec.pack(len(data), len(data), flags, 0, ts) + data
+
+    def acl(pb: int, payload: bytes) -> bytes:
+        return b"\x02" + struct.pack("<HH", acl_handle | (pb << 12), len(payload)) + payload
+
+    def att(op: int, handle: int, value: bytes) -> bytes:
+        body = bytes([op]) + struct.pack("<H", handle) + value
+        return struct.pack("<HH", len(body), btsnoop_ble_extract.ATT_CID) + body
+
+    block = bytearray()
+    ts = 0x00E0_3000_0000_0000
+    while len(block) < (1 << 20):
+        ts += rng.randint(2_000, 60_000)
+        r = rng.random()
+        if r < 0.3:
+            block += record(ts, 0, acl(0b00, att(0x52, 0x0006, charger_ctl.KEEPALIVE)))
+        elif r < 0.7:
+            block += record(ts, 1, acl(0b10, att(0x1B, 0x0025, sim.telemetry())))
+        elif r < 0.85:
+            frame = att(0x1B, 0x0025, sim.frame("settings"))
+            for k, start in enumerate(range(0, len(frame), 40)):
+                block += record(ts + k, 1, acl(0b10 if k == 0 else 0b01, frame[start:start + 40]))
+        else:
+            block += record(ts, 1, b"\x04\x13\x05\x01\x40\x00\x01\x00")  # Number Of Completed Packets
+    target = size_mb << 20
+    with open(path, "wb") as f:
+        f.write(btsnoop_ble_extract.BTSNOOP_MAGIC + struct.pack(">II", 1, 1002))
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def _work_dir(args) -> pathlib.Path:
+    path = pathlib.Path(args.work_dir) if args.work_dir else pathlib.Path(tempfile.gettempdir()) / "r4830_bench"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# --- benchmarks ---
+
+@bench("parse_3006")
+def _parse_3006(args):
+    frames = telemetry_frames(args.frames)
+    parse = charger_ctl.parse_3006
+
+    def run():
+        for f in frames:
+            parse(f)
+    return "frames/s", len(frames), run
+
+
+@bench("parse_3006_batch")
+def _parse_3006_batch(args):
+    if charger_ctl.np is None:
+        return None
+    frames = telemetry_frames(args.frames)
+    return "frames/s", len(frames), lambda: charger_ctl.parse_3006_batch(frames)
+
+
+@bench("encode_cmd06")
+def _encode_cmd06(args):
+    rng = random.Random(4)
+    cmd_ids = [0x07, 0x08, 0x15, 0x21, 0x22, 0x26, 0x27]
+    ops = [(rng.choice(cmd_ids), struct.pack("<f", rng.uniform(0, 200))) for _ in range(args.ops)]
+    encode = r4830_command_tool.encode_cmd06
+
+    def run():
+        for cmd_id, value in ops:
+            encode(cmd_id, value)
+    return "ops/s", len(ops), run
+
+
+@bench("decode_cmd06")
+def _decode_cmd06(args):
+    rng = random.Random(5)
+    encode = r4830_command_tool.encode_cmd06
+    payloads = [encode(0x08, struct.pack("<f", rng.uniform(0, 20))).hex() for _ in range(args.ops)]
+    decode = r4830_command_tool.decode_cmd06
+
+    def run():
+        for p in payloads:
+            decode(p)
+    return "ops/s", len(payloads), run
+
+
+def _btsnoop_bench(size_mb: int):
+    def setup(args):
+        path = _work_dir(args) / f"synthetic_{size_mb}MB.btsnoop"
+        if not path.exists() or path.stat().st_size < (size_mb << 20):
+            print(f"  generating {path} ...", file=sys.stderr)
+            write_btsnoop(path, size_mb)
+        size = path.stat().st_size
+        dumps = json.dumps
+
+        def run():
+            reassembler = btsnoop_ble_extract.L2capReassembler()
+            for event in btsnoop_ble_extract.iter_events_mmap(str(path), reassembler):
+                dumps(event)
+        # items are bytes, reported as MB/s
+        return "MB/s", size, run
+    return setup
+
+
+@bench("rx_diff_load")
+def _rx_diff_load(args):
+    path = _capture_file(args)
+    return "events/s", RX_DIFF_EVENTS, lambda: rx_diff._collect_rx_by_prefix(str(path), ["6905", "3006"])
+
+
+@bench("rx_diff_batch_load")
+def _rx_diff_batch_load(args):
+    path = _capture_file(args)
+    return "events/s", RX_DIFF_EVENTS, lambda: rx_diff._batch_runs_jsonl(str(path), ["6905", "3006"])
+
+
+def _capture_file(args) -> pathlib.Path:
+    path = _work_dir(args) / f"capture_{RX_DIFF_EVENTS}.txt"
+    if not path.exists():
+        print(f"  generating {path} ...", file=sys.stderr)
+        with open(path, "w", encoding="utf-8") as f:
+            for evt in capture_events(RX_DIFF_EVENTS):
+                f.write(json.dumps(evt, separators=(",", ":")) + "\n")
+    return path
+
+
+@bench("jsonl_writer")
+def _jsonl_writer(args):
+    events = capture_events(args.events)
+    path = _work_dir(args) / "jsonl_writer.txt"
+    counters: Dict[str, float] = {}
+
+    async def feed():
+        writer = two_run_rx_capture._JsonlWriter(path).start()
+        # Notifications arrive in bursts; yield between them so the writer task runs alongside.
+        for i in range(0, len(events), 64):
+            for evt in events[i:i + 64]:
+                writer.put(evt)
+            await asyncio.sleep(0)
+        await writer.close()
+        counters.update(late=writer.late, dropped=writer.dropped, max_lag_ms=round(writer.max_lag_s * 1000.0, 1))
+
+    def run():
+        path.unlink(missing_ok=True)
+        asyncio.run(feed())
+    return "events/s", len(events), run, counters
+
+
+@bench("append_jsonl")
+def _append_jsonl(args):
+    # The open/write/close-per-event logger _JsonlWriter replaced; kept as the reference point.
+    events = capture_events(args.events)
+    path = _work_dir(args) / "append_jsonl.txt"
+    append = two_run_rx_capture._append_jsonl
+
+    def run():
+        path.unlink(missing_ok=True)
+        for evt in events:
+            append(path, evt)
+    return "events/s", len(events), run
+
+
+# --- reporting / baselines ---
+
+def run_benchmarks(args) -> Dict[str, Result]:
+    for mb in args.btsnoop_mb:
+        BENCHMARKS[f"btsnoop_extract_{mb}MB"] = _btsnoop_bench(mb)
+    results: Dict[str, Result] = {}
+    for name, setup in BENCHMARKS.items():
+        if args.only and not any(fnmatch.fnmatch(name, f"*{pat}*") for pat in args.only):
+            continue
+        made = setup(args)
+        if made is None:
+            print(f"{name:<26} skipped (dependency missing)")
+            continue
+        unit, items, fn = made[:3]
+        counters = made[3] if len(made) > 3 else {}
+        times = time_rounds(fn, args.rounds)
+        scale = 1 / (1 << 20) if unit == "MB/s" else 1.0
+        best, median = min(times), statistics.median(times)
+        r = Result(
+            name=name,
+            unit=unit,
+            rate=items * scale / best,
+            median_rate=items * scale / median,
+            best_s=best,
+            median_s=median,
+            stddev_s=statistics.stdev(times) if len(times) > 1 else 0.0,
+            rounds=len(times),
+            items=items,
+            counters=dict(counters),
+        )
+        results[name] = r
+        extra = "".join(f"  {k}={v}" for k, v in r.counters.items())
+        print(f"{name:<26} {_fmt_rate(r.rate):>12} {unit:<9} median {_fmt_rate(r.median_rate):>10}"
+              f"  best {best * 1000:9.2f} ms  ±{r.stddev_s * 1000:.2f} ms  x{r.rounds}{extra}")
+    return results
+
+
+def _fmt_rate(v: float) -> str:
+    if v >= 1e6:
+        return f"{v / 1e6:.2f}M"
+    if v >= 1e4:
+        return f"{v / 1e3:.1f}k"
+    return f"{v:.1f}"
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_REPO_ROOT,
+                             capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def machine_info() -> dict:
+    np = charger_ctl.np
+    return {
+        "created": dt.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": getattr(np, "__version__", None),
+        "json_backend": capture_loader.JSON_BACKEND,
+    }
+
+
+def baseline_path(name_or_path: str) -> pathlib.Path:
+    p = pathlib.Path(name_or_path)
+    if p.suffix == ".json" or p.exists() or os.sep in name_or_path:
+        return p
+    return BASELINE_DIR / f"{name_or_path}.json"
+
+
+def save(path: pathlib.Path, results: Dict[str, Result]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = {"meta": machine_info(), "benchmarks": {k: asdict(v) for k, v in results.items()}}
+    path.write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+    print(f"saved {path}")
+
+
+def load(path: pathlib.Path) -> Tuple[dict, Dict[str, dict]]:
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    return doc.get("meta", {}), doc.get("benchmarks", {})
+
+
+def compare(base: Dict[str, dict], current: Dict[str, dict], threshold_pct: float) -> List[str]:
+    """Print a comparison table; return the names that slowed down by more than threshold_pct."""
+    regressions = []
+    print(f"\n{'benchmark':<26} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(set(base) | set(current)):
+        b, c = base.get(name), current.get(name)
+        if b is None or c is None:
+            print(f"{name:<26} {'-' if b is None else _fmt_rate(b['rate']):>12} "
+                  f"{'-' if c is None else _fmt_rate(c['rate']):>12}   (only in one run)")
+            continue
+        change = (c["rate"] / b["rate"] - 1.0) * 100.0 if b["rate"] else 0.0
+        flag = ""
+        if change < -threshold_pct:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change > threshold_pct:
+            flag = "  faster"
+        print(f"{name:<26} {_fmt_rate(b['rate']):>12} {_fmt_rate(c['rate']):>12} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark decode/encode/logging hot paths.")
+    ap.add_argument("--only", nargs="+", metavar="PATTERN", help="Run benchmarks whose name contains a pattern")
+    ap.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    ap.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark (default 5)")
+    ap.add_argument("--frames", type=int, default=100_000, help="3006 frames per round (default 100k)")
+    ap.add_argument("--ops", type=int, default=100_000, help="cmd06 encodes/decodes per round (default 100k)")
+    ap.add_argument("--events", type=int, default=5_000, help="jsonl_writer / append_jsonl events per round (default 5k)")
+    ap.add_argument("--btsnoop-mb", type=int, nargs="*", default=[10], metavar="MB",
+                    help="Synthetic btsnoop sizes in MB (default: 10; e.g. 10 100 1000)")
+    ap.add_argument("--work-dir", help="Where generated inputs are cached (default: $TMPDIR/r4830_bench)")
+    ap.add_argument("--save", metavar="NAME|PATH", help="Write results as a baseline (NAME -> bench/baselines/NAME.json)")
+    ap.add_argument("--compare", metavar="NAME|PATH", help="Compare against a saved baseline; exit 1 on regressions")
+    ap.add_argument("--current", metavar="PATH", help="With --compare: compare this saved result instead of running")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PCT,
+                    help=f"Regression threshold in percent of the baseline rate (default {DEFAULT_THRESHOLD_PCT:g})")
+    args = ap.parse_args(argv)
+
+    if args.list:
+        for name in list(BENCHMARKS) + [f"btsnoop_extract_{mb}MB" for mb in args.btsnoop_mb]:
+            print(name)
+        return 0
+    if args.current and not args.compare:
+        ap.error("--current needs --compare")
+    if args.rounds < 1:
+        ap.error("--rounds must be >= 1")
+
+    if args.current:
+        current_meta, current = load(baseline_path(args.current))
+    else:
+        current = {k: asdict(v) for k, v in run_benchmarks(args).items()}
+        current_meta = machine_info()
+        if args.save:
+            save(baseline_path(args.save), {k: Result(**v) for k, v in current.items()})
+
+    if not args.compare:
+        return 0
+    base_meta, base = load(baseline_path(args.compare))
+    for key in ("platform", "python", "numpy", "json_backend"):
+        if base_meta.get(key) != current_meta.get(key):
+            print(f"note: {key} differs (baseline {base_meta.get(key)!r}, current {current_meta.get(key)!r})")
+    if args.only:
+        base = {k: v for k, v in base.items() if k in current}
+    regressions = compare(base, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%: {', '.join(regressions)}")
+        return 1
+    print(f"\nno regressions over {args.threshold:g}%")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Columnar (.npz) storage for captured ATT/BLE events.
+
+The JSONL logs written by btsnoop_ble_extract.py and two_run_rx_capture.py
+repeat every payload as hex two or three times and need a full JSON parse on
+every reload. This format keeps one row per frame in fixed columns plus one
+packed payload buffer:
+
+  ts       int64   microseconds (btsnoop: raw record ts; app logs: unix epoch)
+  dir      uint8   0 = TX, 1 = RX
+  opcode   uint8   ATT opcode (app logs: 0x52 for TX writes, 0x1B for RX notifies)
+  handle   int32   ATT handle, -1 when unknown
+  offsets  int64   n+1 offsets into payload; row i is payload[offsets[i]:offsets[i+1]]
+  payload  uint8   all payload bytes back to back
+  meta     str     JSON: source, ts_kind, and non-frame markers (run_start, change_note, ...)
+
+Usage:
+  python3 capture_columnar.py convert capture.jsonl capture.npz
+  python3 capture_columnar.py info capture.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import array
+import datetime as dt
+import json
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence
+
+import capture_loader
+
+try:
+    import numpy as np
+    _NUMPY_IMPORT_ERROR: Optional[Exception] = None
+except Exception as exc:  # pragma: no cover - env-specific dependency
+    np = None  # type: ignore[assignment]
+    _NUMPY_IMPORT_ERROR = exc
+
+
+FORMAT_VERSION = 1
+DIR_TX = 0
+DIR_RX = 1
+OPCODE_WRITE_CMD = 0x52
+OPCODE_HANDLE_VALUE_NTF = 0x1B
+NO_HANDLE = -1
+
+
+def _require_numpy() -> None:
+    if _NUMPY_IMPORT_ERROR is not None:
+        raise RuntimeError(
+            "Missing dependency 'numpy' for columnar captures. Install with: "
+            "`python3 -m pip install numpy`."
+        )
+
+
+def is_columnar_path(path: str) -> bool:
+    return str(path).lower().endswith(".npz")
+
+
+@dataclass
+class CaptureColumns:
+    ts: Any
+    dir: Any
+    opcode: Any
+    handle: Any
+    offsets: Any
+    payload: Any
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    @property
+    def lengths(self) -> Any:
+        return np.diff(self.offsets)
+
+    def payload_at(self, i: int) -> bytes:
+        return self.payload[self.offsets[i] : self.offsets[i + 1]].tobytes()
+
+    def prefix16(self) -> Any:
+        """First two payload bytes as a big-endian u16 per row (-1 for rows shorter than 2)."""
+        starts = self.offsets[:-1]
+        ok = self.lengths >= 2
+        out = np.full(len(self), -1, dtype=np.int32)
+        if ok.any():
+            s = starts[ok]
+            out[ok] = (self.payload[s].astype(np.int32) << 8) | self.payload[s + 1]
+        return out
+
+
+class ColumnarWriter:
+    """Accumulates rows with stdlib arrays, then writes one .npz on close()."""
+
+    def __init__(self, path: str, *, source: str, ts_kind: str) -> None:
+        _require_numpy()
+        self.path = path
+        self.meta: Dict[str, Any] = {
+            "format": "att_columnar",
+            "version": FORMAT_VERSION,
+            "source": source,
+            "ts_kind": ts_kind,
+            "markers": [],
+        }
+        self._ts = array.array("q")
+        self._dir = array.array("B")
+        self._opcode = array.array("B")
+        self._handle = array.array("i")
+        self._offsets = array.array("q", [0])
+        self._payload = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def append(self, ts: int, direction: int, opcode: int, handle: Optional[int], payload: bytes) -> None:
+        self._ts.append(ts)
+        self._dir.append(direction)
+        self._opcode.append(opcode & 0xFF)
+        self._handle.append(NO_HANDLE if handle is None else handle)
+        self._payload += payload
+        self._offsets.append(len(self._payload))
+
+    def add_marker(self, marker: Dict[str, Any]) -> None:
+        # Markers keep their position so tools can tell which frames came before/after a note.
+        self.meta["markers"].append(dict(marker, row=len(self._ts)))
+
+    def close(self) -> None:
+        with open(self.path, "wb") as f:
+            np.savez(
+                f,
+                ts=np.frombuffer(self._ts, dtype=np.int64),
+                dir=np.frombuffer(self._dir, dtype=np.uint8),
+                opcode=np.frombuffer(self._opcode, dtype=np.uint8),
+                handle=np.frombuffer(self._handle, dtype=np.int32),
+                offsets=np.frombuffer(self._offsets, dtype=np.int64),
+                payload=np.frombuffer(bytes(self._payload), dtype=np.uint8),
+                meta=np.array(json.dumps(self.meta)),
+            )
+
+
+def load_columnar(path: str) -> CaptureColumns:
+    _require_numpy()
+    with np.load(path, allow_pickle=False) as z:
+        return CaptureColumns(
+            ts=z["ts"],
+            dir=z["dir"],
+            opcode=z["opcode"],
+            handle=z["handle"],
+            offsets=z["offsets"],
+            payload=z["payload"],
+            meta=json.loads(str(z["meta"])),
+        )
+
+
+def _iso_to_us(raw: str) -> int:
+    return int(round(dt.datetime.fromisoformat(raw).timestamp() * 1_000_000))
+
+
+def append_jsonl_event(writer: ColumnarWriter, evt: Dict[str, Any], payload: Optional[bytes] = None) -> None:
+    """Add one decoded JSONL event from either capture tool to a writer (payload: already-decoded hex)."""
+    if "value_hex" in evt and "att_opcode" in evt:
+        # btsnoop_ble_extract.py event
+        writer.append(
+            int(evt["ts"]),
+            DIR_RX if evt.get("dir") == "RX" else DIR_TX,
+            int(evt["att_opcode"]),
+            evt.get("handle"),
+            payload if payload is not None else bytes.fromhex(evt["value_hex"]),
+        )
+        return
+    payload_hex = evt.get("payload_hex")
+    direction = str(evt.get("direction", "")).upper()
+    if isinstance(payload_hex, str) and direction in ("RX", "TX"):
+        # two_run_rx_capture.py / app log event
+        rx = direction == "RX"
+        writer.append(
+            _iso_to_us(evt["ts"]),
+            DIR_RX if rx else DIR_TX,
+            OPCODE_HANDLE_VALUE_NTF if rx else OPCODE_WRITE_CMD,
+            None,
+            payload if payload is not None else bytes.fromhex(payload_hex),
+        )
+        return
+    writer.add_marker(evt)
+
+
+def convert_jsonl(src: str, dst: str) -> int:
+    writer: Optional[ColumnarWriter] = None
+    for evt, payload in capture_loader.iter_capture(src, direction=None, markers=True):
+        if writer is None:
+            btsnoop = "att_opcode" in evt
+            writer = ColumnarWriter(
+                dst,
+                source="btsnoop_ble_extract" if btsnoop else "ble_events",
+                ts_kind="btsnoop_us" if btsnoop else "unix_us",
+            )
+        append_jsonl_event(writer, evt, payload)
+    if writer is None:
+        writer = ColumnarWriter(dst, source="empty", ts_kind="unix_us")
+    rows = len(writer)
+    writer.close()
+    return rows
+
+
+def main(argv: Sequence[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="subcmd", required=True)
+    sp_conv = sub.add_parser("convert", help="Convert a JSONL capture to .npz")
+    sp_conv.add_argument("src")
+    sp_conv.add_argument("dst")
+    sp_info = sub.add_parser("info", help="Summarize a .npz capture")
+    sp_info.add_argument("path")
+    args = ap.parse_args(argv)
+
+    try:
+        if args.subcmd == "convert":
+            rows = convert_jsonl(args.src, args.dst)
+            print(f"wrote {rows} rows to {args.dst}")
+            return 0
+        cols = load_columnar(args.path)
+        rx = int((cols.dir == DIR_RX).sum())
+        print(f"rows={len(cols)} rx={rx} tx={len(cols) - rx} payload_bytes={cols.payload.size}")
+        print(f"source={cols.meta.get('source')} ts_kind={cols.meta.get('ts_kind')} markers={len(cols.meta.get('markers', []))}")
+        return 0
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
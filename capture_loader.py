@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""Fast reader for JSONL capture logs.
+
+Both log flavours are supported:
+
+  two_run_rx_capture.py / app logs   {"direction":"RX","payload_hex":"3006...",...}
+  btsnoop_ble_extract.py             {"dir": "RX", "value_hex": "3006...", ...}
+
+Most lines in a capture are frames nobody asked for (other prefixes, TX), so
+the file is read in large blocks and searched once for the exact bytes a
+wanted line must contain, e.g. '"direction":"RX","payload_hex":"' (plus
+'"event"' when markers are asked for); the prefix is checked on each hit and
+everything else is skipped without ever becoming a Python object. The key
+spelling and order are taken from the file's first frame line, since each
+writer sticks to one layout; when the direction isn't next to the payload key
+(btsnoop_ble_extract output) it is checked on the raw line instead. Surviving
+lines reach the JSON parser: orjson when installed, otherwise the stdlib json
+module.
+
+Callers that only need the payload (and maybe a field or two such as "run")
+pass fields=(...): frame lines then skip the JSON parser entirely and the
+event dict holds just those string fields, sliced out of the raw line. The
+hex of every matched payload in a block is decoded in one go, so the per-frame
+Python work is a few slices.
+
+Usage:
+  for evt, payload in iter_capture(path, direction="RX", prefixes=["6905"]):
+      ...
+  for evt, payload in iter_capture(path, markers=True):   # payload is None for run_start/change_note/...
+      ...
+  for evt, payload in iter_capture(path, fields=("run",)):  # evt == {"run": "run1"}, no JSON parse
+      ...
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    import orjson
+    _ORJSON_IMPORT_ERROR: Optional[Exception] = None
+except Exception as exc:  # pragma: no cover - env-specific dependency
+    orjson = None  # type: ignore[assignment]
+    _ORJSON_IMPORT_ERROR = exc
+
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _needles(*keys: str) -> Tuple[bytes, ...]:
+    # json.dumps writes '"k": "v"', compact writers (orjson, separators=(",", ":")) write '"k":"v"'.
+    return tuple(f'"{k}"{sep}"'.encode("ascii") for k in keys for sep in (": ", ":"))
+
+
+_HEX_KEYS = _needles("payload_hex", "value_hex")
+_DIR_KEYS = _needles("direction", "dir")
+_EVENT_KEY = b'"event"'
+CHUNK_BYTES = 1 << 20
+_HEX_CHARS = frozenset("0123456789abcdefABCDEF")
+
+
+@dataclass
+class LoadStats:
+    parsed: int = 0           # lines that reached the JSON parser
+    direction_lines: int = 0  # lines tagged with the wanted direction, before the prefix filter
+    frames: int = 0
+    markers: int = 0
+    bad_json: int = 0
+    bad_hex: int = 0
+
+
+def loads(raw) -> Optional[Dict[str, Any]]:
+    """Parse one JSONL line (str or bytes); None for anything that isn't a JSON object."""
+    try:
+        value = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+class _FieldReader:
+    """Top-level string fields sliced straight off frame lines, no JSON parser.
+
+    A writer lays every line out the same way, so the bytes from a field to the
+    payload ('"run":"run1","direction":"RX","payload_hex":"') repeat line after
+    line. They are remembered per field and checked with one startswith()
+    ending at the payload; only a miss pays for finding the line and the field.
+    """
+
+    def __init__(self, fields: Sequence[str], sep: str) -> None:
+        self.fields = [(name, f'"{name}"{sep}"'.encode("ascii")) for name in fields]
+        self._hints: Dict[str, Tuple[bytes, str]] = {}
+
+    def read(self, block: bytes, at: int) -> Optional[Dict[str, Any]]:
+        """Fields of the line whose payload begins at `at`; None if one of them needs a real parser."""
+        evt: Dict[str, Any] = {}
+        start = end = -1
+        for name, needle in self.fields:
+            hint = self._hints.get(name)
+            if hint is not None:
+                token, value = hint
+                # The token holds no newline and ends at the payload, so a match is on this line.
+                if len(token) <= at and block.startswith(token, at - len(token)):
+                    evt[name] = value
+                    continue
+            if start < 0:
+                start = block.rfind(b"\n", 0, at) + 1
+            i = block.find(needle, start, at)
+            if i >= 0:
+                stop = at
+            else:
+                if end < 0:
+                    end = _eol(block, at)
+                i = block.find(needle, at, end)
+                if i < 0:
+                    continue
+                stop = end
+            j = i + len(needle)
+            close = block.find(b'"', j, stop)
+            if close < 0:
+                return None
+            raw = block[j:close]
+            if b"\\" in raw:
+                return None
+            value = raw.decode("utf-8", "replace")
+            evt[name] = value
+            if stop == at:
+                self._hints[name] = (block[i:at], value)
+        return evt
+
+
+def _line_start(block: bytes, i: int) -> int:
+    return block.rfind(b"\n", 0, i) + 1
+
+
+def _eol(block: bytes, i: int) -> int:
+    end = block.find(b"\n", i)
+    return len(block) if end < 0 else end
+
+
+def hex_to_bytes(hex_str: str) -> Optional[bytes]:
+    try:
+        return bytes.fromhex(hex_str)
+    except ValueError:
+        pass
+    # Rare: separators or stray characters in hand-edited logs.
+    clean = "".join(ch for ch in hex_str if ch in _HEX_CHARS)
+    if not clean or len(clean) % 2:
+        return None
+    return bytes.fromhex(clean)
+
+
+def _layout(block: bytes) -> Optional[Tuple[bytes, Optional[bytes], Optional[bytes]]]:
+    """(payload key needle, direction key needle, direction joiner) as spelled by this file's writer.
+
+    Every writer emits one key order and one separator style per file, so the
+    first frame line settles it and the rest of the file can be searched for
+    exact byte strings. The joiner is the text between the direction value and
+    the payload key when the writer puts them side by side (two_run_rx_capture
+    does: '"direction":"RX","payload_hex":"'); the direction then becomes part
+    of the search needle and needs no per-line check.
+    """
+    i = block.find(b'_hex"')
+    while i >= 0:
+        start = block.rfind(b"\n", 0, i) + 1
+        end = block.find(b"\n", i)
+        line = block[start:] if end < 0 else block[start:end]
+        hex_key = next((k for k in _HEX_KEYS if k in line), None)
+        if hex_key is not None:
+            dir_key = next((k for k in _DIR_KEYS if k in line), None)
+            joiner = None
+            if dir_key is not None:
+                close = line.find(b'"', line.find(dir_key) + len(dir_key))
+                joiner = next((j for j in (b'",', b'", ') if line.startswith(j + hex_key, close)), None)
+            return hex_key, dir_key, joiner
+        if end < 0:
+            break
+        i = block.find(b'_hex"', end)
+    return None
+
+
+def _iter_blocks(f) -> Iterator[bytes]:
+    """The file in roughly CHUNK_BYTES pieces, always cut after a newline."""
+    tail = b""
+    while True:
+        chunk = f.read(CHUNK_BYTES)
+        if not chunk:
+            break
+        cut = chunk.rfind(b"\n")
+        if cut < 0:
+            tail += chunk
+            continue
+        yield tail + chunk[: cut + 1]
+        tail = chunk[cut + 1 :]
+    if tail:
+        yield tail
+
+
+def _hits(
+    block: bytes, base: bytes, heads: Optional[Set[bytes]], markers: bool
+) -> Tuple[List[int], Set[int], int]:
+    """Payload offsets after each `base` whose first four hex digits are in heads (None: all),
+    marker key offsets (one per line), and the number of `base` hits before the prefix filter.
+
+    One pass over the block whatever the prefixes: a find() pass costs about as
+    much as all the per-hit work, so the prefix is checked on each hit rather
+    than scanned for once per prefix.
+    """
+    find = block.find
+    skip = len(base)
+    found: List[int] = []
+    if base:
+        i = find(base)
+        while i >= 0:
+            i += skip
+            found.append(i)
+            i = find(base, i)
+    hits = found if heads is None else [at for at in found if block[at : at + 4] in heads]
+    marks: Set[int] = set()
+    if markers:
+        i = find(_EVENT_KEY)
+        while i >= 0:
+            marks.add(i)
+            end = find(b"\n", i)
+            if end < 0:
+                break
+            i = find(_EVENT_KEY, end)
+        if marks:
+            hits = sorted(hits + list(marks))
+    return hits, marks, len(found)
+
+
+def _decode_hex(hexes: List[bytes]) -> Optional[List[bytes]]:
+    """All payloads of a block in one pass over the joined hex; None if any of them needs a closer look."""
+    if not all(hexes):
+        return None  # an empty value goes through the JSON parser, like any other odd line
+    try:
+        payloads = list(map(bytes.fromhex, b"\n".join(hexes).decode("ascii").split("\n")))
+    except ValueError:  # includes UnicodeDecodeError
+        return None
+    # fromhex skips whitespace, newlines included: a value running into the next line shows up here.
+    return payloads if len(payloads) == len(hexes) else None
+
+
+def iter_capture(
+    path: str,
+    *,
+    direction: Optional[str] = "RX",
+    prefixes: Optional[Iterable[str]] = None,
+    markers: bool = False,
+    fields: Optional[Sequence[str]] = None,
+    stats: Optional[LoadStats] = None,
+) -> Iterator[Tuple[Dict[str, Any], Optional[bytes]]]:
+    """Yield (event, payload) for frames matching direction/prefixes, and (event, None) for markers.
+
+    direction: "RX", "TX" or None for both. prefixes: 4-hex-digit frame prefixes
+    ("3006", "6905", ...) or None for all. markers: also yield non-frame events
+    (run_start, change_note, run_end, ...). fields: skip the JSON parser for
+    frames and return only these top-level string fields; markers are always
+    fully parsed.
+    """
+    st = stats if stats is not None else LoadStats()
+    want_dir = direction.upper().encode("ascii") if direction else None
+    want_prefix = {p.lower().encode("ascii") for p in prefixes} if prefixes is not None else None
+
+    layout: Optional[Tuple[bytes, Optional[bytes], Optional[bytes]]] = None
+    base = b""
+    heads = {c for p in want_prefix for c in (p, p.upper())} if want_prefix is not None else None
+    frame_keys: Tuple[bytes, ...] = ()
+    dir_needle = b""
+    dir_in_needle = False
+    reader: Optional[_FieldReader] = None
+
+    with open(path, "rb") as f:
+        for block in _iter_blocks(f):
+            if layout is None:
+                layout = _layout(block)
+                if layout is not None:
+                    hex_key, dir_key, joiner = layout
+                    frame_keys = (hex_key,) if heads is None else tuple(hex_key + h for h in heads)
+                    base = hex_key
+                    if want_dir is not None:
+                        if dir_key is None:
+                            base = b""  # no direction key in this file: no frame can match
+                        else:
+                            dir_needle = dir_key + want_dir + b'"'
+                            if joiner is not None:
+                                base = dir_needle + joiner[1:] + hex_key
+                                dir_in_needle = True
+                    if fields is not None:
+                        # Same writer, same separator style as the payload key.
+                        reader = _FieldReader(fields, hex_key[hex_key.index(b'":') + 1 : -1].decode("ascii"))
+            hits, marks, base_hits = _hits(block, base, heads, markers)
+            if dir_in_needle:
+                st.direction_lines += base_hits
+            elif dir_needle:
+                st.direction_lines += block.count(dir_needle)
+            if hits:
+                yield from _block_frames(block, hits, marks, frame_keys, b"" if dir_in_needle else dir_needle, reader, st)
+
+
+def _block_frames(
+    block: bytes,
+    hits: List[int],
+    marks: Set[int],
+    frame_keys: Tuple[bytes, ...],
+    dir_needle: bytes,
+    reader: Optional[_FieldReader],
+    st: LoadStats,
+) -> List[Tuple[Dict[str, Any], Optional[bytes]]]:
+    """Events for one block's hits. dir_needle is non-empty when each line's direction still needs checking."""
+    find = block.find
+    frame_hits = [at for at in hits if at not in marks] if marks else hits
+    hexes = [block[at : find(b'"', at)] for at in frame_hits]
+    payloads = _decode_hex(hexes)
+    if payloads is not None and reader is not None and not reader.fields and not marks and not dir_needle:
+        # The common rx_diff case: payloads only, and the needle already pinned the direction.
+        st.frames += len(payloads)
+        return [({}, payload) for payload in payloads]
+
+    out: List[Tuple[Dict[str, Any], Optional[bytes]]] = []
+    if payloads is not None and reader is not None and not dir_needle:
+        # Every payload decoded and no direction left to check: only fields and markers need the line.
+        read = reader.read
+        frames = iter(payloads)
+        for at in hits:
+            if at in marks:
+                out.extend(_marker(block, at, frame_keys, st))
+                continue
+            payload = next(frames)
+            evt = read(block, at)
+            if evt is None:
+                out.extend(_parsed_line(block, at, reader, st))
+                continue
+            st.frames += 1
+            out.append((evt, payload))
+        return out
+
+    k = 0
+    for at in hits:
+        if at in marks:
+            out.extend(_marker(block, at, frame_keys, st))
+            continue
+        hx = hexes[k]
+        payload = payloads[k] if payloads is not None else None
+        k += 1
+        if dir_needle and find(dir_needle, _line_start(block, at), _eol(block, at)) < 0:
+            continue
+
+        if reader is not None and hx and b"\n" not in hx:
+            evt = reader.read(block, at)
+            if evt is not None:
+                if payload is None:
+                    payload = hex_to_bytes(hx.decode("ascii", "replace"))
+                if payload is None:
+                    st.bad_hex += 1
+                    continue
+                st.frames += 1
+                out.append((evt, payload))
+                continue
+            # Escapes or an odd layout: fall through to the real parser.
+        out.extend(_parsed_line(block, at, reader, st))
+    return out
+
+
+def _marker(block: bytes, at: int, frame_keys: Tuple[bytes, ...], st: LoadStats) -> List[Tuple[Dict[str, Any], None]]:
+    """The marker event on the line holding block[at], if it is one."""
+    line = block[_line_start(block, at) : _eol(block, at)]
+    if any(key in line for key in frame_keys):
+        return []  # a frame line that also carries an "event" key; the frame hit owns it
+    evt = loads(line)
+    st.parsed += 1
+    if evt is None:
+        st.bad_json += 1
+        return []
+    if "event" not in evt:
+        return []
+    st.markers += 1
+    return [(evt, None)]
+
+
+def _parsed_line(
+    block: bytes, at: int, reader: Optional[_FieldReader], st: LoadStats
+) -> List[Tuple[Dict[str, Any], bytes]]:
+    """The frame on the line holding block[at], through the JSON parser."""
+    evt = loads(block[_line_start(block, at) : _eol(block, at)])
+    st.parsed += 1
+    if evt is None:
+        st.bad_json += 1
+        return []
+    return list(_parsed_frame(evt, reader, st))
+
+
+def _parsed_frame(
+    evt: Dict[str, Any],
+    reader: Optional[_FieldReader],
+    st: LoadStats,
+) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+    hx = evt.get("payload_hex") if "payload_hex" in evt else evt.get("value_hex")
+    payload = hex_to_bytes(hx) if isinstance(hx, str) else None
+    if payload is None:
+        st.bad_hex += 1
+        return
+    st.frames += 1
+    if reader is not None:
+        evt = {name: evt[name] for name, _ in reader.fields if isinstance(evt.get(name), str)}
+    yield evt, payload
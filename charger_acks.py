@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+charger_acks.py — correlate 0x05 / 0x06 command writes with their 03 acks.
+
+The charger answers every 05/06 command with a 4-byte ack
+(ble_definitions.yaml framing.ack_03):
+
+  03 <cmd_id> <ack_status> <checksum>     checksum = (cmd_id + ack_status) & 0xFF
+                                          ack_status 1 = accepted
+
+AckTracker is the Python side of the browser's queueAck/settleAck:
+- Waiters are keyed by cmd_id. Writes for different cmd_ids are pipelined —
+  all of them go out back to back and their acks are awaited together — so
+  applying a 13-control profile costs about one round-trip.
+- At most one write per cmd_id is in flight (later ones wait their turn), so
+  an ack can always be matched to the write it belongs to.
+- Each command has its own timeout; timeouts and failed writes are retried
+  up to `retries` times. A rejected ack (status != 1 or bad checksum) is final.
+
+Usage (with charger_scheduler.WriteScheduler):
+  acks = AckTracker()
+  ... on_notify: acks.feed(data)
+  result = await acks.send(scheduler, build_set_amps(2.0))
+  results = await acks.send_many(scheduler, frames)
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+ACK_PREAMBLE = 0x03
+ACK_LEN = 4
+ACK_STATUS_OK = 1
+
+DEFAULT_TIMEOUT_S = 1.5
+DEFAULT_RETRIES = 2
+
+
+def parse_ack(frame: bytes):
+    """03 <cmd_id> <status> <csum> -> (cmd_id, status, checksum_ok); None for anything else."""
+    if len(frame) != ACK_LEN or frame[0] != ACK_PREAMBLE:
+        return None
+    cmd_id, status, csum = frame[1], frame[2], frame[3]
+    return cmd_id, status, ((cmd_id + status) & 0xFF) == csum
+
+
+def expected_ack_cmd_id(payload: bytes) -> Optional[int]:
+    """cmd_id the charger will ack for this write, or None if it isn't acked (keepalive, polls, ...)."""
+    if len(payload) >= 2 and payload[0] in (0x05, 0x06):
+        return payload[1]
+    return None
+
+
+@dataclass
+class AckResult:
+    cmd_id: Optional[int]
+    state: str                    # "acknowledged", "rejected", "timeout", "write_failed", "none"
+    status: Optional[int] = None
+    attempts: int = 0
+    rtt_s: Optional[float] = None  # start of the last write -> ack
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.state in ("acknowledged", "none")
+
+    def describe(self) -> str:
+        cmd = "--" if self.cmd_id is None else f"{self.cmd_id:02x}"
+        rtt = f" rtt={self.rtt_s * 1000.0:.0f}ms" if self.rtt_s is not None else ""
+        status = f" status={self.status}" if self.status is not None else ""
+        err = f" ({self.error})" if self.error else ""
+        return f"cmd={cmd} {self.state}{status} attempts={self.attempts}{rtt}{err}"
+
+
+class AckTracker:
+    def __init__(self):
+        self._waiters = {}    # cmd_id -> deque of futures, oldest first
+        self._locks = {}      # cmd_id -> asyncio.Lock (one write in flight per cmd_id)
+        self.acked = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.unsolicited = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def expect(self, cmd_id: int) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(cmd_id, deque()).append(fut)
+        return fut
+
+    def _discard(self, cmd_id: int, fut: asyncio.Future):
+        q = self._waiters.get(cmd_id)
+        if q is None:
+            return
+        try:
+            q.remove(fut)
+        except ValueError:
+            pass
+        if not q:
+            del self._waiters[cmd_id]
+
+    def feed(self, frame: bytes) -> bool:
+        """Handle one RX frame; returns True if it was an ack (matched or not)."""
+        parsed = parse_ack(bytes(frame))
+        if parsed is None:
+            return False
+        cmd_id, status, checksum_ok = parsed
+        q = self._waiters.get(cmd_id)
+        while q:
+            fut = q.popleft()
+            if not fut.done():
+                fut.set_result((status, checksum_ok, time.perf_counter()))
+                break
+        else:
+            self.unsolicited += 1
+        if q is not None and not q:
+            del self._waiters[cmd_id]
+        return True
+
+    async def send(self, scheduler, payload: bytes, *, timeout_s=DEFAULT_TIMEOUT_S,
+                   retries=DEFAULT_RETRIES, note=None) -> AckResult:
+        """Write payload at command priority and wait for its ack (retrying on timeout)."""
+        cmd_id = expected_ack_cmd_id(payload)
+        if cmd_id is None:
+            try:
+                await scheduler.send(payload, note)
+            except Exception as e:
+                return AckResult(None, "write_failed", attempts=1, error=f"{type(e).__name__}: {e}")
+            return AckResult(None, "none", attempts=1)
+
+        lock = self._locks.setdefault(cmd_id, asyncio.Lock())
+        async with lock:
+            result = AckResult(cmd_id, "timeout")
+            for attempt in range(1, retries + 2):
+                result.attempts = attempt
+                if attempt > 1:
+                    self.retries += 1
+                # Register before writing: the ack can arrive before the write call returns.
+                fut = self.expect(cmd_id)
+                try:
+                    sent_at, _ = await scheduler.send(payload, note)
+                except Exception as e:
+                    self._discard(cmd_id, fut)
+                    result.state = "write_failed"
+                    result.error = f"{type(e).__name__}: {e}"
+                    continue
+                try:
+                    status, checksum_ok, acked_at = await asyncio.wait_for(fut, timeout_s)
+                except asyncio.TimeoutError:
+                    self._discard(cmd_id, fut)
+                    self.timeouts += 1
+                    result.state = "timeout"
+                    result.error = None
+                    continue
+                result.status = status
+                result.rtt_s = acked_at - sent_at
+                result.error = None
+                if checksum_ok and status == ACK_STATUS_OK:
+                    self.acked += 1
+                    result.state = "acknowledged"
+                else:
+                    self.rejected += 1
+                    result.state = "rejected"
+                    if not checksum_ok:
+                        result.error = "bad_checksum"
+                return result
+            return result
+
+    async def send_many(self, scheduler, payloads, *, timeout_s=DEFAULT_TIMEOUT_S,
+                        retries=DEFAULT_RETRIES, note=None):
+        """Pipeline several writes; results come back in payload order.
+
+        Frames with distinct cmd_ids are all in flight together; repeated
+        cmd_ids go out in the order given, one at a time.
+        """
+        return await asyncio.gather(*(
+            self.send(scheduler, p, timeout_s=timeout_s, retries=retries, note=note) for p in payloads
+        ))
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "acked": self.acked,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "unsolicited": self.unsolicited,
+        }
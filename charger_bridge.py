@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+"""
+charger_bridge.py — one BLE session, many browser dashboards.
+
+Holds a single charger connection (charger_ctl helpers, write scheduler, ack
+tracker, frame reassembler), decodes 0x3006 / 0x6905 once, and serves
+controller/frontend over HTTP with a WebSocket feed at /ws. However many
+dashboards are open, the charger only ever sees one central.
+
+The server outlives the BLE link: when the charger drops, dashboards get
+{"type": "status", "connected": false} and the bridge reconnects through
+charger_session.ChargerSession (cached address, exponential backoff); writes
+sent meanwhile fail with "charger not connected".
+
+WebSocket protocol (JSON text frames):
+  server -> client
+    {"type": "hello", "device": {...}, "connected": true}
+    {"type": "telemetry", "seq": n, "ts": unix, "key": true, "t": {...}}   keyframe, app.js field names
+    {"type": "telemetry", "seq": n, "ts": unix, "d": {...}}                only fields that moved
+    {"type": "rx", "hex": "..."}                                 other frames (acks, 0b01, 1204, echoes)
+    {"type": "write_result", "id": n, "state": "...", ...}       answer to a write
+    {"type": "status", "connected": false}
+  client -> server
+    {"type": "write", "id": n, "hex": "...", "note": "..."}
+
+Telemetry is delta-encoded per client: a keyframe with every field on
+connect (and every --keyframe-seconds), then only the fields that moved more
+than their deadband (TELEMETRY_DEADBANDS) since the value that client last
+got. On a steady charge most 0x3006 frames change nothing beyond noise, so
+most samples cost nothing; an empty delta still goes out once a second as a
+heartbeat. Deltas are computed against what the client was actually sent, so
+skipped samples can't make a dashboard drift.
+
+Back-pressure is per client: telemetry is latest-value-wins — while a slow
+client is still draining, newer samples replace the one waiting for it
+(counted as dropped) instead of queueing; "rx" frames sit in a short ring
+that drops the oldest; write results are never dropped. A client that
+can't take a message for --send-timeout seconds is disconnected.
+
+Usage:
+  python3 charger_bridge.py                 (http://127.0.0.1:8787)
+  python3 charger_bridge.py --host 0.0.0.0 --port 8787 --poll-seconds 5
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import mimetypes
+import pathlib
+import struct
+import time
+from collections import deque
+
+import charger_ctl
+import charger_session
+import charger_sim
+from charger_acks import AckTracker
+from charger_ctl import TELEMETRY_3006_OUTPUT_FLAG_OFF, UUID_FFE2, UUID_FFE3, make_scheduler
+from charger_framing import FrameReassembler
+from charger_session import ChargerSession
+
+FRONTEND_DIR = pathlib.Path(__file__).resolve().parent / "controller" / "frontend"
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_OP_CONT, WS_OP_TEXT, WS_OP_BINARY, WS_OP_CLOSE, WS_OP_PING, WS_OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+WS_MAX_MESSAGE = 1 << 20
+RX_RING = 256
+HEARTBEAT_S = 1.0
+BACKOFF_MAX_S = 30.0
+FLOAT_DIGITS = 3
+
+
+# --- decoding (mirrors handleRxDecoded in controller/frontend/app.js) ---
+
+TELEMETRY_KEYS = (
+    "firmwareVersion", "outputSetVoltage", "outputSetCurrent", "inputVoltage", "inputCurrent",
+    "outputVoltage", "outputCurrent", "inputFrequencyHz", "temperatureC", "temperature2C",
+    "throttlingPercent", "inputPowerW", "outputPowerW", "efficiencyPercent", "stage2Voltage",
+    "stage2Current", "powerOffCurrent", "softStartSeconds", "outputEnabled", "manualControl",
+    "twoStageEnabled", "powerOnOutput", "selfStop", "displayLanguage",
+)
+
+# (key, offset, min, max) float32 LE fields of 0x3006 / 0x6905
+_FIELDS_3006 = (
+    ("inputVoltage", 2, 0, 300),
+    ("inputCurrent", 6, 0, 200),
+    ("inputFrequencyHz", 10, 0, 500),
+    ("temperatureC", 14, -40, 200),
+    ("temperature2C", 18, -40, 200),
+    ("outputVoltage", 22, 0, 300),
+    ("outputCurrent", 26, 0, 200),
+    ("inputPowerW", 30, 0, 50000),
+    ("efficiencyPercent", 34, 0, 100),
+    ("throttlingPercent", 34, 0, 100),
+)
+_FIELDS_6905 = (
+    ("outputSetVoltage", 2, 0, 300),
+    ("outputSetCurrent", 6, 0, 200),
+    ("powerOffCurrent", 44, 0, 200),
+    ("stage2Voltage", 78, 0, 300),
+    ("stage2Current", 82, 0, 200),
+)
+
+# Smallest change worth pushing, in field units. Fields not listed go out on any change.
+TELEMETRY_DEADBANDS = {
+    "inputVoltage": 0.5,
+    "inputCurrent": 0.02,
+    "inputFrequencyHz": 0.05,
+    "temperatureC": 0.5,
+    "temperature2C": 0.5,
+    "outputVoltage": 0.05,
+    "outputCurrent": 0.02,
+    "inputPowerW": 2.0,
+    "outputPowerW": 2.0,
+    "efficiencyPercent": 0.2,
+    "throttlingPercent": 0.2,
+}
+
+_LANGUAGES = {(0x65, 0x6E): "English", (0x7A, 0x68): "Chinese (Simplified)", (0x7A, 0x74): "Chinese (Traditional)"}
+
+
+def _f32(frame: bytes, off: int, lo: float, hi: float):
+    if len(frame) < off + 4:
+        return None
+    v = struct.unpack_from("<f", frame, off)[0]
+    if math.isnan(v) or v < lo or v > hi:
+        return None
+    return v
+
+
+def _language(b0: int, b1: int):
+    return _LANGUAGES.get((b0, b1), f"Unknown ({b0:02x}{b1:02x})")
+
+
+def empty_telemetry() -> dict:
+    return {k: None for k in TELEMETRY_KEYS}
+
+
+def _wire(v):
+    return round(v, FLOAT_DIGITS) if isinstance(v, float) else v
+
+
+def telemetry_delta(view: dict, t: dict) -> dict:
+    """Fields of t that moved past their deadband relative to view (the client's last-sent values)."""
+    out = {}
+    for key, v in t.items():
+        old = view.get(key)
+        if v == old:
+            continue
+        band = TELEMETRY_DEADBANDS.get(key)
+        if band is not None and v is not None and old is not None and abs(v - old) < band:
+            continue
+        out[key] = _wire(v)
+    return out
+
+
+def apply_frame(t: dict, frame: bytes, flags: dict) -> bool:
+    """Fold one RX frame into the telemetry dict; returns False if it isn't a telemetry frame."""
+    prefix = frame[:2]
+    if prefix == b"\x30\x06":
+        for key, off, lo, hi in _FIELDS_3006:
+            v = _f32(frame, off, lo, hi)
+            if v is not None:
+                t[key] = v
+        if len(frame) > TELEMETRY_3006_OUTPUT_FLAG_OFF and frame[TELEMETRY_3006_OUTPUT_FLAG_OFF] in (0, 1):
+            flags["3006"] = frame[TELEMETRY_3006_OUTPUT_FLAG_OFF] == 1
+    elif prefix == b"\x69\x05":
+        for key, off, lo, hi in _FIELDS_6905:
+            v = _f32(frame, off, lo, hi)
+            if v is not None:
+                t[key] = v
+        if len(frame) > 18 and frame[18] in (0, 1):
+            t["powerOnOutput"] = frame[18] == 0
+        if len(frame) > 77 and frame[77] in (0, 1):
+            flags["6905"] = frame[77] == 1
+        if len(frame) > 86 and frame[86] in (0, 1):
+            t["manualControl"] = frame[86] == 1
+        if len(frame) > 87:
+            t["selfStop"] = bool(frame[87] & 0x02)
+            t["twoStageEnabled"] = not frame[87] & 0x04
+        if len(frame) > 88 and frame[88] <= 120:
+            t["softStartSeconds"] = frame[88]
+        if len(frame) > 94 and not t["displayLanguage"]:
+            t["displayLanguage"] = _language(frame[93], frame[94])
+    elif prefix == b"\x0b\x01" and not t["firmwareVersion"]:
+        chars = []
+        for b in frame[2:26]:
+            if b == 0 or b < 0x20 or b > 0x7E:
+                break
+            chars.append(b)
+        if not chars:
+            return False
+        t["firmwareVersion"] = bytes(chars).decode("ascii")
+    else:
+        return False
+    out = flags.get("6905", flags.get("3006"))
+    if out is not None:
+        t["outputEnabled"] = out
+    if t["outputVoltage"] is not None and t["outputCurrent"] is not None:
+        t["outputPowerW"] = t["outputVoltage"] * t["outputCurrent"]
+    return True
+
+
+# --- WebSocket (RFC 6455, server side, no extensions) ---
+
+def ws_accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def ws_frame(payload: bytes, opcode=WS_OP_TEXT) -> bytes:
+    n = len(payload)
+    if n < 126:
+        head = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return head + payload
+
+
+def _unmask(data: bytes, mask: bytes) -> bytes:
+    n = len(data)
+    key = int.from_bytes((mask * (n // 4 + 1))[:n], "big")
+    return (int.from_bytes(data, "big") ^ key).to_bytes(n, "big")
+
+
+async def ws_read_message(reader: asyncio.StreamReader):
+    """(opcode, payload) of the next complete message; control frames are returned as-is."""
+    parts = []
+    first_op = None
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        fin, op = b0 & 0x80, b0 & 0x0F
+        n = b1 & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if n > WS_MAX_MESSAGE:
+            raise ValueError("websocket message too large")
+        mask = await reader.readexactly(4) if b1 & 0x80 else None
+        data = await reader.readexactly(n)
+        if mask is not None:
+            data = _unmask(data, mask)
+        if op >= WS_OP_CLOSE:
+            return op, data
+        if op != WS_OP_CONT:
+            first_op = op
+        parts.append(data)
+        if fin:
+            return first_op, b"".join(parts)
+
+
+class Client:
+    """One WebSocket dashboard with its own latest-value telemetry slot."""
+
+    def __init__(self, bridge, writer: asyncio.StreamWriter, peer: str):
+        self.bridge = bridge
+        self.writer = writer
+        self.peer = peer
+        self._wake = asyncio.Event()
+        self._telemetry_pending = False
+        self._rx = deque(maxlen=RX_RING)
+        self._replies = deque()
+        self.sent = 0
+        self.dropped_telemetry = 0
+        self.dropped_rx = 0
+        self.view = None        # telemetry as this client last received it
+        self.keyframe_at = 0.0
+        self.telemetry_at = 0.0
+        self.closed = False
+
+    def telemetry_changed(self):
+        if self._telemetry_pending:
+            self.dropped_telemetry += 1
+        self._telemetry_pending = True
+        self._wake.set()
+
+    def push_rx(self, msg: bytes):
+        if len(self._rx) == self._rx.maxlen:
+            self.dropped_rx += 1
+        self._rx.append(msg)
+        self._wake.set()
+
+    def push_reply(self, msg: bytes):
+        self._replies.append(msg)
+        self._wake.set()
+
+    async def _send(self, msg: bytes):
+        self.writer.write(ws_frame(msg))
+        self.sent += 1
+
+    async def run_writer(self, send_timeout_s: float):
+        try:
+            while not self.closed:
+                await self._wake.wait()
+                self._wake.clear()
+                while self._replies:
+                    await self._send(self._replies.popleft())
+                while self._rx:
+                    await self._send(self._rx.popleft())
+                if self._telemetry_pending:
+                    self._telemetry_pending = False
+                    msg = self.bridge.telemetry_message(self)
+                    if msg is not None:
+                        await self._send(msg)
+                # Blocks while the socket buffer is full; updates meanwhile only overwrite the slot.
+                await asyncio.wait_for(self.writer.drain(), send_timeout_s)
+        except asyncio.TimeoutError:
+            # close() would wait for the stuck buffer to flush; drop the connection instead.
+            print(f"dashboard {self.peer} stalled for {send_timeout_s:.0f}s; disconnecting")
+            self.writer.transport.abort()
+        except ConnectionError:
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+
+
+class Bridge:
+    def __init__(self, args):
+        self.args = args
+        self.clients = set()
+        self.telemetry = empty_telemetry()
+        self._flags = {}
+        self.seq = 0
+        self.ts = None
+        self.device = {}
+        self.connected = False
+        self.sched = None
+        self.session = None
+        self._conns = set()     # handle_conn tasks, cancelled on shutdown
+        self.acks = AckTracker()
+        self.reasm = FrameReassembler()
+        self.rx_frames = 0
+        self.keyframes = 0
+        self.deltas = 0
+        self.suppressed = 0
+
+    # --- BLE side ---
+
+    def on_notify(self, _sender, data):
+        for frame in self.reasm.feed(data):
+            self.rx_frames += 1
+            self.acks.feed(frame)
+            if apply_frame(self.telemetry, frame, self._flags):
+                self.seq += 1
+                self.ts = time.time()
+                for c in self.clients:
+                    c.telemetry_changed()
+            else:
+                msg = json.dumps({"type": "rx", "hex": frame.hex()}).encode()
+                for c in self.clients:
+                    c.push_rx(msg)
+
+    def telemetry_message(self, client: Client):
+        """Keyframe or delta for this client; None when nothing moved and no heartbeat is due."""
+        now = time.monotonic()
+        if client.view is None or now - client.keyframe_at >= self.args.keyframe_seconds:
+            client.view = dict(self.telemetry)
+            client.keyframe_at = client.telemetry_at = now
+            self.keyframes += 1
+            t = {k: _wire(v) for k, v in self.telemetry.items()}
+            return json.dumps({"type": "telemetry", "seq": self.seq, "ts": self.ts, "key": True, "t": t},
+                              separators=(",", ":")).encode()
+        d = telemetry_delta(client.view, self.telemetry)
+        if not d and now - client.telemetry_at < HEARTBEAT_S:
+            self.suppressed += 1
+            return None
+        for k in d:
+            client.view[k] = self.telemetry[k]
+        client.telemetry_at = now
+        self.deltas += 1
+        return json.dumps({"type": "telemetry", "seq": self.seq, "ts": self.ts, "d": d},
+                          separators=(",", ":")).encode()
+
+    def broadcast_status(self):
+        msg = json.dumps({"type": "status", "connected": self.connected}).encode()
+        for c in self.clients:
+            c.push_reply(msg)
+
+    async def write(self, client: Client, req: dict):
+        rid = req.get("id")
+        try:
+            payload = bytes.fromhex(str(req.get("hex", "")))
+            if not payload:
+                raise ValueError("empty payload")
+        except ValueError as e:
+            client.push_reply(json.dumps({"type": "write_result", "id": rid, "state": "failed", "error": str(e)}).encode())
+            return
+        if self.sched is None or not self.connected:
+            client.push_reply(json.dumps({"type": "write_result", "id": rid, "state": "failed",
+                                          "error": "charger not connected"}).encode())
+            return
+        result = await self.acks.send(self.sched, payload, note=req.get("note") or "bridge")
+        client.push_reply(json.dumps({
+            "type": "write_result",
+            "id": rid,
+            "state": result.state,
+            "status": result.status,
+            "attempts": result.attempts,
+            "rtt_ms": None if result.rtt_s is None else round(result.rtt_s * 1000.0, 1),
+            "error": result.error,
+        }).encode())
+
+    async def run_ble(self):
+        """Keep a charger link up for as long as the server runs."""
+        async def scan():
+            print("Scanning for charger...")
+            try:
+                dev = await charger_ctl.find_charger(self.args.scan_timeout)
+            except asyncio.TimeoutError:
+                return None
+            if dev:
+                print(f"Found: {dev.name} {dev.address}")
+            return dev
+
+        self.session = ChargerSession(
+            find=scan,
+            on_notify=self.on_notify,
+            preferred_tx=UUID_FFE3 if self.args.write_uuid == "FFE3" else UUID_FFE2,
+            kick=(),
+            backoff_max_s=BACKOFF_MAX_S,
+        )
+        failures = 0
+        while True:
+            try:
+                # Only returns by raising: on_link runs until the link drops, and drops reconnect.
+                await self.session.run(self.on_link)
+            except Exception as e:
+                print(f"Connect failed: {e}")
+            failures += 1
+            delay = min(BACKOFF_MAX_S, 2.0 ** min(failures, 5))
+            print(f"Retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+    async def on_link(self, client):
+        cache = self.session.cache
+        self.device = {"name": cache.name, "address": cache.address}
+        self.reasm.reset()  # a frame cut off by a drop can't be completed on the new link
+        self.sched = make_scheduler(client, self.session.tx_uuid, name=cache.address)
+        self.sched.keepalive(1.0)
+        if self.args.poll_seconds > 0:
+            self.sched.poll(self.args.poll_seconds)
+        self.connected = True
+        self.broadcast_status()
+        try:
+            await asyncio.Event().wait()  # until the link drops or we shut down
+        finally:
+            self.connected = False
+            self.broadcast_status()
+            await self.sched.close()
+            self.sched = None
+            print(f"Charger disconnected. telemetry: keyframes={self.keyframes} deltas={self.deltas} "
+                  f"suppressed={self.suppressed}")
+
+    async def close_connections(self):
+        """Cancel and wait for every open HTTP / WebSocket connection (shutdown)."""
+        tasks = list(self._conns)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --- HTTP / WebSocket side ---
+
+    async def handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._conns.add(task)
+        try:
+            await self._handle_conn(reader, writer)
+        except asyncio.CancelledError:
+            # Only close_connections() cancels us; start_server would log a cancelled handler as an error.
+            writer.close()
+        finally:
+            self._conns.discard(task)
+
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = "%s:%s" % (writer.get_extra_info("peername") or ("?", "?"))[:2]
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10.0)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            writer.close()
+            return
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        path = target.split("?", 1)[0]
+
+        if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+            await self._serve_ws(reader, writer, headers, peer)
+            return
+        try:
+            if method != "GET":
+                self._http(writer, 405, b"method not allowed\n", "text/plain")
+            elif path == "/api/telemetry":
+                body = json.dumps({"seq": self.seq, "ts": self.ts, "connected": self.connected,
+                                   "device": self.device, "t": self.telemetry}).encode()
+                self._http(writer, 200, body, "application/json")
+            else:
+                self._serve_static(writer, path)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _http(self, writer, status: int, body: bytes, ctype: str):
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}.get(status, "OK")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+            f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+
+    def _serve_static(self, writer, path: str):
+        rel = path.lstrip("/") or "index.html"
+        f = (FRONTEND_DIR / rel).resolve()
+        if FRONTEND_DIR not in f.parents or not f.is_file():
+            self._http(writer, 404, b"not found\n", "text/plain")
+            return
+        ctype = mimetypes.guess_type(str(f))[0] or "application/octet-stream"
+        self._http(writer, 200, f.read_bytes(), ctype)
+
+    async def _serve_ws(self, reader, writer, headers, peer):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            self._http(writer, 400, b"missing Sec-WebSocket-Key\n", "text/plain")
+            writer.close()
+            return
+        writer.write(
+            ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+             f"Sec-WebSocket-Accept: {ws_accept_key(key)}\r\n\r\n").encode("latin-1")
+        )
+        client = Client(self, writer, peer)
+        self.clients.add(client)
+        print(f"dashboard connected: {peer} ({len(self.clients)} open)")
+        client.push_reply(json.dumps({"type": "hello", "device": self.device, "connected": self.connected,
+                                      "telemetry": "delta"}).encode())
+        if self.seq:
+            client.telemetry_changed()
+        writer_task = asyncio.create_task(client.run_writer(self.args.send_timeout))
+        pending = set()
+        try:
+            while not client.closed:
+                op, data = await ws_read_message(reader)
+                if op == WS_OP_CLOSE:
+                    writer.write(ws_frame(data[:2], WS_OP_CLOSE))
+                    break
+                if op == WS_OP_PING:
+                    writer.write(ws_frame(data, WS_OP_PONG))
+                    continue
+                if op != WS_OP_TEXT:
+                    continue
+                try:
+                    req = json.loads(data)
+                except ValueError:
+                    continue
+                if isinstance(req, dict) and req.get("type") == "write":
+                    task = asyncio.create_task(self.write(client, req))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            client.closed = True
+            client._wake.set()
+            self.clients.discard(client)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(writer_task, *pending, return_exceptions=True)
+            print(f"dashboard closed: {peer} sent={client.sent} dropped_telemetry={client.dropped_telemetry} "
+                  f"dropped_rx={client.dropped_rx} ({len(self.clients)} open)")
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Serve controller/frontend with a shared BLE session over WebSocket.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--scan-timeout", type=float, default=20.0)
+    ap.add_argument("--poll-seconds", type=float, default=5.0,
+                    help="Poll 020101/020404/020505 every N seconds to refresh 0x6905 settings (0 = off)")
+    ap.add_argument("--send-timeout", type=float, default=10.0,
+                    help="Drop a dashboard that can't take a message for this long")
+    ap.add_argument("--keyframe-seconds", type=float, default=10.0,
+                    help="Send every dashboard a full telemetry keyframe this often (deltas in between)")
+    ap.add_argument("--write-uuid", choices=["FFE3", "FFE2"], default="FFE3")
+    charger_sim.add_sim_args(ap)
+    args = ap.parse_args()
+    charger_sim.install_from_args(args, charger_ctl, charger_session)
+
+    if charger_ctl._BLEAK_IMPORT_ERROR is not None:
+        print("Missing dependency 'bleak'. Install with: python3 -m pip install bleak")
+        return 1
+
+    bridge = Bridge(args)
+    server = await asyncio.start_server(bridge.handle_conn, args.host, args.port)
+    print(f"Serving {FRONTEND_DIR} on http://{args.host}:{args.port} (WebSocket /ws)")
+    async with server:
+        try:
+            return await bridge.run_ble()
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            return 0
+        finally:
+            server.close()
+            await bridge.close_connections()
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        pass
@@ -7,27 +7,86 @@ Known working:
 - Connects over BLE
 - Subscribes to FFE2 notifications
 - Sends keepalive 020606 every 1s (same behavior as the app)
+- All writes (keepalive + commands) go through one WriteScheduler
+  (charger_scheduler.py): commands jump ahead of keepalives, writes keep a
+  minimum gap, and keepalives run on fixed deadlines instead of drifting.
 - Sets output current (amps) via: 06 08 <float32 LE> <checksum>
   checksum = sum(bytes[1:]) & 0xFF
+- Reassembles notifications into whole length-prefixed frames
+  (charger_framing.py), so frames split over 20-byte notifications decode.
+- Waits for the 03 <cmd_id> <status> <csum> ack of every command
+  (charger_acks.py), retrying on timeout, and reports the result.
+- Reconnects with backoff when the link drops (charger_session.py). The
+  address and RX/TX UUIDs are cached in --link-cache, so later connects skip
+  the scan; --password [TEXT] also replays auth + startup kick per connect.
 
 Telemetry:
 - Decodes 0x3006 packets into float32 LE values.
 - Strips a 3-byte tail (observed as 41 01 xx) so you don't get garbage floats.
 - Prints a clean dashboard line:
     Vin (AC input volts), Hz (line frequency), T1/T2 (temps), Vout (output/wheel volts)
+- parse_3006_batch() decodes many frames at once into a NumPy structured array
+  for offline analysis (numpy is only needed for that; bleak only for live use).
+
+Storage:
+- --store DIR appends every 0x3006 sample to an on-disk time series (charger_store.py)
+  and keeps 1s / 1m / 1h min/max/mean rollups up to date in the background.
+
+Instrumentation (charger_metrics.py):
+- Always on and cheap: HDR-style histograms of write->ack latency, time inside
+  write_gatt_char, notify-callback duration, gaps between notifications and
+  keepalive jitter.
+- --stats [SECONDS] prints a percentile summary every SECONDS (default 10);
+  --stats-json PATH ('-' = stdout) dumps histograms plus scheduler, ack and
+  reassembler counters as JSON on exit (Ctrl-C included).
+
+Offline:
+- --sim / --sim-replay LOG swap BleakClient/BleakScanner for the simulated
+  charger in charger_sim.py (no radio needed; see its docstring for options).
 
 Usage:
   python3 charger_ctl.py --telemetry
+  python3 charger_ctl.py --telemetry --store ~/r4830_tel
   python3 charger_ctl.py            (interactive: type amps)
   python3 charger_ctl.py --amps 1.0 (non-interactive set amps)
+  python3 charger_ctl.py --sim --telemetry
+  python3 charger_ctl.py --telemetry --stats 5 --stats-json link.json
 """
 
 import argparse
 import asyncio
 import binascii
+import json
+import pathlib
 import struct
 import sys
-from bleak import BleakClient, BleakScanner
+import time
+
+_BACKEND_DIR = pathlib.Path(__file__).resolve().parent / "controller" / "backend"
+if str(_BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(_BACKEND_DIR))
+
+import charger_session  # noqa: E402
+import charger_sim  # noqa: E402
+from charger_acks import AckTracker  # noqa: E402
+from charger_framing import FrameReassembler  # noqa: E402
+from charger_metrics import Metrics  # noqa: E402
+from charger_scheduler import PRIORITY_KEEPALIVE, WriteScheduler  # noqa: E402
+from charger_session import DEFAULT_CACHE_PATH, STARTUP_KICK, ChargerSession, uuid16  # noqa: E402
+from charger_store import TelemetryStore  # noqa: E402
+from r4830_command_tool import encode_control  # noqa: E402
+
+try:
+    from bleak import BleakClient, BleakScanner
+    _BLEAK_IMPORT_ERROR = None
+except Exception as exc:  # env-specific dependency; offline helpers still work
+    BleakClient = BleakScanner = None
+    _BLEAK_IMPORT_ERROR = exc
+
+try:
+    import numpy as np
+except Exception:  # only parse_3006_batch needs it
+    np = None
 
 # --- Fingerprint / GATT ---
 COMPANY_ID = 0x6666
@@ -38,7 +97,23 @@ UUID_FFE3 = "0000ffe3-0000-1000-8000-00805f9b34fb"  # write
 
 # --- Observed protocol ---
 KEEPALIVE = bytes.fromhex("020606")  # app sends constantly
-ACK_OK = bytes.fromhex("03080109")   # common ACK after commands (observed)
+ACK_OK = bytes.fromhex("03080109")   # ACK for cmd 0x08 (set amps); see charger_acks for the general form
+
+# 0x3006 telemetry frame: 30 06 <9 x float32 LE> <u8 output flag> ... <checksum>, 49 bytes total.
+# Offsets match the field mapping used by controller/frontend/app.js.
+TELEMETRY_3006_LEN = 49
+TELEMETRY_3006_FIELDS = (
+    ("vin", 2),    # AC input volts
+    ("iin", 6),    # input amps
+    ("hz", 10),    # line frequency
+    ("t1", 14),    # temp 1 (C)
+    ("t2", 18),    # temp 2 (C)
+    ("vout", 22),  # output volts
+    ("iout", 26),  # output amps
+    ("pin", 30),   # input watts
+    ("eff", 34),   # efficiency %
+)
+TELEMETRY_3006_OUTPUT_FLAG_OFF = 38
 
 
 def hx(b: bytes) -> str:
@@ -51,11 +126,13 @@ def checksum_sum_from_2nd_byte(payload_without_checksum: bytes) -> int:
 
 
 def build_set_amps(amps: float) -> bytes:
-    # 06 08 <float32 little-endian> <checksum>
-    f = struct.pack("<f", float(amps))
-    base = bytes([0x06, 0x08]) + f
-    csum = checksum_sum_from_2nd_byte(base)
-    return base + bytes([csum])
+    # 06 08 <float32 little-endian> <checksum>, from r4830_command_tool's frame table / LRU
+    return encode_control("output_current_set", amps)
+
+
+def build_set_volts(volts: float) -> bytes:
+    # 06 07 <float32 little-endian> <checksum>, from r4830_command_tool's frame table / LRU
+    return encode_control("output_voltage_set", volts)
 
 
 def parse_3006(data: bytes):
@@ -88,14 +165,70 @@ def parse_3006(data: bytes):
     return floats, tail
 
 
+def telemetry_3006_dtype():
+    """Structured dtype overlaying one 49-byte 0x3006 frame (numpy required)."""
+    names = [name for name, _ in TELEMETRY_3006_FIELDS] + ["output_flag"]
+    formats = ["<f4"] * len(TELEMETRY_3006_FIELDS) + ["u1"]
+    offsets = [off for _, off in TELEMETRY_3006_FIELDS] + [TELEMETRY_3006_OUTPUT_FLAG_OFF]
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets,
+                     "itemsize": TELEMETRY_3006_LEN})
+
+
+def parse_3006_batch(frames):
+    """
+    Batch decoder for many 0x3006 frames (e.g. a day of logged telemetry).
+
+    Frames of the wrong length are dropped up front; the rest are joined once,
+    prefix (30 06) and checksum (sum(bytes[1:-1]) & 0xFF == last byte) are checked
+    on the whole uint8 matrix, and all fields come out of a single np.frombuffer
+    with a structured dtype.
+
+    Returns (records, index): records is a structured array with fields
+    vin, iin, hz, t1, t2, vout, iout, pin, eff (float32) and output_flag (u8);
+    index holds the position in `frames` of each accepted record.
+    """
+    if np is None:
+        raise RuntimeError("parse_3006_batch needs numpy (python3 -m pip install numpy)")
+    frames = list(frames)
+    index = np.fromiter((i for i, f in enumerate(frames) if len(f) == TELEMETRY_3006_LEN), dtype=np.int64)
+    blob = b"".join(bytes(frames[i]) for i in index)
+    raw = np.frombuffer(blob, dtype=np.uint8).reshape(-1, TELEMETRY_3006_LEN)
+    ok = (raw[:, 0] == 0x30) & (raw[:, 1] == 0x06)
+    ok &= (raw[:, 1:-1].sum(axis=1, dtype=np.uint32) & 0xFF) == raw[:, -1]
+    records = np.frombuffer(blob, dtype=telemetry_3006_dtype())
+    return records[ok], index[ok]
+
+
+def format_tel_line(floats, tail) -> str:
+    # Current working mapping (confirmed by unplug test + behavior):
+    vin = floats[0] if len(floats) > 0 else None  # ~122V
+    hz = floats[2] if len(floats) > 2 else None   # ~59.95Hz
+    t1 = floats[3] if len(floats) > 3 else None   # ~21-23C
+    t2 = floats[4] if len(floats) > 4 else None   # ~26C
+    vout = floats[5] if len(floats) > 5 else None # wheel/output volts (drops when unplugged)
+
+    parts = []
+    if vin is not None: parts.append(f"Vin={vin:.1f}V")
+    if hz is not None:  parts.append(f"Hz={hz:.2f}")
+    if t1 is not None:  parts.append(f"T1={t1:.1f}C")
+    if t2 is not None:  parts.append(f"T2={t2:.1f}C")
+    if vout is not None:parts.append(f"Vout={vout:.2f}V")
+
+    return "  ".join(parts) + f" tail={hx(tail)}"
+
+
+def is_charger_adv(adv) -> bool:
+    mfg = adv.manufacturer_data or {}
+    return COMPANY_ID in mfg and bytes(mfg[COMPANY_ID]).startswith(PREFIX)
+
+
 async def find_charger(timeout=20):
     dev = None
     evt = asyncio.Event()
 
     def cb(device, adv):
         nonlocal dev
-        mfg = adv.manufacturer_data or {}
-        if COMPANY_ID in mfg and bytes(mfg[COMPANY_ID]).startswith(PREFIX):
+        if is_charger_adv(adv):
             dev = device
             evt.set()
 
@@ -108,13 +241,106 @@ async def find_charger(timeout=20):
     return dev
 
 
-async def keepalive_loop(client: BleakClient, write_uuid: str, interval=1.0):
-    while client.is_connected:
+async def select_write_uuid(client: BleakClient, prefer="FFE3"):
+    """Probe the preferred write characteristic with a keepalive; fall back to the other one.
+
+    Returns (write_uuid, fell_back).
+    """
+    preferred = UUID_FFE3 if prefer == "FFE3" else UUID_FFE2
+    fallback = UUID_FFE2 if preferred == UUID_FFE3 else UUID_FFE3
+    try:
+        await client.write_gatt_char(preferred, KEEPALIVE, response=False)
+        return preferred, False
+    except Exception:
+        await client.write_gatt_char(fallback, KEEPALIVE, response=False)
+        return fallback, True
+
+
+def make_scheduler(client: BleakClient, write_uuid: str, min_gap_s=0.02, name="", on_write=None) -> WriteScheduler:
+    async def write(payload):
+        await client.write_gatt_char(write_uuid, payload, response=False)
+
+    return WriteScheduler(write, min_gap_s=min_gap_s, name=name, on_write=on_write).start()
+
+
+async def rollup_loop(store: TelemetryStore, interval=10.0):
+    # Raw appends happen on the loop; rollups only read flushed records, so they can run in a thread.
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        store.flush()
+        fut = loop.run_in_executor(None, store.roll_up)
         try:
-            await client.write_gatt_char(write_uuid, KEEPALIVE, response=False)
-        except Exception:
-            pass
+            await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            # Cancelling doesn't stop the worker thread; wait it out so close() never races it.
+            await fut
+            raise
+
+
+async def stats_loop(metrics: Metrics, link: dict, acks: AckTracker, reasm: FrameReassembler, session: ChargerSession,
+                     interval=10.0):
+    while True:
         await asyncio.sleep(interval)
+        for line in metrics.summary_lines():
+            print("[STATS]", line)
+        a = acks.stats()
+        sched = link["sched"]
+        print(
+            f"[STATS] acks ok={a['acked']} rejected={a['rejected']} timeouts={a['timeouts']} retries={a['retries']}"
+            f"  writes err={sched.errors} missed_ticks={sched.missed_ticks}  rx resyncs={reasm.resyncs}"
+            f"  link drops={session.drops} last_connect_ms={session.stats()['last_connect_ms']}"
+        )
+
+
+def write_stats_json(path: str, metrics: Metrics, link: dict, acks: AckTracker, reasm: FrameReassembler,
+                     session: ChargerSession):
+    dump = metrics.as_dict()
+    dump["scheduler"] = link["sched"].stats()  # current (or last) connection's scheduler
+    dump["acks"] = acks.stats()
+    dump["reassembler"] = reasm.stats()
+    dump["session"] = session.stats()
+    text = json.dumps(dump, indent=2)
+    if path == "-":
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        print(f"Stats written to {path}")
+
+
+async def run_commands(args, send_amps):
+    # Non-interactive: set amps once and keep running
+    if args.amps is not None:
+        await send_amps(args.amps)
+        # stay alive for telemetry
+        try:
+            while True:
+                await asyncio.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Interactive mode
+    if not sys.stdin.isatty():
+        print("stdin is not interactive; exiting.")
+        return
+    print("Type amps (e.g. 0.5, 1, 5) or 'quit'")
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            s = await loop.run_in_executor(None, input, "amps> ")
+            s = s.strip().lower()
+            if s in ("q", "quit", "exit"):
+                break
+            try:
+                amps = float(s)
+            except ValueError:
+                print("Enter a number like 0.5 or 5, or 'quit'.")
+                continue
+            await send_amps(amps)
+    except KeyboardInterrupt:
+        pass
 
 
 async def main():
@@ -125,122 +351,161 @@ async def main():
     ap.add_argument("--no-keepalive", action="store_true", help="Disable keepalive loop (not recommended)")
     ap.add_argument("--write-uuid", choices=["FFE3", "FFE2"], default="FFE3",
                     help="Preferred write characteristic (default FFE3). If it fails, auto-fallback occurs.")
+    ap.add_argument("--store", metavar="DIR", help="Append 0x3006 telemetry to a time-series store in DIR")
+    ap.add_argument("--stats", type=float, nargs="?", const=10.0, metavar="SECONDS",
+                    help="Print latency/jitter percentiles every SECONDS (default 10)")
+    ap.add_argument("--stats-json", metavar="PATH", help="Write histograms and link counters as JSON on exit ('-' = stdout)")
+    ap.add_argument("--password", nargs="?", const="", metavar="TEXT",
+                    help="Send the auth frame (blank if no TEXT) and the startup kick after every connect")
+    ap.add_argument("--no-reconnect", action="store_true", help="Exit when the link drops instead of reconnecting")
+    ap.add_argument("--link-cache", default=str(DEFAULT_CACHE_PATH), metavar="PATH",
+                    help="Remember the charger address/UUIDs here to skip the scan next time")
+    ap.add_argument("--no-link-cache", action="store_true", help="Always scan; don't read or write the link cache")
+    charger_sim.add_sim_args(ap)
     args = ap.parse_args()
+    sim = charger_sim.install_from_args(args, sys.modules[__name__], charger_session)
 
-    print("Scanning for charger... (disconnect Alipay/LightBlue)")
-    dev = await find_charger()
-    if not dev:
-        print("Not found (ensure charger is on and advertising, and no other app is connected).")
-        return 2
+    if _BLEAK_IMPORT_ERROR is not None:
+        print("Missing dependency 'bleak'. Install with: python3 -m pip install bleak")
+        return 1
 
-    print(f"Found: {dev.name} {dev.address}")
+    store = TelemetryStore(args.store) if args.store else None
+    acks = AckTracker()
+    reasm = FrameReassembler()
+    metrics = Metrics(keepalive_interval_s=1.0)
 
-    async with BleakClient(dev.address) as client:
-        print("Connected:", client.is_connected)
+    def on_frame(b):
+        is_ack = acks.feed(b)
 
-        # Notification handler
-        def on_notify(sender, data):
-            b = bytes(data)
-
-            if args.telemetry:
-                parsed = parse_3006(b)
-                if parsed:
-                    floats, tail = parsed
-
-                    # Current working mapping (confirmed by unplug test + behavior):
-                    vin = floats[0] if len(floats) > 0 else None  # ~122V
-                    hz = floats[2] if len(floats) > 2 else None   # ~59.95Hz
-                    t1 = floats[3] if len(floats) > 3 else None   # ~21-23C
-                    t2 = floats[4] if len(floats) > 4 else None   # ~26C
-                    vout = floats[5] if len(floats) > 5 else None # wheel/output volts (drops when unplugged)
-
-                    parts = []
-                    if vin is not None: parts.append(f"Vin={vin:.1f}V")
-                    if hz is not None:  parts.append(f"Hz={hz:.2f}")
-                    if t1 is not None:  parts.append(f"T1={t1:.1f}C")
-                    if t2 is not None:  parts.append(f"T2={t2:.1f}C")
-                    if vout is not None:parts.append(f"Vout={vout:.2f}V")
-
-                    print("[TEL]", "  ".join(parts), f"tail={hx(tail)}")
-                    return
-
-            if args.raw:
-                if b == ACK_OK:
-                    print("[RX ACK]", hx(b))
-                else:
-                    print("[RX]", hx(b))
-
-        # Subscribe to notifications
-        try:
-            await client.start_notify(UUID_FFE2, on_notify)
-            print("Notify ON (FFE2).")
-        except Exception as e:
-            print("Notify subscribe failed:", e)
-            return 3
+        if store is not None:
+            store.append_3006(b)
 
-        # Choose write channel: preferred + auto fallback
-        preferred = UUID_FFE3 if args.write_uuid == "FFE3" else UUID_FFE2
-        fallback = UUID_FFE2 if preferred == UUID_FFE3 else UUID_FFE3
-        write_uuid = preferred
+        if args.telemetry:
+            parsed = parse_3006(b)
+            if parsed:
+                print("[TEL]", format_tel_line(*parsed))
+                return
+
+        if args.raw:
+            if is_ack:
+                print("[RX ACK]", hx(b))
+            else:
+                print("[RX]", hx(b))
+
+    # Notification handler
+    def on_notify(sender, data):
+        t0 = time.perf_counter()
+        for frame in reasm.feed(data):
+            on_frame(frame)
+        metrics.notify(t0, time.perf_counter())
+
+    def on_write(payload, note, priority, latency_s, error):
+        if error is None:
+            metrics.record("write", latency_s)
+            if priority == PRIORITY_KEEPALIVE:
+                metrics.keepalive_written(time.perf_counter())
+
+    async def scan():
+        print("Scanning for charger... (disconnect Alipay/LightBlue)")
         try:
-            await client.write_gatt_char(write_uuid, KEEPALIVE, response=False)
-            print("Write channel:", "FFE3" if write_uuid == UUID_FFE3 else "FFE2")
-        except Exception:
-            write_uuid = fallback
-            await client.write_gatt_char(write_uuid, KEEPALIVE, response=False)
-            print("Write channel:", "FFE3" if write_uuid == UUID_FFE3 else "FFE2", "(fallback)")
-
-        # Keepalive task
-        ka_task = None
+            dev = await find_charger()
+        except asyncio.TimeoutError:
+            return None
+        if dev:
+            print(f"Found: {dev.name} {dev.address}")
+        return dev
+
+    # Connect / subscribe / auth+kick, and reconnect on drops (charger_session.py)
+    session = ChargerSession(
+        find=scan,
+        on_notify=on_notify,
+        cache_path=None if (sim or args.no_link_cache) else args.link_cache,
+        preferred_tx=UUID_FFE3 if args.write_uuid == "FFE3" else UUID_FFE2,
+        password=args.password,
+        kick=STARTUP_KICK if args.password is not None else (),
+        reconnect=not args.no_reconnect,
+    )
+    link = {}
+    linked = asyncio.Event()
+
+    async def on_link(client):
+        print("Connected:", client.is_connected)
+        metrics.link_reset()
+        # Write channel: the TX characteristic the session resolved (and cached) and handshook on
+        write_uuid = session.tx_uuid
+        channel = uuid16(write_uuid).upper()
+        print("Write channel:", channel + ("" if channel == args.write_uuid else " (fallback)"))
+
+        # Write scheduler (+ keepalive job)
+        sched = make_scheduler(client, write_uuid, name=client.address, on_write=on_write)
         if not args.no_keepalive:
-            ka_task = asyncio.create_task(keepalive_loop(client, write_uuid, interval=1.0))
+            sched.keepalive(1.0)
             print("Keepalive ON (020606 every 1s).")
-
-        # Non-interactive: set amps once and keep running
-        if args.amps is not None:
-            pkt = build_set_amps(args.amps)
-            await client.write_gatt_char(write_uuid, pkt, response=False)
-            print(f"Sent amps={args.amps}  pkt={hx(pkt)}")
-            # stay alive for telemetry
-            try:
-                while True:
-                    await asyncio.sleep(1)
-            except KeyboardInterrupt:
-                pass
-        else:
-            # Interactive mode
-            if not sys.stdin.isatty():
-                print("stdin is not interactive; exiting.")
-            else:
-                print("Type amps (e.g. 0.5, 1, 5) or 'quit'")
-                loop = asyncio.get_running_loop()
-                try:
-                    while True:
-                        s = await loop.run_in_executor(None, input, "amps> ")
-                        s = s.strip().lower()
-                        if s in ("q", "quit", "exit"):
-                            break
-                        try:
-                            amps = float(s)
-                        except ValueError:
-                            print("Enter a number like 0.5 or 5, or 'quit'.")
-                            continue
-                        pkt = build_set_amps(amps)
-                        await client.write_gatt_char(write_uuid, pkt, response=False)
-                        print(f"Sent amps={amps}  pkt={hx(pkt)}")
-                except KeyboardInterrupt:
-                    pass
-
-        # Cleanup
-        if ka_task:
-            ka_task.cancel()
+        link["sched"] = sched
+        linked.set()
         try:
-            await client.stop_notify(UUID_FFE2)
-        except Exception:
-            pass
-        print("Done.")
-    return 0
+            await asyncio.Event().wait()  # until the link drops or we shut down
+        finally:
+            linked.clear()
+            reasm.reset()  # a frame cut off by the drop can't be completed on the next link
+            await sched.close()
+            if sched.errors:
+                print(f"Write errors: {sched.errors} (last: {sched.last_error})")
+
+    async def send_amps(amps):
+        pkt = build_set_amps(amps)
+        await linked.wait()
+        result = await acks.send(link["sched"], pkt, note="amps")
+        metrics.record("write_ack", result.rtt_s)
+        print(f"Sent amps={amps}  pkt={hx(pkt)}  {result.describe()}")
+
+    session_task = asyncio.create_task(session.run(on_link))
+    first_link = asyncio.create_task(linked.wait())
+    await asyncio.wait({session_task, first_link}, return_when=asyncio.FIRST_COMPLETED)
+    first_link.cancel()
+    if session_task.done():
+        try:
+            session_task.result()
+        except Exception as e:
+            print(f"Connect failed: {e}")
+        print("Not found (ensure charger is on and advertising, and no other app is connected).")
+        return 2
+
+    rollup_task = None
+    if store is not None:
+        rollup_task = asyncio.create_task(rollup_loop(store))
+        print(f"Storing telemetry in {store.path}")
+
+    stats_task = None
+    if args.stats:
+        stats_task = asyncio.create_task(stats_loop(metrics, link, acks, reasm, session, args.stats))
 
+    commands = asyncio.create_task(run_commands(args, send_amps))
+    try:
+        await asyncio.wait({session_task, commands}, return_when=asyncio.FIRST_COMPLETED)
+        if session_task.done() and not session_task.cancelled() and session_task.exception():
+            print(f"Session ended: {session_task.exception()}")
+    finally:
+        tasks = [t for t in (commands, session_task, stats_task, rollup_task) if t]
+        for task in tasks:
+            task.cancel()
+        # Let the rollup pass (which may be mid-roll_up in a worker thread) finish before closing the store.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if store is not None:
+            store.close()
+        if args.stats:
+            for line in metrics.summary_lines():
+                print("[STATS]", line)
+        if args.stats_json:
+            write_stats_json(args.stats_json, metrics, link, acks, reasm, session)
+
+    # Cleanup
+    if reasm.resyncs:
+        print(f"RX resyncs: {reasm.resyncs} ({reasm.dropped_bytes} bytes dropped)")
+    if session.drops:
+        print(f"Link drops: {session.drops} (reconnects: {session.connects - 1})")
+    print("Done.")
+    return 0
 
 if __name__ == "__main__":
     raise SystemExit(asyncio.run(main()))
\ No newline at end of file
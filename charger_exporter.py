@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+charger_exporter.py — Prometheus / OpenMetrics endpoint for one charger.
+
+Holds a charger session the same way charger_ctl does (scheduler with
+keepalive and settings poll, frame reassembler, charger_metrics histograms),
+decodes 0x3006 / 0x6905 with the bridge's apply_frame, and serves the result
+as Prometheus text exposition at /metrics. The exporter is read-only: it
+writes keepalives and polls, never a 0x05 / 0x06 command, so there is no ack
+round trip to report.
+
+  gauges     charger_up, charger_info{name,address,firmware},
+             input/output volts, amps and watts, line frequency, temperatures,
+             efficiency, throttling, output enabled, set-points (from 0x6905),
+             charger_last_telemetry_timestamp_seconds
+  counters   charger_rx_frames_total{type}, charger_rx_bytes_total,
+             charger_rx_checksum_failures_total (reassembler resyncs),
+             charger_rx_dropped_bytes_total, charger_write_errors_total,
+             charger_keepalive_missed_ticks_total, charger_reconnects_total
+  summaries  charger_notify_gap_seconds, charger_keepalive_jitter_seconds
+             (quantiles from the HDR histograms)
+
+Rendering is cached: the body is built at most once per --cache-seconds
+(default 5, match it to the scrape interval) and every scrape in between gets
+the same bytes, so however many Prometheus servers poll, the BLE event loop
+only pays for one render per interval. Counters survive reconnects; when the
+link drops the exporter rescans with exponential backoff and charger_up
+reads 0 meanwhile.
+
+Usage:
+  python3 charger_exporter.py                          (http://127.0.0.1:9487/metrics)
+  python3 charger_exporter.py --host 0.0.0.0 --port 9487 --cache-seconds 15
+  python3 charger_exporter.py --sim --sim-telemetry-hz 10
+"""
+
+import argparse
+import asyncio
+import time
+
+import charger_ctl
+import charger_sim
+from charger_acks import parse_ack
+from charger_bridge import apply_frame, empty_telemetry
+from charger_ctl import UUID_FFE2, make_scheduler, select_write_uuid
+from charger_framing import FrameReassembler
+from charger_metrics import Metrics
+from charger_scheduler import PRIORITY_KEEPALIVE
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+BACKOFF_MAX_S = 30.0
+QUANTILES = (0.5, 0.9, 0.99)
+
+# (metric name, telemetry key, help) — gauges read from the decoded telemetry dict
+GAUGES = (
+    ("charger_input_voltage_volts", "inputVoltage", "AC input voltage"),
+    ("charger_input_current_amps", "inputCurrent", "AC input current"),
+    ("charger_input_frequency_hertz", "inputFrequencyHz", "AC line frequency"),
+    ("charger_input_power_watts", "inputPowerW", "Input power"),
+    ("charger_output_voltage_volts", "outputVoltage", "Output voltage"),
+    ("charger_output_current_amps", "outputCurrent", "Output current"),
+    ("charger_output_power_watts", "outputPowerW", "Output power (Vout * Iout)"),
+    ("charger_efficiency_percent", "efficiencyPercent", "Conversion efficiency"),
+    ("charger_throttling_percent", "throttlingPercent", "Throttling"),
+    ("charger_output_set_voltage_volts", "outputSetVoltage", "Output voltage set-point (0x6905)"),
+    ("charger_output_set_current_amps", "outputSetCurrent", "Output current set-point (0x6905)"),
+    ("charger_output_enabled", "outputEnabled", "1 if the output is switched on"),
+)
+TEMPERATURES = (("1", "temperatureC"), ("2", "temperature2C"))
+FRAME_TYPES = {b"\x30\x06": "telemetry", b"\x69\x05": "settings", b"\x0b\x01": "firmware", b"\x12\x04": "info"}
+SUMMARIES = (
+    ("charger_notify_gap_seconds", "notify_gap", "Time between FFE2 notifications"),
+    ("charger_keepalive_jitter_seconds", "keepalive_jitter", "Deviation of keepalive spacing from 1s"),
+)
+
+
+def _label(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(v) -> str:
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Exporter:
+    def __init__(self, args):
+        self.args = args
+        self.telemetry = empty_telemetry()
+        self._flags = {}
+        self.ts = None
+        self.device = {}
+        self.connected = False
+        self.reasm = FrameReassembler()
+        self.metrics = Metrics(keepalive_interval_s=1.0)
+        self.rx_frames = {t: 0 for t in (*FRAME_TYPES.values(), "ack", "other")}
+        self.write_errors = 0
+        self.missed_ticks = 0  # from finished sessions; the live scheduler adds its own
+        self._sched = None
+        self.reconnects = 0
+        self.scrapes = 0
+        self.renders = 0
+        self._body = b""
+        self._rendered_at = None
+
+    # --- BLE side ---
+
+    def on_notify(self, _sender, data):
+        t0 = time.perf_counter()
+        for frame in self.reasm.feed(data):
+            if parse_ack(frame) is not None:
+                self.rx_frames["ack"] += 1
+                continue
+            self.rx_frames[FRAME_TYPES.get(frame[:2], "other")] += 1
+            if apply_frame(self.telemetry, frame, self._flags) and frame[:2] == b"\x30\x06":
+                self.ts = time.time()
+        self.metrics.notify(t0, time.perf_counter())
+
+    def on_write(self, payload, note, priority, latency_s, error):
+        if error is not None:
+            self.write_errors += 1
+            return
+        self.metrics.record("write", latency_s)
+        if priority == PRIORITY_KEEPALIVE:
+            self.metrics.keepalive_written(time.perf_counter())
+
+    async def session(self):
+        """One connect -> stream -> disconnect cycle; returns False if no charger was found."""
+        try:
+            dev = await charger_ctl.find_charger(self.args.scan_timeout)
+        except asyncio.TimeoutError:
+            dev = None
+        if not dev:
+            return False
+        self.device = {"name": dev.name, "address": dev.address}
+        print(f"Found: {dev.name} {dev.address}")
+        async with charger_ctl.BleakClient(dev.address) as client:
+            self.reasm.reset()
+            self.metrics.link_reset()
+            await client.start_notify(UUID_FFE2, self.on_notify)
+            write_uuid, _ = await select_write_uuid(client, self.args.write_uuid)
+            sched = make_scheduler(client, write_uuid, name=dev.address, on_write=self.on_write)
+            self._sched = sched
+            sched.keepalive(1.0)
+            if self.args.poll_seconds > 0:
+                sched.poll(self.args.poll_seconds)
+            self.connected = True
+            try:
+                while client.is_connected:
+                    await asyncio.sleep(1.0)
+            finally:
+                self.connected = False
+                self.missed_ticks += sched.missed_ticks
+                self._sched = None
+                await sched.close()
+        return True
+
+    async def run_ble(self):
+        failures = 0
+        while True:
+            print("Scanning for charger...")
+            try:
+                found = await self.session()
+            except Exception as e:  # link errors from bleak: back off and rescan
+                print(f"Session error: {e}")
+                found = False
+            if found:
+                failures = 0
+                print("Charger disconnected.")
+            else:
+                failures += 1
+            if self.args.once:
+                return 0 if found else 2
+            self.reconnects += 1
+            delay = min(BACKOFF_MAX_S, 2.0 ** min(failures, 5))
+            print(f"Reconnecting in {delay:.0f}s")
+            await asyncio.sleep(delay)
+
+    # --- exposition ---
+
+    def render(self) -> bytes:
+        """The /metrics body, rebuilt at most once per --cache-seconds."""
+        now = time.monotonic()
+        if self._rendered_at is not None and now - self._rendered_at < self.args.cache_seconds:
+            return self._body
+        self._rendered_at = now
+        self.renders += 1
+        out = []
+
+        def metric(name, kind, help_text, samples):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lbl = ",".join(f'{k}="{_label(v)}"' for k, v in labels)
+                out.append(f"{name}{{{lbl}}} {_num(value)}" if lbl else f"{name} {_num(value)}")
+
+        t = self.telemetry
+        metric("charger_up", "gauge", "1 while the BLE link is up", [((), self.connected)])
+        if self.device:
+            info = (*self.device.items(), ("firmware", t["firmwareVersion"] or ""))
+            metric("charger_info", "gauge", "Charger identity", [(info, 1)])
+        for name, key, help_text in GAUGES:
+            metric(name, "gauge", help_text, [((), t[key])])
+        metric("charger_temperature_celsius", "gauge", "Internal temperatures",
+               [((("sensor", s),), t[key]) for s, key in TEMPERATURES])
+        metric("charger_last_telemetry_timestamp_seconds", "gauge", "Unix time of the last 0x3006 frame",
+               [((), self.ts)])
+
+        metric("charger_rx_frames_total", "counter", "Checksum-valid RX frames by type",
+               [((("type", k),), n) for k, n in self.rx_frames.items()])
+        metric("charger_rx_bytes_total", "counter", "Notification bytes received", [((), self.reasm.bytes_in)])
+        metric("charger_rx_checksum_failures_total", "counter", "Frames dropped for a bad checksum or length byte",
+               [((), self.reasm.resyncs)])
+        metric("charger_rx_dropped_bytes_total", "counter", "Bytes skipped while resyncing",
+               [((), self.reasm.dropped_bytes)])
+        metric("charger_write_errors_total", "counter", "Failed GATT writes", [((), self.write_errors)])
+        metric("charger_keepalive_missed_ticks_total", "counter", "Keepalive deadlines skipped",
+               [((), self.missed_ticks + (self._sched.missed_ticks if self._sched else 0))])
+        metric("charger_reconnects_total", "counter", "Rescans after a lost or failed session", [((), self.reconnects)])
+
+        for name, key, help_text in SUMMARIES:
+            h = self.metrics.hist[key]
+            samples = [((("quantile", f"{q:g}"),), h.percentile_us(q * 100.0) / 1e6) for q in QUANTILES] if h.count else []
+            metric(name, "summary", help_text, samples)
+            out.append(f"{name}_sum {_num(h.total_us / 1e6)}")
+            out.append(f"{name}_count {h.count}")
+
+        metric("charger_exporter_renders_total", "counter", "Times the /metrics body was rebuilt", [((), self.renders)])
+        self._body = ("\n".join(out) + "\n").encode()
+        return self._body
+
+    # --- HTTP side ---
+
+    async def handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10.0)
+            method, target, _ = head.decode("latin-1").split("\r\n", 1)[0].split(" ", 2)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError,
+                ValueError):
+            writer.close()
+            return
+        path = target.split("?", 1)[0]
+        try:
+            if method != "GET":
+                self._http(writer, 405, b"method not allowed\n", "text/plain")
+            elif path == "/metrics":
+                self.scrapes += 1
+                self._http(writer, 200, self.render(), CONTENT_TYPE)
+            elif path == "/":
+                self._http(writer, 200, b'<a href="/metrics">/metrics</a>\n', "text/html")
+            else:
+                self._http(writer, 404, b"not found\n", "text/plain")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _http(self, writer, status: int, body: bytes, ctype: str):
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed"}.get(status, "OK")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Expose charger telemetry and link health for Prometheus.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=9487)
+    ap.add_argument("--cache-seconds", type=float, default=5.0,
+                    help="Reuse the rendered /metrics body this long (set to the scrape interval)")
+    ap.add_argument("--scan-timeout", type=float, default=20.0)
+    ap.add_argument("--poll-seconds", type=float, default=30.0,
+                    help="Poll 020101/020404/020505 every N seconds to refresh set-points (0 = off)")
+    ap.add_argument("--write-uuid", choices=["FFE3", "FFE2"], default="FFE3")
+    ap.add_argument("--once", action="store_true", help="Exit when the first session ends instead of reconnecting")
+    charger_sim.add_sim_args(ap)
+    args = ap.parse_args()
+    charger_sim.install_from_args(args, charger_ctl)
+
+    if charger_ctl._BLEAK_IMPORT_ERROR is not None:
+        print("Missing dependency 'bleak'. Install with: python3 -m pip install bleak")
+        return 1
+
+    exporter = Exporter(args)
+    server = await asyncio.start_server(exporter.handle_conn, args.host, args.port)
+    print(f"Serving metrics on http://{args.host}:{args.port}/metrics")
+    async with server:
+        try:
+            return await exporter.run_ble()
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+charger_fleet.py — drive a rack of R4830 chargers from one asyncio loop.
+
+Builds on charger_ctl.py:
+- Discovers every charger advertising company_id=0x6666 with prefix "hwcdq"
+  during the scan window (charger_ctl.find_charger stops at the first one).
+- Holds one BleakClient session per unit, all in the same event loop.
+- One shared keepalive clock for the whole fleet. Each unit gets its own
+  slot inside the interval (interval / N apart), so the adapter sees an even
+  trickle of 020606 writes instead of N writes at once. Keepalives go into
+  each unit's WriteScheduler (charger_scheduler.py) at keepalive priority,
+  so a queued command for that unit always goes out first.
+- Fans amps / volts commands out to all units or a chosen subset; the writes
+  for different units run concurrently, so adding units doesn't add latency
+  to the others (up to what the adapter can carry). A unit only counts as
+  done once its 03 ack for the command has come back (charger_acks.py).
+
+Usage:
+  python3 charger_fleet.py --list
+  python3 charger_fleet.py --telemetry
+  python3 charger_fleet.py --amps 2.0 --units 1,3
+  python3 charger_fleet.py            (interactive: "amps 2", "volts 150 @1,2", "list", "quit")
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import charger_ctl
+import charger_sim
+from charger_ctl import (
+    KEEPALIVE,
+    UUID_FFE2,
+    build_set_amps,
+    build_set_volts,
+    format_tel_line,
+    hx,
+    is_charger_adv,
+    make_scheduler,
+    parse_3006,
+    select_write_uuid,
+)
+from charger_acks import AckTracker
+from charger_framing import FrameReassembler
+from charger_scheduler import PRIORITY_KEEPALIVE
+
+
+async def discover_chargers(timeout=10.0, limit=None):
+    """Scan for the whole window (or until `limit` units) and return every matching device."""
+    found = {}
+    evt = asyncio.Event()
+
+    def cb(device, adv):
+        if is_charger_adv(adv) and device.address not in found:
+            found[device.address] = device
+            if limit and len(found) >= limit:
+                evt.set()
+
+    scanner = charger_ctl.BleakScanner(cb)
+    await scanner.start()
+    try:
+        await asyncio.wait_for(evt.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        await scanner.stop()
+    # Stable numbering across runs: order by address.
+    return [found[a] for a in sorted(found)]
+
+
+class Unit:
+    """One connected charger."""
+
+    def __init__(self, index: int, device):
+        self.index = index
+        self.device = device
+        self.name = device.name or "unknown"
+        self.address = device.address
+        self.client = None
+        self.write_uuid = None
+        self.scheduler = None
+        self.acks = AckTracker()
+        self.reasm = FrameReassembler()
+        self.last_ack = None
+        self.writes = 0
+        self.write_errors = 0
+        self.last_ack_ms = None
+        self.rx_frames = 0
+        self.last_tel = None
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None and self.client.is_connected
+
+    async def write(self, pkt: bytes) -> bool:
+        """Send a command through this unit's scheduler and wait for its ack."""
+        result = await self.acks.send(self.scheduler, pkt)
+        self.last_ack = result
+        if result.state == "write_failed":
+            self.write_errors += 1
+            return False
+        self.writes += result.attempts
+        if result.rtt_s is not None:
+            self.last_ack_ms = result.rtt_s * 1000.0
+        return result.ok
+
+    def label(self) -> str:
+        return f"u{self.index} {self.name} {self.address}"
+
+
+class Fleet:
+    def __init__(self, args):
+        self.args = args
+        self.units = []
+
+    async def _connect_unit(self, unit: Unit):
+        client = charger_ctl.BleakClient(unit.address)
+        await client.connect()
+        unit.client = client
+
+        def on_frame(b):
+            unit.rx_frames += 1
+            if unit.acks.feed(b):
+                return
+            parsed = parse_3006(b)
+            if parsed:
+                unit.last_tel = parsed
+                if self.args.telemetry:
+                    print(f"[TEL u{unit.index}]", format_tel_line(*parsed))
+                return
+            if self.args.raw:
+                print(f"[RX u{unit.index}]", hx(b))
+
+        def on_notify(sender, data):
+            for frame in unit.reasm.feed(data):
+                on_frame(frame)
+
+        await client.start_notify(UUID_FFE2, on_notify)
+        unit.write_uuid, _ = await select_write_uuid(client, self.args.write_uuid)
+        unit.scheduler = make_scheduler(client, unit.write_uuid, name=unit.label())
+
+    async def connect_all(self, devices):
+        units = [Unit(i, d) for i, d in enumerate(devices, start=1)]
+        results = await asyncio.gather(*(self._connect_unit(u) for u in units), return_exceptions=True)
+        for unit, res in zip(units, results):
+            if isinstance(res, Exception):
+                print(f"connect failed: {unit.label()}: {res}")
+                if unit.client is not None:
+                    try:
+                        await unit.client.disconnect()
+                    except Exception:
+                        pass
+                continue
+            print(f"connected: {unit.label()}")
+            self.units.append(unit)
+
+    async def keepalive_scheduler(self, interval=1.0):
+        """Single keepalive clock for every unit, with each unit on its own phase slot.
+
+        Deadlines are computed from a fixed start so the cadence doesn't drift
+        with write latency.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tick = 0
+        while True:
+            units = [u for u in self.units if u.connected]
+            slot = interval / max(1, len(units))
+            for k, unit in enumerate(units):
+                deadline = start + tick * interval + k * slot
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Non-blocking: one slow unit can't hold up the others' slots.
+                unit.scheduler.submit(KEEPALIVE, PRIORITY_KEEPALIVE, "keepalive", coalesce="keepalive")
+            tick += 1
+            delay = start + tick * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -interval:
+                # Fell more than a whole interval behind (suspend, adapter stall): resync.
+                start, tick = loop.time(), 0
+
+    def select(self, spec):
+        """'all' / None -> every unit; '1,3' -> units u1 and u3. Raises ValueError on a bad spec."""
+        wanted = parse_units(spec)
+        if wanted is None:
+            return list(self.units)
+        return [u for u in self.units if u.index in wanted]
+
+    async def fan_out(self, pkt: bytes, units):
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(u.write(pkt) for u in units))
+        total_ms = (time.perf_counter() - t0) * 1000.0
+        ok = sum(1 for r in results if r)
+        print(f"sent {hx(pkt)} to {ok}/{len(units)} unit(s) in {total_ms:.1f} ms")
+        for u, r in zip(units, results):
+            if not r:
+                print(f"  failed: {u.label()}: {u.last_ack.describe() if u.last_ack else '-'}")
+        return ok
+
+    def print_units(self):
+        for u in self.units:
+            state = "up" if u.connected else "down"
+            lat = f"{u.last_ack_ms:.1f}ms" if u.last_ack_ms is not None else "-"
+            tel = format_tel_line(*u.last_tel) if u.last_tel else "-"
+            depth = u.scheduler.depth if u.scheduler else 0
+            print(f"  {u.label()} [{state}] writes={u.writes} err={u.write_errors} last_ack={lat} "
+                  f"queue={depth} rx={u.rx_frames} resync={u.reasm.resyncs} {tel}")
+
+    async def close(self):
+        async def _close(u):
+            if u.scheduler is not None:
+                await u.scheduler.close()
+            try:
+                await u.client.stop_notify(UUID_FFE2)
+            except Exception:
+                pass
+            try:
+                await u.client.disconnect()
+            except Exception:
+                pass
+
+        await asyncio.gather(*(_close(u) for u in self.units))
+
+
+UNITS_USAGE = "units are 'all' or comma-separated numbers, e.g. 1,3 or u1,u3"
+
+
+def parse_units(spec):
+    """'all' / None -> None (every unit); '1,u3' -> {1, 3}. Raises ValueError on anything else."""
+    if not spec or spec.strip() == "all":
+        return None
+    wanted = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        num = part[1:] if part.startswith("u") else part
+        if not num.isdigit() or int(num) < 1:
+            raise ValueError(f"bad unit {part!r}: {UNITS_USAGE}")
+        wanted.add(int(num))
+    return wanted
+
+
+def parse_fleet_command(line: str):
+    """'amps 2.5 @1,3' -> ('amps', 2.5, '1,3'); 'list' -> ('list', None, None)."""
+    target = None
+    if "@" in line:
+        line, target = line.split("@", 1)
+        target = target.strip()
+    parts = line.split()
+    if not parts:
+        return None, None, None
+    verb = parts[0].lower()
+    value = float(parts[1]) if len(parts) > 1 else None
+    return verb, value, target
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Control several R4830 chargers at once.")
+    ap.add_argument("--scan-timeout", type=float, default=10.0, help="Scan window in seconds (default 10)")
+    ap.add_argument("--max-units", type=int, help="Stop scanning once this many chargers are found")
+    ap.add_argument("--list", action="store_true", help="Only scan and list chargers, don't connect")
+    ap.add_argument("--units", help="Comma-separated unit numbers for --amps/--volts (default: all)")
+    ap.add_argument("--amps", type=float, help="Set output current on the selected units")
+    ap.add_argument("--volts", type=float, help="Set output voltage on the selected units")
+    ap.add_argument("--telemetry", action="store_true", help="Print decoded 3006 telemetry per unit")
+    ap.add_argument("--raw", action="store_true", help="Print raw RX hex for non-telemetry notifications")
+    ap.add_argument("--keepalive-seconds", type=float, default=1.0, help="Keepalive interval per unit (default 1.0)")
+    ap.add_argument("--write-uuid", choices=["FFE3", "FFE2"], default="FFE3",
+                    help="Preferred write characteristic (default FFE3), auto-fallback per unit.")
+    charger_sim.add_sim_args(ap)
+    args = ap.parse_args()
+    try:
+        parse_units(args.units)
+    except ValueError as e:
+        ap.error(f"--units: {e}")
+    charger_sim.install_from_args(args, charger_ctl)
+
+    if charger_ctl._BLEAK_IMPORT_ERROR is not None:
+        print("Missing dependency 'bleak'. Install with: python3 -m pip install bleak")
+        return 1
+
+    print(f"Scanning {args.scan_timeout:.0f}s for chargers...")
+    devices = await discover_chargers(args.scan_timeout, args.max_units)
+    if not devices:
+        print("No chargers found.")
+        return 2
+    for i, d in enumerate(devices, start=1):
+        print(f"  u{i} {d.name} {d.address}")
+    if args.list:
+        return 0
+
+    fleet = Fleet(args)
+    await fleet.connect_all(devices)
+    if not fleet.units:
+        print("No chargers connected.")
+        return 3
+
+    ka_task = asyncio.create_task(fleet.keepalive_scheduler(args.keepalive_seconds))
+    try:
+        oneshot = False
+        if args.volts is not None:
+            await fleet.fan_out(build_set_volts(args.volts), fleet.select(args.units))
+            oneshot = True
+        if args.amps is not None:
+            await fleet.fan_out(build_set_amps(args.amps), fleet.select(args.units))
+            oneshot = True
+
+        if oneshot or (args.telemetry and not sys.stdin.isatty()):
+            # stay alive for keepalive/telemetry
+            while True:
+                await asyncio.sleep(1)
+        elif not sys.stdin.isatty():
+            print("stdin is not interactive; exiting.")
+        else:
+            print("Commands: amps <A> [@units], volts <V> [@units], list, quit   (units like 1,3)")
+            loop = asyncio.get_running_loop()
+            while True:
+                line = (await loop.run_in_executor(None, input, "fleet> ")).strip()
+                try:
+                    verb, value, target = parse_fleet_command(line)
+                except ValueError:
+                    print("Could not parse number.")
+                    continue
+                if verb in ("q", "quit", "exit"):
+                    break
+                if verb == "list":
+                    fleet.print_units()
+                    continue
+                if verb in ("amps", "volts") and value is not None:
+                    try:
+                        units = fleet.select(target)
+                    except ValueError as e:
+                        print(f"Bad target: {e}")
+                        continue
+                    if not units:
+                        print("No matching units.")
+                        continue
+                    pkt = build_set_amps(value) if verb == "amps" else build_set_volts(value)
+                    await fleet.fan_out(pkt, units)
+                    continue
+                if verb:
+                    print("Unknown command.")
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        ka_task.cancel()
+        await asyncio.gather(ka_task, return_exceptions=True)
+        await fleet.close()
+        print("Done.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
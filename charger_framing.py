@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+charger_framing.py — turn FFE2 notifications back into whole charger frames.
+
+Every RX frame is length-prefixed and checksummed:
+
+  <len> <type> ... <checksum>     len = total frame length - 1
+                                  checksum = sum(frame[1:-1]) & 0xFF
+
+  03 xx yy cs        ack, 4 bytes
+  30 06 ...          telemetry, 49 bytes
+  69 05 ...          settings, 106 bytes
+
+With a 20-byte ATT payload the longer frames arrive split over several
+notifications (and a notification can also end in the middle of the next
+frame). FrameReassembler is fed raw notifications and hands back complete,
+checksum-verified frames:
+
+- Notifications that already hold whole frames (the common case with a large
+  MTU) are sliced straight out of the notification without touching the ring.
+- Leftover bytes go into a fixed-size ring buffer; nothing is reallocated
+  while streaming.
+- On a checksum failure (or an impossible length byte) the reassembler skips
+  to the next notification boundary — frames start at one in practice — or a
+  single byte if there is none, and counts the resync and the dropped bytes.
+"""
+
+from collections import deque
+
+MIN_FRAME_LEN = 3        # len byte + one body byte + checksum
+MAX_FRAME_LEN = 256      # len byte is a u8
+
+
+def frame_len(first_byte: int) -> int:
+    return first_byte + 1
+
+
+def checksum_ok(frame) -> bool:
+    return (sum(frame[1:-1]) & 0xFF) == frame[-1]
+
+
+class FrameReassembler:
+    def __init__(self, capacity=1024):
+        if capacity < MAX_FRAME_LEN:
+            raise ValueError(f"capacity must be at least {MAX_FRAME_LEN}")
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._cap = capacity
+        self._start = 0
+        self._len = 0
+        # Absolute stream positions where notifications started (resync targets).
+        self._boundaries = deque(maxlen=64)
+        self._pos = 0  # absolute stream position of self._start
+
+        self.bytes_in = 0
+        self.frames = 0
+        self.resyncs = 0
+        self.dropped_bytes = 0
+        self.overflows = 0
+
+    @property
+    def pending(self) -> int:
+        return self._len
+
+    def reset(self):
+        """Drop any partial frame (e.g. after a reconnect)."""
+        self.dropped_bytes += self._len
+        self._pos += self._len
+        self._start = 0
+        self._len = 0
+        self._boundaries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "bytes_in": self.bytes_in,
+            "frames": self.frames,
+            "resyncs": self.resyncs,
+            "dropped_bytes": self.dropped_bytes,
+            "overflows": self.overflows,
+            "pending": self._len,
+        }
+
+    # --- feeding ---
+
+    def feed(self, data) -> list:
+        """Add one notification; returns the list of complete frames it finished."""
+        data = bytes(data)
+        n = len(data)
+        self.bytes_in += n
+        out = []
+        if not n:
+            return out
+        i = 0
+        if self._len == 0:
+            # Fast path: slice whole frames straight out of the notification.
+            while i < n:
+                flen = frame_len(data[i])
+                if flen < MIN_FRAME_LEN:
+                    self._skip_direct(1)
+                    i += 1
+                    continue
+                if i + flen > n:
+                    break
+                if checksum_ok(data[i:i + flen]):
+                    out.append(data[i:i + flen])
+                    self.frames += 1
+                    self._pos += flen
+                    i += flen
+                    continue
+                # Only the notification start is a known boundary; byte-step from here.
+                self._skip_direct(1)
+                i += 1
+            if i == n:
+                return out
+            self._boundaries.append(self._pos)
+        else:
+            self._boundaries.append(self._pos + self._len)
+        self._push(data, i)
+        self._drain(out)
+        return out
+
+    def _skip_direct(self, k: int):
+        self.resyncs += 1
+        self.dropped_bytes += k
+        self._pos += k
+
+    def _push(self, data: bytes, i: int):
+        n = len(data) - i
+        free = self._cap - self._len
+        if n > free:
+            # Can only happen with a stuck partial frame; drop the oldest bytes.
+            self.overflows += 1
+            self._drop(n - free)
+        end = (self._start + self._len) % self._cap
+        first = min(n, self._cap - end)
+        self._buf[end:end + first] = data[i:i + first]
+        if first < n:
+            self._buf[0:n - first] = data[i + first:]
+        self._len += n
+
+    def _drop(self, k: int):
+        self._start = (self._start + k) % self._cap
+        self._len -= k
+        self._pos += k
+        self.dropped_bytes += k
+        while self._boundaries and self._boundaries[0] <= self._pos:
+            self._boundaries.popleft()
+
+    def _peek(self, k: int) -> int:
+        return self._buf[(self._start + k) % self._cap]
+
+    def _take(self, flen: int):
+        """Frame bytes at the head of the ring (copy only when it wraps)."""
+        a = self._start
+        b = a + flen
+        if b <= self._cap:
+            return self._view[a:b]
+        return bytes(self._view[a:]) + bytes(self._view[:b - self._cap])
+
+    def _resync(self):
+        self.resyncs += 1
+        target = None
+        for pos in self._boundaries:
+            if pos > self._pos:
+                target = pos
+                break
+        k = (target - self._pos) if target is not None else 1
+        self._drop(min(k, self._len))
+
+    def _drain(self, out: list):
+        while self._len:
+            flen = frame_len(self._peek(0))
+            if flen < MIN_FRAME_LEN:
+                self._resync()
+                continue
+            if self._len < flen:
+                return
+            frame = self._take(flen)
+            if not checksum_ok(frame):
+                self._resync()
+                continue
+            out.append(bytes(frame))
+            self.frames += 1
+            self._start = (self._start + flen) % self._cap
+            self._len -= flen
+            self._pos += flen
+            while self._boundaries and self._boundaries[0] <= self._pos:
+                self._boundaries.popleft()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+charger_metrics.py — HDR-style latency histograms for the BLE hot paths.
+
+LatencyHistogram keeps counts in log-linear buckets over integer
+microseconds: values below 2**sig_bits get one bucket each, above that every
+power of two is split into 2**(sig_bits-1) equal buckets. With the default
+sig_bits=5 any recorded value is reported within ~3%, from 1 us to hours,
+in a few hundred ints; recording is a bit_length and a list increment, cheap
+enough to run on every notification.
+
+Metrics holds the named histograms charger_ctl records into:
+
+  write_ack        write_gatt_char called -> matching 03 ack (AckResult.rtt_s)
+  write            time spent inside write_gatt_char (every scheduled write)
+  notify_callback  duration of the FFE2 notification handler
+  notify_gap       time between consecutive notifications
+  keepalive_jitter |actual keepalive spacing - nominal interval|
+
+summary_lines() gives the --stats text; as_dict() is the machine-readable
+dump (percentiles in ms plus the raw non-empty buckets, so dumps from several
+runs can be merged with LatencyHistogram.from_dict(...).merge(...)).
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    __slots__ = ("sig_bits", "_half", "_counts", "count", "total_us", "min_us", "max_us")
+
+    def __init__(self, sig_bits=5):
+        if not 1 <= sig_bits <= 16:
+            raise ValueError("sig_bits must be in 1..16")
+        self.sig_bits = sig_bits
+        self._half = 1 << (sig_bits - 1)
+        self._counts: List[int] = []
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def _index(self, v: int) -> int:
+        shift = v.bit_length() - self.sig_bits
+        if shift <= 0:
+            return v
+        return shift * self._half + (v >> shift)
+
+    def _lower(self, index: int) -> int:
+        shift = index // self._half - 1
+        if shift <= 0:
+            return index
+        return (index - shift * self._half) << shift
+
+    def record(self, seconds: Optional[float]):
+        if seconds is None:
+            return
+        self.record_us(int(seconds * 1e6))
+
+    def record_us(self, v: int, n: int = 1):
+        if v < 0:
+            v = 0
+        i = self._index(v)
+        counts = self._counts
+        if i >= len(counts):
+            counts.extend([0] * (i + 1 - len(counts)))
+        counts[i] += n
+        self.count += n
+        self.total_us += v * n
+        if self.min_us is None or v < self.min_us:
+            self.min_us = v
+        if v > self.max_us:
+            self.max_us = v
+
+    def percentile_us(self, q: float) -> Optional[int]:
+        """Value at percentile q (0-100), as the midpoint of its bucket clamped to the observed range."""
+        if not self.count:
+            return None
+        rank = max(1, int(round(q / 100.0 * self.count)))
+        seen = 0
+        for i, c in enumerate(self._counts):
+            seen += c
+            if c and seen >= rank:
+                lo, hi = self._lower(i), self._lower(i + 1)
+                return min(self.max_us, max(self.min_us, (lo + hi - 1) // 2))
+        return self.max_us
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        if other.sig_bits != self.sig_bits:
+            raise ValueError("can only merge histograms with the same sig_bits")
+        if not other.count:
+            return self
+        if len(other._counts) > len(self._counts):
+            self._counts.extend([0] * (len(other._counts) - len(self._counts)))
+        for i, c in enumerate(other._counts):
+            self._counts[i] += c
+        self.count += other.count
+        self.total_us += other.total_us
+        self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    def summary(self, percentiles: Iterable[float] = PERCENTILES) -> dict:
+        def ms(us):
+            return None if us is None else round(us / 1000.0, 3)
+
+        out = {
+            "count": self.count,
+            "min_ms": ms(self.min_us),
+            "mean_ms": ms(self.total_us / self.count) if self.count else None,
+        }
+        for q in percentiles:
+            out[f"p{q:g}_ms"] = ms(self.percentile_us(q))
+        out["max_ms"] = ms(self.max_us) if self.count else None
+        return out
+
+    def as_dict(self) -> dict:
+        out = self.summary()
+        out["sig_bits"] = self.sig_bits
+        out["total_us"] = self.total_us
+        out["buckets_us"] = {str(self._lower(i)): c for i, c in enumerate(self._counts) if c}
+        return out
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LatencyHistogram":
+        h = cls(d.get("sig_bits", 5))
+        for lower, c in d.get("buckets_us", {}).items():
+            h.record_us(int(lower), int(c))
+        # Bucket lower bounds understate the real extremes and total; restore them from the dump.
+        if h.count:
+            h.total_us = int(d.get("total_us", h.total_us))
+            if d.get("min_ms") is not None:
+                h.min_us = int(round(d["min_ms"] * 1000))
+            if d.get("max_ms") is not None:
+                h.max_us = int(round(d["max_ms"] * 1000))
+        return h
+
+
+class Metrics:
+    """Named histograms plus the small amount of state the gap/jitter metrics need."""
+
+    NAMES = ("write_ack", "write", "notify_callback", "notify_gap", "keepalive_jitter")
+
+    def __init__(self, keepalive_interval_s=1.0, sig_bits=5):
+        self.started = time.perf_counter()
+        self.keepalive_interval_s = keepalive_interval_s
+        self.hist: Dict[str, LatencyHistogram] = {n: LatencyHistogram(sig_bits) for n in self.NAMES}
+        self._last_notify: Optional[float] = None
+        self._last_keepalive: Optional[float] = None
+        self._reported: Dict[str, int] = {n: 0 for n in self.NAMES}
+
+    def record(self, name: str, seconds: Optional[float]):
+        self.hist[name].record(seconds)
+
+    def notify(self, started: float, finished: float):
+        """One notification handled between perf_counter() readings started/finished."""
+        if self._last_notify is not None:
+            self.hist["notify_gap"].record(started - self._last_notify)
+        self._last_notify = started
+        self.hist["notify_callback"].record(finished - started)
+
+    def link_reset(self):
+        """Forget the last notification/keepalive times, so a reconnect doesn't show up as one huge gap."""
+        self._last_notify = None
+        self._last_keepalive = None
+
+    def keepalive_written(self, at: float):
+        if self._last_keepalive is not None:
+            self.hist["keepalive_jitter"].record(abs((at - self._last_keepalive) - self.keepalive_interval_s))
+        self._last_keepalive = at
+
+    def summary_lines(self) -> List[str]:
+        """One line per histogram with data: totals and percentiles, plus the count since the last call."""
+        lines = []
+        for name, h in self.hist.items():
+            if not h.count:
+                continue
+            s = h.summary()
+            new = h.count - self._reported[name]
+            self._reported[name] = h.count
+            lines.append(
+                f"{name:<16} n={h.count:<7} (+{new:<5}) p50={s['p50_ms']:.2f} p90={s['p90_ms']:.2f} "
+                f"p99={s['p99_ms']:.2f} max={s['max_ms']:.2f} ms"
+            )
+        return lines
+
+    def as_dict(self) -> dict:
+        return {
+            "elapsed_s": round(time.perf_counter() - self.started, 3),
+            "keepalive_interval_s": self.keepalive_interval_s,
+            "histograms": {name: h.as_dict() for name, h in self.hist.items()},
+        }
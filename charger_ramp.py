@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+charger_ramp.py — stream output_current_set (cmd 0x08) setpoints along a ramp.
+
+Instead of typing amps into charger_ctl.py's prompt, a RampController
+recomputes the target current at a fixed rate and sends it:
+
+- Profiles:
+    linear   start -> end amps over N seconds, then hold
+    cccv     soft-start up to the CC current; once Vout reaches the CV voltage
+             the current tapers down proportionally to the overshoot; done
+             when the measured Iout stays below the termination current
+- Temperature derating (any profile): above --derate-start-c the target is
+  scaled down linearly with max(T1, T2), reaching --derate-min-frac of the
+  target at --derate-max-c.
+- Limits: --max-amps and --final-amps must sit inside output_current_set's
+  safe range (enforce_safety, as for `profile apply`; --force overrides).
+  Setpoints are clamped to [0, --max-amps], capped at 8 A while Vin
+  is at or below 130 V (same guard as r4830_command_tool.enforce_safety),
+  slew-limited to --slew A/s and quantized to 0.1 A. That grid is what
+  r4830_command_tool's frame table holds, so encode_control is a lookup.
+- Fixed-rate ticks against absolute deadlines. If the previous setpoint
+  hasn't been acked yet when a tick comes round, that tick's setpoint is
+  skipped rather than queued — the next tick sends a fresher one — so
+  control latency stays bounded by one tick plus one ack round-trip.
+- If telemetry goes stale the target is held (never raised) until it returns.
+
+Usage:
+  python3 charger_ramp.py linear --from 0.5 --to 6 --seconds 60
+  python3 charger_ramp.py cccv --amps 8 --cv-volts 151.2 --term-amps 0.8 --soft-start 30
+  python3 charger_ramp.py linear --to 5 --seconds 20 --derate-start-c 60 --derate-max-c 80
+"""
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+
+_BACKEND_DIR = pathlib.Path(__file__).resolve().parent / "controller" / "backend"
+if str(_BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(_BACKEND_DIR))
+
+import charger_ctl  # noqa: E402
+import charger_sim  # noqa: E402
+from charger_acks import AckTracker  # noqa: E402
+from charger_ctl import UUID_FFE2, format_tel_line, hx, make_scheduler, parse_3006, select_write_uuid  # noqa: E402
+from charger_framing import FrameReassembler  # noqa: E402
+from r4830_command_tool import CONTROL_SPECS, encode_control, enforce_safety  # noqa: E402
+
+SETPOINT_STEP_A = 0.1
+LOW_LINE_VOLTS = 130.0
+LOW_LINE_MAX_AMPS = 8.0
+
+
+class Telemetry:
+    """Latest decoded 0x3006 values (None until the first frame)."""
+
+    __slots__ = ("vin", "vout", "iout", "t1", "t2", "at")
+
+    def __init__(self):
+        self.vin = self.vout = self.iout = self.t1 = self.t2 = None
+        self.at = None
+
+    def update_3006(self, floats, now=None):
+        if len(floats) < 7:
+            return
+        self.vin, self.t1, self.t2, self.vout, self.iout = floats[0], floats[3], floats[4], floats[5], floats[6]
+        self.at = time.monotonic() if now is None else now
+
+    def age(self, now=None):
+        if self.at is None:
+            return None
+        return (time.monotonic() if now is None else now) - self.at
+
+    def max_temp(self):
+        temps = [t for t in (self.t1, self.t2) if t is not None]
+        return max(temps) if temps else None
+
+
+# --- profiles: target(elapsed_s, tel, prev_target) -> amps ---
+
+class LinearProfile:
+    needs_telemetry = False
+
+    def __init__(self, start_a, end_a, duration_s):
+        self.start_a = start_a
+        self.end_a = end_a
+        self.duration_s = max(0.0, duration_s)
+        self.done = False
+
+    def target(self, elapsed, tel, prev):
+        if self.duration_s == 0 or elapsed >= self.duration_s:
+            return self.end_a
+        return self.start_a + (self.end_a - self.start_a) * (elapsed / self.duration_s)
+
+    def describe(self):
+        return f"linear {self.start_a:g}A -> {self.end_a:g}A over {self.duration_s:g}s"
+
+
+class CcCvProfile:
+    """Constant current up to cv_volts, then taper; done once Iout < term_amps for term_hold_s."""
+
+    needs_telemetry = True
+
+    def __init__(self, cc_amps, cv_volts, term_amps, soft_start_s=10.0, taper_gain=2.0, term_hold_s=30.0):
+        self.cc_amps = cc_amps
+        self.cv_volts = cv_volts
+        self.term_amps = term_amps
+        self.soft_start_s = soft_start_s
+        self.taper_gain = taper_gain   # amps removed per volt of overshoot, per tick
+        self.term_hold_s = term_hold_s
+        self.phase = "cc"
+        self.done = False
+        self._below_since = None
+
+    def target(self, elapsed, tel, prev):
+        cc = self.cc_amps
+        if self.soft_start_s > 0 and elapsed < self.soft_start_s:
+            cc = self.cc_amps * (elapsed / self.soft_start_s)
+        if tel.vout is None:
+            return min(cc, prev)
+        if self.phase == "cc" and tel.vout >= self.cv_volts:
+            self.phase = "cv"
+        if self.phase == "cc":
+            return cc
+        # CV: trim the current by the overshoot; let it creep back up if Vout sags.
+        error = tel.vout - self.cv_volts
+        target = min(cc, prev - self.taper_gain * error)
+        if tel.iout is not None and tel.iout < self.term_amps:
+            if self._below_since is None:
+                self._below_since = elapsed
+            elif elapsed - self._below_since >= self.term_hold_s:
+                self.done = True
+        else:
+            self._below_since = None
+        return max(0.0, target)
+
+    def describe(self):
+        return (f"cccv {self.cc_amps:g}A to {self.cv_volts:g}V, term<{self.term_amps:g}A "
+                f"(soft start {self.soft_start_s:g}s)")
+
+
+class TemperatureDerate:
+    def __init__(self, start_c, max_c, min_frac=0.2):
+        if max_c <= start_c:
+            raise ValueError("derate max temperature must be above the start temperature")
+        self.start_c = start_c
+        self.max_c = max_c
+        self.min_frac = min_frac
+
+    def factor(self, temp_c):
+        if temp_c is None or temp_c <= self.start_c:
+            return 1.0
+        if temp_c >= self.max_c:
+            return self.min_frac
+        span = (temp_c - self.start_c) / (self.max_c - self.start_c)
+        return 1.0 - (1.0 - self.min_frac) * span
+
+
+def quantize(amps, step=SETPOINT_STEP_A):
+    return round(round(amps / step) * step, 1)
+
+
+class RampController:
+    """
+    send(pkt) is an async callable that writes one frame and resolves once the
+    charger has taken it (e.g. an AckTracker.send with retries=0).
+    """
+
+    def __init__(self, profile, send, *, rate_hz=2.0, max_amps=8.0, slew_a_per_s=1.0,
+                 derate=None, stale_s=3.0, start_amps=0.0):
+        self.profile = profile
+        self.send = send
+        self.interval_s = 1.0 / rate_hz
+        self.max_amps = max_amps
+        self.slew_a_per_s = slew_a_per_s
+        self.derate = derate
+        self.stale_s = stale_s
+        self.tel = Telemetry()
+
+        self.target = start_amps        # unquantized, slew-limited
+        self.setpoint = None            # last value handed to send()
+        self.acked_setpoint = None
+        self._pending_setpoint = None
+        self._inflight = None
+
+        self.ticks = 0
+        self.sent = 0
+        self.skipped_busy = 0
+        self.missed_ticks = 0
+        self.failed = 0
+        self.stale_holds = 0
+        self.last_result = None
+
+    def frame(self, amps):
+        return encode_control("output_current_set", amps)
+
+    def limit(self):
+        limit = self.max_amps
+        if self.tel.vin is not None and self.tel.vin <= LOW_LINE_VOLTS:
+            limit = min(limit, LOW_LINE_MAX_AMPS)
+        return limit
+
+    def step(self, elapsed, now=None):
+        """Compute this tick's setpoint (amps, quantized)."""
+        prev = self.target
+        age = self.tel.age(now)
+        stale = age is None or age > self.stale_s
+        needs_tel = self.profile.needs_telemetry or self.derate is not None
+        want = self.profile.target(elapsed, self.tel, prev)
+        if self.derate is not None:
+            want *= self.derate.factor(self.tel.max_temp())
+        if needs_tel and stale:
+            # No fresh telemetry: never raise the current blind.
+            self.stale_holds += 1
+            want = min(want, prev)
+        want = max(0.0, min(want, self.limit()))
+        max_delta = self.slew_a_per_s * self.interval_s
+        want = max(prev - max_delta, min(prev + max_delta, want))
+        self.target = want
+        return quantize(want)
+
+    def _on_sent(self, task):
+        self._inflight = None
+        try:
+            result = task.result()
+        except Exception as e:
+            self.failed += 1
+            self.last_result = f"{type(e).__name__}: {e}"
+            return
+        self.last_result = result
+        if getattr(result, "ok", True):
+            self.acked_setpoint = self._pending_setpoint
+        else:
+            self.failed += 1
+
+    async def run(self, on_tick=None):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tick = 0
+        while not self.profile.done:
+            deadline = start + tick * self.interval_s
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            self.ticks += 1
+            sp = self.step(now - start)
+            if sp != self.setpoint or self.acked_setpoint != sp:
+                if self._inflight is not None:
+                    # The charger hasn't taken the last one yet: drop this one, don't queue it.
+                    self.skipped_busy += 1
+                else:
+                    self.setpoint = sp
+                    self._pending_setpoint = sp
+                    self.sent += 1
+                    self._inflight = asyncio.ensure_future(self.send(self.frame(sp)))
+                    self._inflight.add_done_callback(self._on_sent)
+            if on_tick is not None:
+                on_tick(self, sp)
+            # Skip ticks we're already late for instead of bursting to catch up.
+            next_tick = tick + 1
+            behind = int((loop.time() - start) // self.interval_s) + 1
+            if behind > next_tick:
+                self.missed_ticks += behind - next_tick
+                next_tick = behind
+            tick = next_tick
+        if self._inflight is not None:
+            await asyncio.gather(self._inflight, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "sent": self.sent,
+            "skipped_busy": self.skipped_busy,
+            "missed_ticks": self.missed_ticks,
+            "failed": self.failed,
+            "stale_holds": self.stale_holds,
+            "setpoint": self.setpoint,
+            "acked_setpoint": self.acked_setpoint,
+        }
+
+
+def _positive(text):
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be > 0, got {text}")
+    return value
+
+
+def check_limits(args):
+    """Hold --max-amps / --final-amps to output_current_set's safe range, as `profile apply` does."""
+    control = CONTROL_SPECS["output_current_set"]
+    for flag, value in (("--max-amps", args.max_amps), ("--final-amps", args.final_amps)):
+        if value is not None:
+            try:
+                enforce_safety(control, "float", str(value), None, force=args.force)
+            except ValueError as e:
+                raise ValueError(f"{flag}: {e}") from None
+
+
+def build_profile(args):
+    if args.profile == "linear":
+        return LinearProfile(args.start, args.to, args.seconds)
+    return CcCvProfile(args.amps, args.cv_volts, args.term_amps, soft_start_s=args.soft_start,
+                       taper_gain=args.taper_gain, term_hold_s=args.term_hold)
+
+
+async def main():
+    ap = argparse.ArgumentParser(description="Ramp the R4830 output current along a profile.")
+    sub = ap.add_subparsers(dest="profile", required=True)
+    sp_lin = sub.add_parser("linear", help="Linear ramp, then hold")
+    sp_lin.add_argument("--from", dest="start", type=float, default=0.0, help="Start amps (default 0)")
+    sp_lin.add_argument("--to", type=float, required=True, help="End amps")
+    sp_lin.add_argument("--seconds", type=float, required=True, help="Ramp duration")
+    sp_cc = sub.add_parser("cccv", help="Constant current, then taper at the CV voltage")
+    sp_cc.add_argument("--amps", type=float, required=True, help="CC current")
+    sp_cc.add_argument("--cv-volts", type=float, required=True, help="Voltage where tapering starts")
+    sp_cc.add_argument("--term-amps", type=float, default=0.5, help="Done once Iout stays below this")
+    sp_cc.add_argument("--term-hold", type=float, default=30.0, help="Seconds below --term-amps before done")
+    sp_cc.add_argument("--soft-start", type=float, default=10.0, help="Seconds to reach the CC current")
+    sp_cc.add_argument("--taper-gain", type=float, default=2.0, help="Amps removed per volt over CV, per tick")
+    for p in (sp_lin, sp_cc):
+        p.add_argument("--rate", type=_positive, default=2.0, help="Setpoint ticks per second (default 2)")
+        p.add_argument("--max-amps", type=_positive, default=8.0, help="Hard ceiling (default 8)")
+        p.add_argument("--slew", type=_positive, default=1.0, help="Max change in A/s (default 1)")
+        p.add_argument("--derate-start-c", type=float, help="Start derating above this max(T1,T2)")
+        p.add_argument("--derate-max-c", type=float, default=85.0, help="Full derating at this temperature")
+        p.add_argument("--derate-min-frac", type=float, default=0.2, help="Target fraction at full derating")
+        p.add_argument("--ack-timeout", type=float, default=1.0, help="Seconds to wait for each setpoint ack")
+        p.add_argument("--final-amps", type=float, help="Setpoint to send when stopping")
+        p.add_argument("--force", action="store_true",
+                       help="Allow --max-amps/--final-amps outside output_current_set's safe range")
+        p.add_argument("--quiet", action="store_true", help="Only print setpoint changes")
+        p.add_argument("--write-uuid", choices=["FFE3", "FFE2"], default="FFE3")
+        charger_sim.add_sim_args(p)
+    args = ap.parse_args()
+    try:
+        check_limits(args)
+    except ValueError as e:
+        ap.error(str(e))
+    charger_sim.install_from_args(args, charger_ctl)
+
+    if charger_ctl._BLEAK_IMPORT_ERROR is not None:
+        print("Missing dependency 'bleak'. Install with: python3 -m pip install bleak")
+        return 1
+
+    derate = None
+    if args.derate_start_c is not None:
+        derate = TemperatureDerate(args.derate_start_c, args.derate_max_c, args.derate_min_frac)
+    profile = build_profile(args)
+
+    print("Scanning for charger...")
+    try:
+        dev = await charger_ctl.find_charger()
+    except asyncio.TimeoutError:
+        dev = None
+    if not dev:
+        print("Not found (ensure charger is on and advertising, and no other app is connected).")
+        return 2
+    print(f"Found: {dev.name} {dev.address}")
+
+    async with charger_ctl.BleakClient(dev.address) as client:
+        acks = AckTracker()
+        reasm = FrameReassembler()
+        sched = None
+
+        async def send(pkt):
+            return await acks.send(sched, pkt, timeout_s=args.ack_timeout, retries=0, note="ramp")
+
+        ramp = RampController(profile, send, rate_hz=args.rate, max_amps=args.max_amps,
+                              slew_a_per_s=args.slew, derate=derate)
+
+        def on_notify(sender, data):
+            for b in reasm.feed(data):
+                if acks.feed(b):
+                    continue
+                parsed = parse_3006(b)
+                if parsed:
+                    ramp.tel.update_3006(parsed[0])
+                    if not args.quiet:
+                        print("[TEL]", format_tel_line(*parsed))
+
+        await client.start_notify(UUID_FFE2, on_notify)
+        write_uuid, _ = await select_write_uuid(client, args.write_uuid)
+        sched = make_scheduler(client, write_uuid, name=dev.address)
+        sched.keepalive(1.0)
+
+        last = [None]
+
+        def on_tick(r, sp):
+            if sp != last[0]:
+                last[0] = sp
+                print(f"[RAMP] setpoint={sp:.1f}A acked={r.acked_setpoint} limit={r.limit():g}A "
+                      f"skipped={r.skipped_busy}")
+
+        print(f"Ramp: {profile.describe()} at {args.rate:g} Hz (max {args.max_amps:g}A, slew {args.slew:g}A/s)")
+        try:
+            # Linear ramps hold their end point until interrupted.
+            await ramp.run(on_tick)
+            print("Profile finished.")
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        finally:
+            if args.final_amps is not None:
+                pkt = ramp.frame(quantize(args.final_amps))
+                result = await acks.send(sched, pkt, timeout_s=args.ack_timeout)
+                print(f"Final amps={args.final_amps:g} pkt={hx(pkt)} {result.describe()}")
+            await sched.close()
+            print("Ramp stats:", " ".join(f"{k}={v}" for k, v in ramp.stats().items()))
+            try:
+                await client.stop_notify(UUID_FFE2)
+            except Exception:
+                pass
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+charger_scheduler.py — one write queue per BLE connection.
+
+Every write to the charger (user commands, poll frames 020101/020404/020505,
+keepalive 020606) goes through a single WriteScheduler instead of separate
+asyncio.sleep loops:
+
+- Priority queue: commands > polls > keepalive. A command submitted while a
+  keepalive is waiting goes out first; a write already on the air is never
+  interrupted.
+- Minimum gap between the end of one write and the start of the next, so
+  bursts don't overrun the charger.
+- Periodic jobs are scheduled against absolute deadlines (start + k * interval),
+  so they don't drift with write latency. If a job's previous frame is still
+  queued the new tick is coalesced into it instead of piling up.
+- Errors are counted and kept (last_error) instead of silently swallowed; a
+  failed command write fails the future returned by send().
+- stats() exposes queue depth, write latency and periodic lateness.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Tuple
+
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+PRIORITY_KEEPALIVE = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_COMMAND: "command",
+    PRIORITY_POLL: "poll",
+    PRIORITY_KEEPALIVE: "keepalive",
+}
+
+KEEPALIVE_FRAME = bytes.fromhex("020606")
+POLL_FRAMES = tuple(bytes.fromhex(h) for h in ("020101", "020404", "020505"))
+
+
+class _LatencyStats:
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def add(self, v: float):
+        self.count += 1
+        self.total += v
+        self.last = v
+        if v > self.max:
+            self.max = v
+
+    def as_dict(self, scale=1000.0):
+        mean = self.total / self.count if self.count else None
+        return {
+            "count": self.count,
+            "mean_ms": None if mean is None else round(mean * scale, 3),
+            "max_ms": round(self.max * scale, 3),
+            "last_ms": None if self.last is None else round(self.last * scale, 3),
+        }
+
+
+class WriteScheduler:
+    """
+    write_fn(payload) is an async callable that performs one GATT write
+    (e.g. lambda p: client.write_gatt_char(uuid, p, response=False)).
+
+    on_write(payload, note, priority, latency_s, error) is called after every
+    attempt; use it for TX logging.
+    """
+
+    def __init__(self, write_fn, *, min_gap_s=0.02, on_write=None, name=""):
+        self._write_fn = write_fn
+        self.min_gap_s = min_gap_s
+        self.on_write = on_write
+        self.name = name
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending_keys = {}
+        self._wakeup = asyncio.Event()
+        self._runner = None
+        self._periodic = []
+        self._last_write_end = 0.0
+        self._closed = False
+
+        self.max_depth = 0
+        self.written = {p: 0 for p in PRIORITY_NAMES}
+        self.coalesced = 0
+        self.missed_ticks = 0
+        self.errors = 0
+        self.last_error = None
+        self.latency = _LatencyStats()       # time spent inside write_fn
+        self.queue_wait = {p: _LatencyStats() for p in PRIORITY_NAMES}
+        self.lateness = _LatencyStats()      # periodic enqueue vs deadline
+
+    # --- lifecycle ---
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+        return self
+
+    async def close(self):
+        self._closed = True
+        tasks = [t for t in self._periodic] + ([self._runner] if self._runner else [])
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for _prio, _seq, _payload, _note, fut, key, _t in self._heap:
+            if not fut.done():
+                fut.cancel()
+        self._heap.clear()
+        self._pending_keys.clear()
+        self._periodic.clear()
+        self._runner = None
+
+    # --- submitting ---
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def submit(self, payload: bytes, priority=PRIORITY_COMMAND, note=None, coalesce=None):
+        """Queue one write; returns a future resolved with (started_at, latency_s).
+
+        started_at is the perf_counter() reading just before write_fn was
+        called, latency_s the time spent inside it.
+
+        With coalesce=<key>, a frame with the same key that is still queued is
+        reused instead of queueing another copy.
+        """
+        if self._closed:
+            raise RuntimeError("scheduler is closed")
+        if coalesce is not None and coalesce in self._pending_keys:
+            self.coalesced += 1
+            return self._pending_keys[coalesce]
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), payload, note, fut, coalesce, time.perf_counter()))
+        if coalesce is not None:
+            self._pending_keys[coalesce] = fut
+        if len(self._heap) > self.max_depth:
+            self.max_depth = len(self._heap)
+        self._wakeup.set()
+        return fut
+
+    async def send(self, payload: bytes, note=None) -> Tuple[float, float]:
+        """Queue a command at top priority and wait until it has been written."""
+        return await self.submit(payload, PRIORITY_COMMAND, note)
+
+    def every(self, interval_s: float, frames, priority=PRIORITY_KEEPALIVE, note=None, first_delay_s=0.0):
+        """Run frames (a sequence of payloads) every interval_s against absolute deadlines."""
+        task = asyncio.create_task(self._periodic_job(interval_s, tuple(frames), priority, note, first_delay_s))
+        self._periodic.append(task)
+        return task
+
+    def keepalive(self, interval_s=1.0):
+        return self.every(interval_s, [KEEPALIVE_FRAME], PRIORITY_KEEPALIVE, "keepalive")
+
+    def poll(self, interval_s=2.0):
+        return self.every(interval_s, POLL_FRAMES, PRIORITY_POLL, "poll")
+
+    # --- internals ---
+
+    async def _periodic_job(self, interval_s, frames, priority, note, first_delay_s):
+        loop = asyncio.get_running_loop()
+        start = loop.time() + first_delay_s
+        tick = 0
+        while True:
+            deadline = start + tick * interval_s
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            late = loop.time() - deadline
+            self.lateness.add(max(0.0, late))
+            for frame in frames:
+                label = f"{note}:{frame.hex()}" if note and len(frames) > 1 else note
+                self.submit(frame, priority, label, coalesce=(priority, frame))
+            # Skip ticks we've already missed instead of bursting to catch up.
+            next_tick = tick + 1
+            behind = int((loop.time() - start) // interval_s) + 1
+            if behind > next_tick:
+                self.missed_ticks += behind - next_tick
+                next_tick = behind
+            tick = next_tick
+
+    async def _run(self):
+        while True:
+            while not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            gap = self._last_write_end + self.min_gap_s - time.perf_counter()
+            if gap > 0:
+                # Something more urgent may arrive while we wait out the gap; pick after the wait.
+                await asyncio.sleep(gap)
+            priority, _seq, payload, note, fut, key, queued_at = heapq.heappop(self._heap)
+            if key is not None:
+                self._pending_keys.pop(key, None)
+            if fut.cancelled():
+                continue
+            t0 = time.perf_counter()
+            self.queue_wait[priority].add(t0 - queued_at)
+            error = None
+            try:
+                await self._write_fn(payload)
+            except asyncio.CancelledError:
+                if not fut.done():
+                    fut.cancel()
+                raise
+            except Exception as exc:
+                error = exc
+            t1 = time.perf_counter()
+            self._last_write_end = t1
+            if error is None:
+                self.latency.add(t1 - t0)
+                self.written[priority] += 1
+                if not fut.done():
+                    fut.set_result((t0, t1 - t0))
+            else:
+                self.errors += 1
+                self.last_error = f"{type(error).__name__}: {error}"
+                if not fut.done():
+                    fut.set_exception(error)
+                    # Periodic frames have nobody awaiting them; don't leak "exception never retrieved".
+                    if priority != PRIORITY_COMMAND:
+                        fut.exception()
+            if self.on_write is not None:
+                self.on_write(payload, note, priority, t1 - t0, error)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "written": {PRIORITY_NAMES[p]: n for p, n in self.written.items()},
+            "coalesced": self.coalesced,
+            "missed_ticks": self.missed_ticks,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "write_latency": self.latency.as_dict(),
+            "queue_wait": {PRIORITY_NAMES[p]: s.as_dict() for p, s in self.queue_wait.items()},
+            "periodic_lateness": self.lateness.as_dict(),
+        }
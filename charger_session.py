@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+charger_session.py — one charger link that comes back by itself.
+
+ChargerSession owns connect -> subscribe -> auth/kick -> (your code) ->
+disconnect, and repeats it with exponential backoff when the link drops:
+
+- The first connect scans (find coroutine supplied by the tool), picks the
+  RX/TX characteristics from the discovered services and remembers address,
+  service and RX/TX UUIDs in a LinkCache (in memory, and as JSON on disk when
+  a cache path is given).
+- Every later connect — a reconnect after a drop, the next two_run capture,
+  the next tool start — goes straight to the cached address with service
+  discovery limited to the cached service (and BlueZ's cached GATT database),
+  skipping the scan window and characteristic selection. On BlueZ / WinRT a
+  known address connects without scanning, so a reconnect is well under a
+  second plus the auth/kick replay; CoreBluetooth still has to see an
+  advertisement, but stops at the first one instead of waiting out the scan.
+  If the cached path fails the session falls back to a full scan once.
+- After subscribing it replays the auth frame (when a password is given; blank
+  is a valid password) and the startup kick frames, the way the app does.
+
+run(on_link) calls on_link(client) once per connection. When on_link returns
+the session disconnects and run() returns its result; when the link drops
+on_link is cancelled and, with reconnect=True, called again on the new link.
+A failed first connect raises (there's nothing to recover yet); failed
+reconnects back off from backoff_s up to backoff_max_s (max_attempts, if set,
+bounds them).
+
+Usage (see charger_ctl.main and two_run_rx_capture._capture_run):
+  session = ChargerSession(find=find_charger, on_notify=on_notify, cache_path=DEFAULT_CACHE_PATH)
+  await session.run(on_link)
+"""
+
+import asyncio
+import hashlib
+import json
+import pathlib
+import random
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from charger_scheduler import POLL_FRAMES
+
+try:
+    from bleak import BleakClient
+    _BLEAK_IMPORT_ERROR: Optional[Exception] = None
+except Exception as exc:  # pragma: no cover - env-specific dependency
+    BleakClient = Any  # type: ignore[assignment]
+    _BLEAK_IMPORT_ERROR = exc
+
+UUID_FFE1 = "0000ffe1-0000-1000-8000-00805f9b34fb"
+UUID_FFE2 = "0000ffe2-0000-1000-8000-00805f9b34fb"  # notify
+UUID_FFE3 = "0000ffe3-0000-1000-8000-00805f9b34fb"  # write
+
+DEFAULT_CACHE_PATH = pathlib.Path.home() / ".cache" / "r4830" / "charger_link.json"
+STARTUP_KICK = POLL_FRAMES  # 020101 / 020404 / 020505, same as the Flutter app quick-start
+AUTH_GAP_S = 0.06
+KICK_GAP_S = 0.12
+
+
+def uuid16(raw: str) -> str:
+    lower = raw.lower()
+    match = re.search(r"([0-9a-f]{4})(?:-0000-1000-8000-00805f9b34fb)?$", lower)
+    if match:
+        return match.group(1)
+    return lower[-4:]
+
+
+def auth_chunks(password: str, max_chunk_bytes: int = 20) -> List[bytes]:
+    normalized = password.strip()
+    digest = hashlib.md5(normalized.encode("utf-8")).hexdigest().upper()
+    data = digest.encode("ascii") + b"\x00"
+    cmd_id = 0x02
+    frame = bytes([len(data) + 2, cmd_id]) + data
+    checksum = sum(frame[1:]) & 0xFF
+    frame += bytes([checksum])
+    if max_chunk_bytes <= 0 or len(frame) <= max_chunk_bytes:
+        return [frame]
+    chunks = []
+    for i in range(0, len(frame), max_chunk_bytes):
+        chunks.append(frame[i : i + max_chunk_bytes])
+    return chunks
+
+
+def pick_chars_from_services(services: Any, preferred_rx: str, preferred_tx: str) -> Tuple[str, str]:
+    rx_candidates: List[Tuple[str, Any]] = []
+    tx_candidates: List[Tuple[str, Any]] = []
+
+    for svc in services:
+        for chr_obj in svc.characteristics:
+            props = set(chr_obj.properties)
+            if "notify" in props or "indicate" in props:
+                rx_candidates.append((str(chr_obj.uuid), chr_obj))
+            if "write" in props or "write-without-response" in props:
+                tx_candidates.append((str(chr_obj.uuid), chr_obj))
+
+    pref_rx_16 = uuid16(preferred_rx)
+    pref_tx_16 = uuid16(preferred_tx)
+
+    def _find_pref(cands: Sequence[Tuple[str, Any]], target_16: str) -> Optional[str]:
+        for uuid, _ in cands:
+            if uuid16(uuid) == target_16:
+                return uuid
+        return None
+
+    rx_uuid = _find_pref(rx_candidates, pref_rx_16) or (rx_candidates[0][0] if rx_candidates else "")
+    tx_uuid = _find_pref(tx_candidates, pref_tx_16) or (tx_candidates[0][0] if tx_candidates else "")
+
+    if not rx_uuid:
+        raise RuntimeError("no RX notify/indicate characteristic found")
+    if not tx_uuid:
+        raise RuntimeError("no TX write characteristic found")
+    return rx_uuid, tx_uuid
+
+
+def service_of(services: Any, char_uuid: str) -> Optional[str]:
+    for svc in services:
+        if any(str(c.uuid).lower() == char_uuid.lower() for c in svc.characteristics):
+            return str(svc.uuid)
+    return None
+
+
+@dataclass
+class LinkCache:
+    address: str
+    name: str = ""
+    service_uuid: Optional[str] = UUID_FFE1
+    rx_uuid: str = UUID_FFE2
+    tx_uuid: str = UUID_FFE3
+    saved_at: float = 0.0
+
+    @classmethod
+    def load(cls, path) -> Optional["LinkCache"]:
+        try:
+            data = json.loads(pathlib.Path(path).read_text())
+            return cls(**{k: data[k] for k in cls.__dataclass_fields__ if k in data})
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def save(self, path):
+        p = pathlib.Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        self.saved_at = time.time()
+        tmp = p.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(self), indent=2) + "\n")
+        tmp.replace(p)
+
+
+class ChargerSession:
+    def __init__(
+        self,
+        *,
+        find: Callable[[], Awaitable[Any]],
+        on_notify: Callable[[Any, bytearray], None],
+        cache: Optional[LinkCache] = None,
+        cache_path=None,
+        address: Optional[str] = None,
+        preferred_rx: str = UUID_FFE2,
+        preferred_tx: str = UUID_FFE3,
+        password: Optional[str] = None,
+        kick: Sequence[bytes] = STARTUP_KICK,
+        on_tx: Optional[Callable[[bytes, str], None]] = None,
+        reconnect: bool = True,
+        connect_timeout_s: float = 5.0,
+        backoff_s: float = 0.25,
+        backoff_max_s: float = 30.0,
+        max_attempts: int = 0,
+        name: str = "",
+    ):
+        self.find = find
+        self.on_notify = on_notify
+        self.cache_path = cache_path
+        if cache is None and cache_path is not None:
+            cache = LinkCache.load(cache_path)
+        if cache is not None and address and cache.address.lower() != address.lower():
+            cache = None
+        self.cache = cache
+        self.address = address
+        self.preferred_rx = preferred_rx
+        self.preferred_tx = preferred_tx
+        self.password = password
+        self.kick = tuple(kick)
+        self.on_tx = on_tx
+        self.reconnect = reconnect
+        self.connect_timeout_s = connect_timeout_s
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self.max_attempts = max_attempts
+        self.name = name
+
+        self.client = None
+        self.rx_uuid = preferred_rx
+        self.tx_uuid = preferred_tx
+        self.cached_connect = False
+        self._lost = asyncio.Event()
+
+        self.connects = 0
+        self.drops = 0
+        self.scans = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.failures = 0
+        self.last_connect_s: Optional[float] = None
+
+    def _log(self, msg: str):
+        print(f"[{self.name}] {msg}" if self.name else msg)
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None and self.client.is_connected and not self._lost.is_set()
+
+    def _on_disconnect(self, _client):
+        self._lost.set()
+
+    def _backoff(self, failures: int) -> float:
+        delay = min(self.backoff_max_s, self.backoff_s * (2 ** max(0, failures - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    # --- connecting ---
+
+    async def _open(self, target, service_uuid: Optional[str]):
+        client = BleakClient(
+            target,
+            disconnected_callback=self._on_disconnect,
+            services=[service_uuid] if service_uuid else None,
+            timeout=self.connect_timeout_s,
+            bluez={"use_cached_services": True},
+        )
+        await client.connect()
+        return client
+
+    async def _close(self, client):
+        try:
+            await client.stop_notify(self.rx_uuid)
+        except Exception:
+            pass
+        try:
+            await client.disconnect()
+        except Exception:
+            pass
+
+    async def _connect(self):
+        t0 = time.perf_counter()
+        self._lost.clear()
+        client = None
+        if self.cache is not None:
+            try:
+                client = await self._open(self.cache.address, self.cache.service_uuid)
+                self.cache_hits += 1
+            except Exception as e:
+                self.cache_misses += 1
+                self._log(f"cached connect to {self.cache.address} failed ({e}); scanning")
+        self.cached_connect = client is not None
+
+        if client is None:
+            self.scans += 1
+            device = await self.find()
+            if not device:
+                raise RuntimeError("charger not found during scan window")
+            client = await self._open(device, None)
+            rx_uuid, tx_uuid = self.preferred_rx, self.preferred_tx
+            services = getattr(client, "services", None)
+            try:
+                if services:
+                    rx_uuid, tx_uuid = pick_chars_from_services(services, self.preferred_rx, self.preferred_tx)
+            except Exception:
+                # Keep the preferred UUIDs when service introspection is unavailable.
+                pass
+            self.cache = LinkCache(
+                address=str(getattr(device, "address", device)),
+                name=getattr(device, "name", "") or "",
+                service_uuid=service_of(services, rx_uuid) if services else None,
+                rx_uuid=rx_uuid,
+                tx_uuid=tx_uuid,
+            )
+            if self.cache_path is not None:
+                try:
+                    self.cache.save(self.cache_path)
+                except OSError as e:
+                    self._log(f"could not save link cache: {e}")
+
+        self.rx_uuid, self.tx_uuid = self.cache.rx_uuid, self.cache.tx_uuid
+        try:
+            await client.start_notify(self.rx_uuid, self.on_notify)
+            await self._handshake(client)
+        except BaseException:
+            await self._close(client)
+            if self.cached_connect:
+                self.cache = None  # stale address/UUIDs: scan on the next attempt
+            raise
+        self.client = client
+        self.connects += 1
+        self.last_connect_s = time.perf_counter() - t0
+        how = "cached address" if self.cached_connect else "scan"
+        self._log(f"connected to {self.cache.address} via {how} in {self.last_connect_s * 1000.0:.0f} ms")
+        return client
+
+    async def _handshake(self, client):
+        frames = []
+        if self.password is not None:
+            chunks = auth_chunks(self.password, max_chunk_bytes=20)
+            frames += [(c, f"auth:{i}/{len(chunks)}", AUTH_GAP_S) for i, c in enumerate(chunks, start=1)]
+        frames += [(k, f"startup:{k.hex()}", KICK_GAP_S) for k in self.kick]
+        for n, (payload, note, gap) in enumerate(frames, start=1):
+            await client.write_gatt_char(self.tx_uuid, payload, response=False)
+            if self.on_tx is not None:
+                self.on_tx(payload, note)
+            if n < len(frames):
+                await asyncio.sleep(gap)
+
+    async def _watch(self, client, poll_s=0.5):
+        # disconnected_callback is the fast path; polling covers backends that don't call it.
+        while client.is_connected and not self._lost.is_set():
+            try:
+                await asyncio.wait_for(self._lost.wait(), poll_s)
+            except asyncio.TimeoutError:
+                pass
+        self._lost.set()
+
+    # --- main loop ---
+
+    async def run(self, on_link: Callable[[Any], Awaitable[Any]]):
+        """Call on_link(client) on every connection until it returns; reconnect when the link drops."""
+        client = await self._connect()
+        while True:
+            link_task = asyncio.create_task(on_link(client))
+            watch_task = asyncio.create_task(self._watch(client))
+            try:
+                await asyncio.wait({link_task, watch_task}, return_when=asyncio.FIRST_COMPLETED)
+                if link_task.done():
+                    return link_task.result()
+            finally:
+                for task in (link_task, watch_task):
+                    task.cancel()
+                await asyncio.gather(link_task, watch_task, return_exceptions=True)
+                self.client = None
+                await self._close(client)
+
+            self.drops += 1
+            self._log("link lost")
+            if not self.reconnect:
+                raise ConnectionError("charger link lost")
+            client = await self._reconnect()
+
+    async def _reconnect(self):
+        failures = 0
+        while True:
+            delay = self._backoff(failures + 1)
+            self._log(f"reconnecting in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            try:
+                return await self._connect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                self.failures += 1
+                self._log(f"reconnect attempt {failures} failed: {e}")
+                if self.max_attempts and failures >= self.max_attempts:
+                    raise
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "address": self.cache.address if self.cache else None,
+            "connects": self.connects,
+            "drops": self.drops,
+            "scans": self.scans,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "failures": self.failures,
+            "last_connect_ms": None if self.last_connect_s is None else round(self.last_connect_s * 1000.0, 1),
+        }
@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+"""
+charger_sim.py — offline R4830 stand-in for load and latency testing (no radio).
+
+SimTransport provides BleakClient / BleakScanner look-alikes backed by
+simulated chargers, and install() swaps them into any module that uses bleak
+through module-level names (charger_ctl, two_run_rx_capture, ...). Everything
+above the transport (FrameReassembler, AckTracker, WriteScheduler) runs
+unchanged.
+
+What a SimCharger answers, per controller/backend/ble_definitions.yaml and
+the capture_compare_LOGS sessions:
+
+  23 02 <md5 ascii> ..      auth (two writes)  -> 03 02 01 03
+  02 01 01                  poll               -> 0b 01 "tps_2.1.4" firmware frame
+  02 04 04                  poll               -> 12 04 info frame
+  02 05 05                  poll               -> 69 05 settings frame (106 bytes)
+  02 06 06                  keepalive          -> 30 06 telemetry frame (49 bytes)
+  06 <cmd> <4 bytes> <cs>   set command        -> 03 <cmd> 01 <cs>, applied to the 6905 state
+  05 <cmd> <3 bytes> <cs>   set command        -> 03 <cmd> 01 <cs>
+
+On top of that it can stream unsolicited 3006 / 6905 frames at fixed rates.
+Writes are reassembled into frames the same way notifications are, so frames
+with a bad checksum get no reply. Replies go out after a configurable delay,
+in MTU-sized notifications (20 bytes by default, so long frames arrive split
+like they do on a phone). --sim-drop-after cuts every connection after a
+fixed time and reports it through disconnected_callback, for exercising
+reconnects (charger_session.py).
+
+ReplayCharger plays the RX frames of a recorded JSONL capture instead
+(two_run_rx_capture or btsnoop_ble_extract format), keeping the recorded
+spacing scaled by --sim-speed, and still acks set commands.
+
+Tools opt in with add_sim_args() / install_from_args():
+  python3 charger_ctl.py --sim --telemetry
+  python3 charger_ctl.py --sim-replay "swift/scripts/capture_compare_LOGS/2-7-26-5-21-(1).txt" --raw
+  python3 charger_fleet.py --sim --sim-units 4
+
+Standalone self-test (keepalive + set commands against the simulator, prints
+throughput and ack latency):
+  python3 charger_sim.py --seconds 10 --commands 50
+  python3 charger_sim.py --telemetry-hz 50 --mtu 185 --delay-ms 5
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import math
+import random
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import capture_loader
+from charger_framing import FrameReassembler, checksum_ok
+
+COMPANY_ID = 0x6666
+ADV_PREFIX = b"hwcdq"
+UUID_FFE1 = "0000ffe1-0000-1000-8000-00805f9b34fb"
+UUID_FFE2 = "0000ffe2-0000-1000-8000-00805f9b34fb"  # notify
+UUID_FFE3 = "0000ffe3-0000-1000-8000-00805f9b34fb"  # write
+
+AUTH_ACK = bytes.fromhex("03020103")
+FIRMWARE_FRAME = bytes.fromhex("0b017470735f322e312e34aa")
+INFO_1204_FRAME = bytes.fromhex("12040286302672bb347c454325f921b1f00c33")
+# Settings and telemetry as captured on the bench (capture_compare_LOGS, run1).
+SETTINGS_6905_TEMPLATE = bytes.fromhex(
+    "6905000015430000003f000022430000204101af304440860843400000803f0000803f"
+    "0000324300009041019a99993e014b0150233743686172676546617374000000000000"
+    "000000000000000000001643cdcc4c3f010308dc05c409656e000000000000000000007f"
+)
+TELEMETRY_3006_TEMPLATE = bytes.fromhex(
+    "30060020f5420000000000996f4200008e410000a84195ef604000000000000000000000"
+    "00000100000000000000000185"
+)
+
+POLL_REPLIES = {
+    bytes.fromhex("020101"): "firmware",
+    bytes.fromhex("020404"): "info",
+    bytes.fromhex("020505"): "settings",
+    bytes.fromhex("020606"): "telemetry",
+}
+
+# Where a 0x06 command lands in the 0x6905 frame; same table as
+# r4830_command_tool.SETTINGS_6905_FIELDS, keyed by command id.
+CMD06_SETTINGS = {
+    0x07: ("f32", 2),
+    0x08: ("f32", 6),
+    0x0B: ("u8", 18),
+    0x0C: ("flag_inv", 77),  # 0 = output on; the frame reports 1 = on
+    0x14: ("bit", 87, 0x02),
+    0x15: ("f32", 44),
+    0x20: ("bit_inv", 87, 0x04),
+    0x21: ("f32", 78),
+    0x22: ("f32", 82),
+    0x23: ("u8", 86),
+    0x26: ("u8", 88),
+    0x27: ("u16", 89),
+}
+LANGUAGE_CMD = 0x2A
+LANGUAGE_OFF = 93
+
+
+def finish_frame(frame: bytearray) -> bytes:
+    """Fix up the length byte and checksum of a frame built in place."""
+    frame[0] = len(frame) - 1
+    frame[-1] = sum(frame[1:-1]) & 0xFF
+    return bytes(frame)
+
+
+def ack_frame(cmd_id: int, status: int = 1) -> bytes:
+    return bytes([0x03, cmd_id, status, (cmd_id + status) & 0xFF])
+
+
+@dataclass
+class SimDevice:
+    address: str
+    name: str
+    rssi: int = -50
+    metadata: dict = field(default_factory=dict)
+
+
+@dataclass
+class SimAdvertisement:
+    local_name: str
+    manufacturer_data: Dict[int, bytes]
+    service_uuids: List[str]
+    rssi: int = -50
+
+
+class SimCharger:
+    """One simulated unit: protocol replies, 6905 settings state and a simple telemetry model."""
+
+    def __init__(
+        self,
+        address="SIM:00",
+        name="ChargeFast",
+        *,
+        delay_s=0.03,
+        jitter_s=0.01,
+        mtu=20,
+        telemetry_hz=0.0,
+        settings_hz=0.0,
+        vin=230.0,
+        seed=None,
+    ):
+        self.address = address
+        self.name = name
+        self.delay_s = delay_s
+        self.jitter_s = jitter_s
+        self.mtu = mtu
+        self.telemetry_hz = telemetry_hz
+        self.settings_hz = settings_hz
+        self.vin = vin
+        self.rng = random.Random(seed)
+        self.settings = bytearray(SETTINGS_6905_TEMPLATE)
+        self.started = time.monotonic()
+
+        self.writes = 0
+        self.acks = 0
+        self.frames_out = 0
+        self.notifications = 0
+        self.unknown_writes = 0
+        self.drops = 0
+
+    # --- protocol ---
+
+    def handle_write(self, frame: bytes) -> List[bytes]:
+        """Frames the charger sends back for one whole, checksum-verified written frame."""
+        self.writes += 1
+        reply = POLL_REPLIES.get(frame)
+        if reply is not None:
+            return [self.frame(reply)]
+        if frame[1] == 0x02 and len(frame) > 3:
+            return [AUTH_ACK]
+        if frame[0] == 0x06 and len(frame) == 7:
+            self.apply_cmd06(frame[1], frame[2:6])
+            self.acks += 1
+            return [ack_frame(frame[1])]
+        if frame[0] == 0x05 and len(frame) == 6:
+            if frame[1] == LANGUAGE_CMD:
+                self.settings[LANGUAGE_OFF:LANGUAGE_OFF + 2] = frame[2:4]
+            self.acks += 1
+            return [ack_frame(frame[1])]
+        self.unknown_writes += 1
+        return []
+
+    def apply_cmd06(self, cmd_id: int, value: bytes):
+        spec = CMD06_SETTINGS.get(cmd_id)
+        if spec is None:
+            return
+        kind, off = spec[0], spec[1]
+        n = struct.unpack("<I", value)[0]
+        if kind == "f32":
+            self.settings[off:off + 4] = value
+        elif kind == "u8":
+            self.settings[off] = n & 0xFF
+        elif kind == "flag_inv":
+            self.settings[off] = 0 if n else 1
+        elif kind == "u16":
+            self.settings[off:off + 2] = struct.pack("<H", n & 0xFFFF)
+        elif (kind == "bit") == bool(n):
+            self.settings[off] |= spec[2]
+        else:
+            self.settings[off] &= ~spec[2] & 0xFF
+
+    def frame(self, kind: str) -> bytes:
+        if kind == "firmware":
+            return FIRMWARE_FRAME
+        if kind == "info":
+            return INFO_1204_FRAME
+        if kind == "settings":
+            return finish_frame(bytearray(self.settings))
+        return self.telemetry()
+
+    # --- telemetry model ---
+
+    def _setting_f32(self, off: int) -> float:
+        v = struct.unpack_from("<f", self.settings, off)[0]
+        return v if math.isfinite(v) else 0.0
+
+    @property
+    def output_enabled(self) -> bool:
+        return self.settings[77] == 1
+
+    def telemetry(self) -> bytes:
+        t = time.monotonic() - self.started
+        noise = self.rng.gauss
+        vin = self.vin + noise(0.0, 0.3)
+        hz = 50.0 + noise(0.0, 0.02)
+        vout = iout = pin = 0.0
+        eff = 0.0
+        if self.output_enabled:
+            vout = max(0.0, self._setting_f32(2) - 0.4 + noise(0.0, 0.05))
+            iset = max(0.0, self._setting_f32(6))
+            limit_w = struct.unpack_from("<H", self.settings, 89)[0]
+            if limit_w and vout > 1.0:
+                iset = min(iset, limit_w / vout)
+            iout = max(0.0, iset + noise(0.0, 0.02))
+            eff = 94.0 + noise(0.0, 0.2)
+            pin = vout * iout / (eff / 100.0)
+        iin = pin / vin if vin > 1.0 else 0.0
+        # Temperatures drift up with load and settle over a few minutes.
+        warm = 1.0 - math.exp(-t / 120.0)
+        t1 = 25.0 + warm * pin / 60.0 + noise(0.0, 0.1)
+        t2 = 24.0 + warm * pin / 80.0 + noise(0.0, 0.1)
+
+        frame = bytearray(TELEMETRY_3006_TEMPLATE)
+        struct.pack_into("<9f", frame, 2, vin, iin, hz, t1, t2, vout, iout, pin, eff)
+        frame[38] = 1 if self.output_enabled else 0
+        return finish_frame(frame)
+
+    def stream_rates(self) -> List[Tuple[float, str]]:
+        return [(hz, kind) for hz, kind in ((self.telemetry_hz, "telemetry"), (self.settings_hz, "settings")) if hz > 0]
+
+    def reply_delay(self) -> float:
+        return max(0.0, self.delay_s + self.rng.uniform(-self.jitter_s, self.jitter_s))
+
+    def chunks(self, frame: bytes) -> List[bytes]:
+        mtu = max(1, self.mtu)
+        return [frame[i:i + mtu] for i in range(0, len(frame), mtu)]
+
+    def stats(self) -> dict:
+        return {
+            "writes": self.writes,
+            "acks": self.acks,
+            "frames_out": self.frames_out,
+            "notifications": self.notifications,
+            "unknown_writes": self.unknown_writes,
+            "drops": self.drops,
+        }
+
+
+def _ts_seconds(evt: dict) -> Optional[float]:
+    if "ts_us" in evt:
+        return float(evt["ts_us"]) / 1e6
+    ts = evt.get("ts")
+    if isinstance(ts, (int, float)):
+        return float(ts) / 1e6  # btsnoop_ble_extract timestamps are in microseconds
+    if isinstance(ts, str):
+        try:
+            return dt.datetime.fromisoformat(ts).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class ReplayCharger(SimCharger):
+    """Plays back the RX side of a capture log; set commands still get acks."""
+
+    def __init__(self, path: str, *, speed=1.0, loop=True, **kw):
+        super().__init__(**kw)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.timeline: List[Tuple[float, bytes]] = []
+        t0 = None
+        prev = 0.0
+        for evt, payload in capture_loader.iter_capture(path, direction="RX"):
+            ts = _ts_seconds(evt)
+            if ts is None:
+                ts = prev
+            if t0 is None:
+                t0 = ts
+            prev = ts
+            self.timeline.append((max(0.0, ts - t0), payload))
+        if not self.timeline:
+            raise ValueError(f"{path}: no RX frames to replay")
+        for _, payload in reversed(self.timeline):
+            if payload[:2] == b"\x69\x05" and len(payload) == len(SETTINGS_6905_TEMPLATE):
+                self.settings = bytearray(payload)
+                break
+
+    def handle_write(self, frame: bytes) -> List[bytes]:
+        if frame[0] in (0x05, 0x06):
+            return super().handle_write(frame)
+        # Polls and keepalives are answered by the recording itself.
+        self.writes += 1
+        return []
+
+    def stream_rates(self) -> List[Tuple[float, str]]:
+        return []
+
+
+class SimClient:
+    """BleakClient stand-in: connect, start_notify, write_gatt_char, services."""
+
+    _transport: "SimTransport" = None  # set on the per-transport subclass
+
+    def __init__(self, address_or_device, disconnected_callback=None, *args, **kwargs):
+        address = getattr(address_or_device, "address", address_or_device)
+        charger = self._transport.chargers.get(str(address))
+        if charger is None:
+            raise RuntimeError(f"no simulated charger at {address}")
+        self.address = charger.address
+        self.charger = charger
+        self.is_connected = False
+        self.services = [_SimService(UUID_FFE1, [
+            _SimCharacteristic(UUID_FFE2, ["notify", "read", "write-without-response"]),
+            _SimCharacteristic(UUID_FFE3, ["write", "write-without-response"]),
+        ])]
+        self._callbacks: Dict[str, Callable] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._next_due = 0.0
+        self._written = FrameReassembler()
+        self._disconnected_callback = disconnected_callback
+        self._drop_handle: Optional[asyncio.TimerHandle] = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.disconnect()
+
+    async def connect(self, **kwargs) -> bool:
+        if not self.is_connected:
+            await asyncio.sleep(self._transport.connect_delay_s)
+            self.is_connected = True
+            if self._transport.drop_after_s > 0:
+                loop = asyncio.get_running_loop()
+                self._drop_handle = loop.call_later(self._transport.drop_after_s, self._drop)
+        return True
+
+    async def disconnect(self) -> bool:
+        self._close_link()
+        return True
+
+    def _close_link(self):
+        self.is_connected = False
+        if self._drop_handle is not None:
+            self._drop_handle.cancel()
+            self._drop_handle = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        self._callbacks.clear()
+
+    def _drop(self):
+        # Link loss from the charger's side (--sim-drop-after): like a real drop, bleak reports it via the callback.
+        self._drop_handle = None
+        self.charger.drops += 1
+        self._close_link()
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+
+    async def start_notify(self, uuid, callback, **kwargs):
+        self._require_connected()
+        self._callbacks[str(uuid).lower()] = callback
+        for hz, kind in self.charger.stream_rates():
+            self._tasks.append(asyncio.create_task(self._stream(1.0 / hz, kind)))
+        if isinstance(self.charger, ReplayCharger):
+            self._tasks.append(asyncio.create_task(self._replay()))
+
+    async def stop_notify(self, uuid):
+        self._callbacks.pop(str(uuid).lower(), None)
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        self._require_connected()
+        if str(uuid).lower() not in (UUID_FFE2, UUID_FFE3):
+            raise RuntimeError(f"characteristic {uuid} not found")
+        # Writes are length-prefixed frames too; auth spans two 20-byte writes.
+        for frame in self._written.feed(bytes(data)):
+            for reply in self.charger.handle_write(frame):
+                self._send(reply, self.charger.reply_delay())
+
+    def _require_connected(self):
+        if not self.is_connected:
+            raise RuntimeError("not connected")
+
+    def _send(self, frame: bytes, delay: float):
+        # Keep replies in order even when a later one draws a shorter delay.
+        loop = asyncio.get_running_loop()
+        due = max(loop.time() + delay, self._next_due)
+        self._next_due = due
+        loop.call_at(due, self._deliver, frame)
+
+    def _deliver(self, frame: bytes):
+        callback = self._callbacks.get(UUID_FFE2)
+        if callback is None or not self.is_connected:
+            return
+        self.charger.frames_out += 1
+        for chunk in self.charger.chunks(frame):
+            self.charger.notifications += 1
+            callback(UUID_FFE2, bytearray(chunk))
+
+    async def _stream(self, interval: float, kind: str):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            self._deliver(self.charger.frame(kind))
+
+    async def _replay(self):
+        charger = self.charger
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            for offset, frame in charger.timeline:
+                wait = start + offset / charger.speed - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._deliver(frame)
+            if not charger.loop:
+                return
+            await asyncio.sleep(0)
+
+
+@dataclass
+class _SimCharacteristic:
+    uuid: str
+    properties: List[str]
+
+
+@dataclass
+class _SimService:
+    uuid: str
+    characteristics: List[_SimCharacteristic]
+
+
+class SimScanner:
+    """BleakScanner stand-in: every simulated charger advertises shortly after start()."""
+
+    _transport: "SimTransport" = None
+
+    def __init__(self, detection_callback=None, *args, **kwargs):
+        self._callback = detection_callback
+        self._handles: List[asyncio.TimerHandle] = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for i, charger in enumerate(self._transport.chargers.values()):
+            device, adv = self._transport.advertisement(charger)
+            if self._callback is not None:
+                delay = self._transport.adv_delay_s * (i + 1)
+                self._handles.append(loop.call_later(delay, self._callback, device, adv))
+
+    async def stop(self):
+        for h in self._handles:
+            h.cancel()
+        self._handles.clear()
+
+    @classmethod
+    async def discover(cls, timeout=5.0, **kwargs):
+        await asyncio.sleep(min(timeout, cls._transport.adv_delay_s))
+        return [cls._transport.advertisement(c)[0] for c in cls._transport.chargers.values()]
+
+
+class SimTransport:
+    """A set of simulated chargers plus BleakClient/BleakScanner classes bound to them."""
+
+    def __init__(self, chargers: List[SimCharger], *, adv_delay_s=0.05, connect_delay_s=0.05, drop_after_s=0.0):
+        self.chargers = {c.address: c for c in chargers}
+        self.adv_delay_s = adv_delay_s
+        self.connect_delay_s = connect_delay_s
+        self.drop_after_s = drop_after_s
+        self.BleakClient = type("BleakClient", (SimClient,), {"_transport": self})
+        self.BleakScanner = type("BleakScanner", (SimScanner,), {"_transport": self})
+
+    def advertisement(self, charger: SimCharger) -> Tuple[SimDevice, SimAdvertisement]:
+        mfg = {COMPANY_ID: ADV_PREFIX + charger.address.encode("ascii")[-4:]}
+        adv = SimAdvertisement(charger.name, mfg, [UUID_FFE1, UUID_FFE2, UUID_FFE3])
+        device = SimDevice(charger.address, charger.name, metadata={"manufacturer_data": mfg})
+        return device, adv
+
+    def stats(self) -> Dict[str, dict]:
+        return {addr: c.stats() for addr, c in self.chargers.items()}
+
+
+def install(transport: SimTransport, *modules):
+    """Point each module's BleakClient/BleakScanner at the simulator."""
+    for mod in modules:
+        mod.BleakClient = transport.BleakClient
+        mod.BleakScanner = transport.BleakScanner
+        if hasattr(mod, "_BLEAK_IMPORT_ERROR"):
+            mod._BLEAK_IMPORT_ERROR = None
+    return transport
+
+
+def add_sim_args(ap: argparse.ArgumentParser):
+    g = ap.add_argument_group("simulator (no radio; see charger_sim.py)")
+    g.add_argument("--sim", action="store_true", help="Talk to a simulated charger instead of BLE")
+    g.add_argument("--sim-replay", metavar="LOG", help="Simulated charger replays the RX frames of this JSONL capture")
+    g.add_argument("--sim-speed", type=float, default=1.0, help="Replay speed factor (default 1.0)")
+    g.add_argument("--sim-units", type=int, default=1, help="Number of simulated chargers advertising (default 1)")
+    g.add_argument("--sim-delay-ms", type=float, default=30.0, help="Reply delay in ms (default 30)")
+    g.add_argument("--sim-mtu", type=int, default=20, help="Notification payload size in bytes (default 20)")
+    g.add_argument("--sim-telemetry-hz", type=float, default=0.0,
+                   help="Extra unsolicited 3006 frames per second (default 0: only on keepalive)")
+    g.add_argument("--sim-settings-hz", type=float, default=0.0,
+                   help="Extra unsolicited 6905 frames per second (default 0: only on poll)")
+    g.add_argument("--sim-drop-after", type=float, default=0.0, metavar="SECONDS",
+                   help="Drop every connection after SECONDS, to exercise reconnects (default 0: never)")
+    return g
+
+
+def build_transport(
+    *,
+    replay=None,
+    speed=1.0,
+    units=1,
+    delay_s=0.03,
+    mtu=20,
+    telemetry_hz=0.0,
+    settings_hz=0.0,
+    drop_after_s=0.0,
+) -> SimTransport:
+    chargers = []
+    for i in range(max(1, units)):
+        kw = dict(address=f"SIM:{i:02X}", delay_s=delay_s, jitter_s=delay_s / 3, mtu=mtu, seed=i)
+        if replay:
+            chargers.append(ReplayCharger(replay, speed=speed, **kw))
+        else:
+            chargers.append(SimCharger(telemetry_hz=telemetry_hz, settings_hz=settings_hz, **kw))
+    return SimTransport(chargers, drop_after_s=drop_after_s)
+
+
+def install_from_args(args, *modules) -> Optional[SimTransport]:
+    """Install a simulator built from add_sim_args() options; None when --sim/--sim-replay weren't given."""
+    if not (args.sim or args.sim_replay):
+        return None
+    transport = build_transport(
+        replay=args.sim_replay,
+        speed=args.sim_speed,
+        units=args.sim_units,
+        delay_s=args.sim_delay_ms / 1000.0,
+        mtu=args.sim_mtu,
+        telemetry_hz=args.sim_telemetry_hz,
+        settings_hz=args.sim_settings_hz,
+        drop_after_s=args.sim_drop_after,
+    )
+    return install(transport, *modules)
+
+
+# --- standalone self-test ---
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return float("nan")
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+
+async def self_test(transport: SimTransport, seconds: float, commands: int) -> dict:
+    """Connect like charger_ctl does, keep alive, send set-amps commands; report rates and ack latency."""
+    import charger_ctl
+    from charger_acks import AckTracker
+    from charger_framing import FrameReassembler
+
+    install(transport, charger_ctl)
+    dev = await charger_ctl.find_charger(timeout=5)
+    counts: Dict[str, int] = {}
+    bad = 0
+    rtts: List[float] = []
+    async with charger_ctl.BleakClient(dev.address) as client:
+        acks = AckTracker()
+        reasm = FrameReassembler()
+
+        def on_notify(_sender, data):
+            nonlocal bad
+            for frame in reasm.feed(data):
+                if not checksum_ok(frame):
+                    bad += 1
+                acks.feed(frame)
+                key = frame[:2].hex()
+                counts[key] = counts.get(key, 0) + 1
+
+        await client.start_notify(UUID_FFE2, on_notify)
+        write_uuid, _ = await charger_ctl.select_write_uuid(client)
+        sched = charger_ctl.make_scheduler(client, write_uuid, name=dev.address)
+        sched.keepalive(1.0)
+        sched.poll(2.0)
+
+        t0 = time.monotonic()
+        gap = seconds / max(1, commands)
+        for i in range(commands):
+            result = await acks.send(sched, charger_ctl.build_set_amps(0.5 + (i % 20) * 0.5), note="amps")
+            if result.rtt_s is not None:
+                rtts.append(result.rtt_s)
+            await asyncio.sleep(max(0.0, t0 + (i + 1) * gap - time.monotonic()))
+        await asyncio.sleep(max(0.0, t0 + seconds - time.monotonic()))
+        elapsed = time.monotonic() - t0
+        await sched.close()
+
+    rtts.sort()
+    return {
+        "seconds": round(elapsed, 3),
+        "frames": counts,
+        "frames_per_s": round(sum(counts.values()) / elapsed, 1),
+        "bad_checksum": bad,
+        "resyncs": reasm.resyncs,
+        "acks": len(rtts),
+        "commands": commands,
+        "ack_ms_p50": round(_percentile(rtts, 0.50) * 1000, 2),
+        "ack_ms_p95": round(_percentile(rtts, 0.95) * 1000, 2),
+        "ack_ms_max": round(rtts[-1] * 1000, 2) if rtts else float("nan"),
+        "charger": transport.stats()[dev.address],
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Simulated R4830 charger: self-test throughput and ack latency.")
+    ap.add_argument("--seconds", type=float, default=5.0, help="Test duration (default 5)")
+    ap.add_argument("--commands", type=int, default=20, help="Set-amps commands spread over the run (default 20)")
+    ap.add_argument("--replay", metavar="LOG", help="Replay this JSONL capture instead of the model")
+    ap.add_argument("--speed", type=float, default=1.0, help="Replay speed factor (default 1.0)")
+    ap.add_argument("--delay-ms", type=float, default=30.0, help="Reply delay in ms (default 30)")
+    ap.add_argument("--mtu", type=int, default=20, help="Notification payload size (default 20)")
+    ap.add_argument("--telemetry-hz", type=float, default=0.0, help="Extra unsolicited 3006 frames per second")
+    ap.add_argument("--settings-hz", type=float, default=0.0, help="Extra unsolicited 6905 frames per second")
+    args = ap.parse_args(argv)
+
+    transport = build_transport(
+        replay=args.replay,
+        speed=args.speed,
+        delay_s=args.delay_ms / 1000.0,
+        mtu=args.mtu,
+        telemetry_hz=args.telemetry_hz,
+        settings_hz=args.settings_hz,
+    )
+    report = asyncio.run(self_test(transport, args.seconds, args.commands))
+    for key, value in report.items():
+        print(f"{key:>14}: {value}")
+    return 0 if report["acks"] == args.commands and not report["bad_checksum"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
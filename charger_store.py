@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+charger_store.py — append-only on-disk time series for decoded 0x3006 telemetry.
+
+Layout (one directory per store):
+  raw.bin        48-byte records: <f64 unix ts> <9 x f32: vin iin hz t1 t2 vout iout pin eff> <u8 output flag> <pad>
+  rollup_1s.bin  124-byte records: <i64 bucket start> <u32 sample count> <pad> <9 x (min, max, mean) f32>
+  rollup_1m.bin  same layout, built from rollup_1s
+  rollup_1h.bin  same layout, built from rollup_1m
+
+Files are only ever appended to. Rollups are rebuilt incrementally by roll_up():
+each level bisects its input for the end of its last finished bucket, so no
+separate checkpoint is kept and a crashed run just picks up where the files end.
+The bucket that is still filling is never written; it is finished by the first
+sample that lands in a later bucket.
+
+Readers mmap the files and bisect on timestamps, so a query over weeks at 1h
+resolution touches a few hundred rollup records and never the raw samples.
+
+Usage:
+  python3 charger_ctl.py --telemetry --store ~/r4830_tel
+  python3 charger_store.py info ~/r4830_tel
+  python3 charger_store.py query ~/r4830_tel --since 7d --resolution 1h
+"""
+
+import argparse
+import bisect
+import datetime as dt
+import math
+import mmap
+import os
+import struct
+import time
+
+FIELDS = ("vin", "iin", "hz", "t1", "t2", "vout", "iout", "pin", "eff")
+
+RAW = struct.Struct("<d9fB3x")
+ROLLUP = struct.Struct("<qI4x27f")
+
+# (name, bucket width in seconds); each level is built from the one before it.
+RESOLUTIONS = (("1s", 1), ("1m", 60), ("1h", 3600))
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(raw: str) -> float:
+    """'90s', '15m', '12h', '7d', '2w' -> seconds."""
+    raw = raw.strip().lower()
+    if raw and raw[-1] in _DURATION_UNITS:
+        return float(raw[:-1]) * _DURATION_UNITS[raw[-1]]
+    return float(raw)
+
+
+class _RecordFile:
+    """Read-only mmap view over a fixed-width record file."""
+
+    def __init__(self, path: str, rec: struct.Struct):
+        self.rec = rec
+        self._f = None
+        self._mm = None
+        self.n = 0
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            self.n = size // rec.size
+            if self.n:
+                self._f = open(path, "rb")
+                self._mm = mmap.mmap(self._f.fileno(), self.n * rec.size, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._f.close()
+            self._mm = self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n
+
+    def get(self, i: int):
+        return self.rec.unpack_from(self._mm, i * self.rec.size)
+
+    def ts(self, i: int) -> float:
+        # Both layouts start with the timestamp / bucket start.
+        return self.get(i)[0]
+
+    def bisect_left(self, t: float, lo: int = 0) -> int:
+        return bisect.bisect_left(range(self.n), t, lo=lo, key=self.ts)
+
+
+def _raw_as_rollup(rec):
+    # A raw sample is a bucket of one: min == max == mean.
+    ts, *vals = rec[:10]
+    return ts, 1, [v for v in vals for _ in range(3)]
+
+
+def _fold(width: int, records):
+    """Group (ts, count, 27 floats) inputs into finished buckets of `width` seconds."""
+    out = []
+    cur = None
+    count = 0
+    acc = None
+    for ts, n, stats in records:
+        bucket = int(math.floor(ts / width)) * width
+        if bucket != cur:
+            if cur is not None:
+                out.append((cur, count, acc))
+            cur, count = bucket, 0
+            acc = [math.inf, -math.inf, 0.0] * len(FIELDS)
+        for k in range(len(FIELDS)):
+            lo, hi, mean = stats[3 * k], stats[3 * k + 1], stats[3 * k + 2]
+            if lo < acc[3 * k]:
+                acc[3 * k] = lo
+            if hi > acc[3 * k + 1]:
+                acc[3 * k + 1] = hi
+            acc[3 * k + 2] += mean * n
+        count += n
+    if cur is not None:
+        out.append((cur, count, acc))
+    finished = []
+    for bucket, n, a in out:
+        for k in range(len(FIELDS)):
+            a[3 * k + 2] /= n
+        finished.append((bucket, n, a))
+    return finished
+
+
+class TelemetryStore:
+    """Writer + reader for one store directory."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        os.makedirs(self.path, exist_ok=True)
+        self._raw = None
+        self._last_ts = None
+        self.dropped_out_of_order = 0
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def rollup_path(self, resolution: str) -> str:
+        return self._file(f"rollup_{resolution}.bin")
+
+    # --- writing ---
+
+    def append(self, ts: float, values, output_flag: int = 0) -> bool:
+        """Append one sample (values in FIELDS order). Out-of-order samples are dropped."""
+        if self._raw is None:
+            raw_path = self._file("raw.bin")
+            self._trim_partial(raw_path, RAW)
+            if self._last_ts is None:
+                with _RecordFile(raw_path, RAW) as rf:
+                    self._last_ts = rf.ts(len(rf) - 1) if len(rf) else None
+            self._raw = open(raw_path, "ab")
+        if self._last_ts is not None and ts < self._last_ts:
+            self.dropped_out_of_order += 1
+            return False
+        vals = list(values[: len(FIELDS)])
+        vals += [math.nan] * (len(FIELDS) - len(vals))
+        self._raw.write(RAW.pack(ts, *vals, output_flag & 0xFF))
+        self._last_ts = ts
+        return True
+
+    def append_3006(self, data: bytes, ts: float = None) -> bool:
+        """Append a raw 0x3006 notification (offsets as in charger_ctl.TELEMETRY_3006_FIELDS)."""
+        if len(data) < 39 or data[0] != 0x30 or data[1] != 0x06:
+            return False
+        vals = struct.unpack_from("<9f", data, 2)
+        return self.append(time.time() if ts is None else ts, vals, data[38])
+
+    def flush(self):
+        if self._raw is not None:
+            self._raw.flush()
+
+    def close(self):
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        self.roll_up()
+
+    @staticmethod
+    def _trim_partial(path: str, rec: struct.Struct):
+        # A torn write from a crash leaves a partial record; drop it before appending.
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            if size % rec.size:
+                with open(path, "r+b") as f:
+                    f.truncate(size - size % rec.size)
+
+    def roll_up(self) -> dict:
+        """Finish every complete bucket at every resolution. Safe to run in a worker thread."""
+        written = {}
+        src_path, src_rec, convert = self._file("raw.bin"), RAW, _raw_as_rollup
+        for name, width in RESOLUTIONS:
+            dst_path = self.rollup_path(name)
+            self._trim_partial(dst_path, ROLLUP)
+            with _RecordFile(dst_path, ROLLUP) as dst, _RecordFile(src_path, src_rec) as src:
+                start = 0
+                if len(dst):
+                    start = src.bisect_left(dst.ts(len(dst) - 1) + width)
+                buckets = _fold(width, (convert(src.get(i)) for i in range(start, len(src))))
+            # The last bucket may still be filling; leave it for a later pass.
+            buckets = buckets[:-1]
+            if buckets:
+                with open(dst_path, "ab") as f:
+                    for bucket, n, stats in buckets:
+                        f.write(ROLLUP.pack(bucket, n, *stats))
+            written[name] = len(buckets)
+            src_path, src_rec = dst_path, ROLLUP
+            convert = lambda rec: (rec[0], rec[1], rec[2:])  # noqa: E731
+        return written
+
+    # --- reading ---
+
+    def query(self, start: float, end: float, resolution: str = "auto", max_points: int = 2000):
+        """
+        Rows for [start, end). resolution is "raw", "1s", "1m", "1h" or "auto"
+        (coarsest level that still gives at least max_points / 60 rows, so
+        week-long ranges come from the 1h file).
+
+        Raw rows: (ts, {field: value}, output_flag)
+        Rollup rows: (bucket_start, count, {field: (min, max, mean)})
+        """
+        if resolution == "auto":
+            span = max(0.0, end - start)
+            resolution = "1s"
+            for name, width in RESOLUTIONS:
+                if span / width >= max_points / 60:
+                    resolution = name
+        if resolution == "raw":
+            with _RecordFile(self._file("raw.bin"), RAW) as rf:
+                i = rf.bisect_left(start)
+                rows = []
+                while i < len(rf):
+                    rec = rf.get(i)
+                    if rec[0] >= end:
+                        break
+                    rows.append((rec[0], dict(zip(FIELDS, rec[1:10])), rec[10]))
+                    i += 1
+                return resolution, rows
+        width = dict(RESOLUTIONS)[resolution]
+        with _RecordFile(self.rollup_path(resolution), ROLLUP) as rf:
+            # Include the bucket that contains `start`.
+            i = rf.bisect_left(math.floor(start / width) * width)
+            rows = []
+            while i < len(rf):
+                rec = rf.get(i)
+                if rec[0] >= end:
+                    break
+                stats = rec[2:]
+                rows.append((rec[0], rec[1], {f: tuple(stats[3 * k : 3 * k + 3]) for k, f in enumerate(FIELDS)}))
+                i += 1
+            return resolution, rows
+
+    def info(self) -> dict:
+        out = {}
+        for name, path, rec in [("raw", self._file("raw.bin"), RAW)] + [
+            (name, self.rollup_path(name), ROLLUP) for name, _ in RESOLUTIONS
+        ]:
+            with _RecordFile(path, rec) as rf:
+                out[name] = (len(rf), rf.ts(0) if len(rf) else None, rf.ts(len(rf) - 1) if len(rf) else None)
+        return out
+
+
+def _fmt_ts(ts) -> str:
+    if ts is None:
+        return "-"
+    return dt.datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Inspect a charger telemetry store.")
+    sub = ap.add_subparsers(dest="subcmd", required=True)
+    sp_info = sub.add_parser("info", help="Record counts and time span per level")
+    sp_info.add_argument("store")
+    sp_q = sub.add_parser("query", help="Print rows for a time range")
+    sp_q.add_argument("store")
+    sp_q.add_argument("--since", default="1h", help="Range start relative to now (e.g. 15m, 12h, 7d)")
+    sp_q.add_argument("--until", help="Range end relative to now (default: now)")
+    sp_q.add_argument("--resolution", choices=["auto", "raw"] + [n for n, _ in RESOLUTIONS], default="auto")
+    sp_q.add_argument("--field", action="append", choices=FIELDS, help="Fields to print (default: all)")
+    sp_ru = sub.add_parser("rollup", help="Finish pending rollup buckets")
+    sp_ru.add_argument("store")
+    args = ap.parse_args(argv)
+
+    store = TelemetryStore(args.store)
+    if args.subcmd == "info":
+        for name, (n, first, last) in store.info().items():
+            print(f"{name:4s} records={n:<9d} first={_fmt_ts(first)} last={_fmt_ts(last)}")
+        return 0
+    if args.subcmd == "rollup":
+        print(" ".join(f"{k}+={v}" for k, v in store.roll_up().items()))
+        return 0
+
+    now = time.time()
+    start = now - parse_duration(args.since)
+    end = now - parse_duration(args.until) if args.until else now
+    fields = args.field or list(FIELDS)
+    resolution, rows = store.query(start, end, args.resolution)
+    print(f"# resolution={resolution} rows={len(rows)}")
+    for row in rows:
+        if resolution == "raw":
+            ts, vals, flag = row
+            print(_fmt_ts(ts), " ".join(f"{f}={vals[f]:.3f}" for f in fields), f"out={flag}")
+        else:
+            ts, n, stats = row
+            print(_fmt_ts(ts), f"n={n}", " ".join(
+                f"{f}={stats[f][2]:.3f}[{stats[f][0]:.3f}..{stats[f][1]:.3f}]" for f in fields))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,12 +17,41 @@ Outputs JSONL, one event per line:
 Notes:
 - This does NOT try to map handles to UUIDs; that's phase 2 using your ble_definitions.yaml + captured GATT DB.
 - This is built to be robust: it parses btsnoop (header + per-record), then HCI ACL, then L2CAP, then ATT.
+- Two engines produce identical JSONL:
+  - "stream": reference path (parse_btsnoop_record -> parse_hci_acl -> parse_l2cap -> parse_att).
+  - "mmap" (default): maps the file and walks headers with struct.unpack_from on a memoryview,
+    tracking offsets instead of slicing; only ATT events that survive filtering get hex-encoded.
+- ACL fragments are reassembled into whole L2CAP frames (keyed by ACL handle + direction)
+  before ATT decoding, so long 0x6905/0x3006 notifications split across ACL packets come out
+  whole. Partial frames live in bounded buffers and are evicted when stale. A reassembled
+  event carries the ts/flags of its last fragment, the pb/bc of its first, and the full
+  L2CAP frame as raw_hex. --no-reassemble restores the old per-fragment output.
+- --format npz writes the columnar capture format from capture_columnar.py (repo root)
+  instead of JSONL: fixed ts/dir/opcode/handle columns plus one packed payload buffer.
+- --jobs N builds a record-offset index first, then decodes contiguous record ranges in a
+  process pool. Shards are written back in record order, so the output matches the serial
+  path byte for byte.
 """
 
-import argparse, struct, json, sys
-from typing import Optional, Tuple
+import argparse, array, itertools, mmap, os, pathlib, struct, json, sys
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 
 BTSNOOP_MAGIC = b"btsnoop\0"
+BTSNOOP_HEADER_LEN = 16
+RECORD_HDR = struct.Struct(">IIIIQ")  # orig_len, incl_len, flags, drops, ts
+ACL_HDR = struct.Struct("<HH")        # handle_pb_bc, data_total_len
+L2CAP_HDR = struct.Struct("<HH")      # len, cid
+ATT_HANDLE = struct.Struct("<H")
+ATT_CID = 0x0004
+ATT_HANDLE_OPCODES = (0x12, 0x52, 0x1B, 0x1D)
+ACL_PB_CONTINUATION = 0x1
+
+# Reassembly bounds: LE ATT MTU tops out at 517, so 4 KiB per frame is generous.
+REASSEMBLY_MAX_FRAME = 4096
+REASSEMBLY_MAX_PARTIALS = 64
+REASSEMBLY_STALE_US = 2_000_000  # btsnoop ts is in microseconds
 
 def read_exact(f, n: int) -> bytes:
     b = f.read(n)
@@ -109,65 +138,401 @@ def opcode_name(op: int) -> str:
         0x0B: "ATT_READ_RSP",
     }.get(op, f"ATT_0x{op:02X}")
 
+class L2capReassembler:
+    """Streaming ACL -> L2CAP reassembly keyed by (ACL handle, direction).
+
+    push() returns (frame, pb, bc) once a complete L2CAP frame is available,
+    where pb/bc come from the first fragment, otherwise None. Frames that fit
+    in one ACL packet are returned as-is without copying. Memory is bounded by
+    max_partials * max_frame no matter how long the capture is.
+    """
+
+    def __init__(self, max_frame=REASSEMBLY_MAX_FRAME, max_partials=REASSEMBLY_MAX_PARTIALS,
+                 stale_us=REASSEMBLY_STALE_US):
+        self.max_frame = max_frame
+        self.max_partials = max_partials
+        self.stale_us = stale_us
+        # key -> [expected_len, bytearray, first_ts, pb, bc]; insertion order == age order
+        self._partials = OrderedDict()
+        self.stats = {
+            "reassembled": 0,
+            "orphan_continuations": 0,
+            "oversize_passthrough": 0,
+            "evicted_stale": 0,
+            "evicted_overflow": 0,
+            "evicted_restart": 0,
+        }
+
+    def has_partials(self) -> bool:
+        return bool(self._partials)
+
+    def _expire(self, ts: int) -> None:
+        partials = self._partials
+        while partials:
+            key, partial = next(iter(partials.items()))
+            if ts - partial[2] <= self.stale_us:
+                break
+            del partials[key]
+            self.stats["evicted_stale"] += 1
+
+    def push(self, key, pb: int, bc: int, ts: int, fragment):
+        if self._partials:
+            self._expire(ts)
+
+        if pb != ACL_PB_CONTINUATION:
+            if key in self._partials:
+                # A new start on the same link means the previous frame never finished.
+                del self._partials[key]
+                self.stats["evicted_restart"] += 1
+            if len(fragment) < 4:
+                return fragment, pb, bc
+            need = L2CAP_HDR.unpack_from(fragment, 0)[0] + 4
+            if len(fragment) >= need:
+                return fragment, pb, bc
+            if need > self.max_frame:
+                # Can't buffer it; hand it on truncated, exactly like the unreassembled path.
+                self.stats["oversize_passthrough"] += 1
+                return fragment, pb, bc
+            self._partials[key] = [need, bytearray(fragment), ts, pb, bc]
+            if len(self._partials) > self.max_partials:
+                self._partials.popitem(last=False)
+                self.stats["evicted_overflow"] += 1
+            return None
+
+        partial = self._partials.get(key)
+        if partial is None:
+            self.stats["orphan_continuations"] += 1
+            return None
+        buf = partial[1]
+        buf += fragment
+        if len(buf) < partial[0]:
+            return None
+        del self._partials[key]
+        self.stats["reassembled"] += 1
+        return bytes(buf[:partial[0]]), partial[3], partial[4]
+
+def merge_stats(total: dict, stats: dict) -> dict:
+    for k, v in stats.items():
+        total[k] = total.get(k, 0) + v
+    return total
+
+def make_event(ts, flags, cid, pb, bc, att_op, att_handle, value_hex, raw_hex) -> dict:
+    # Key order is part of the output format; both engines go through here.
+    return {
+        "ts": ts,
+        "flags": flags,
+        "dir": "RX" if (flags & 0x1) else "TX",
+        "cid": cid,
+        "pb": pb,
+        "bc": bc,
+        "att_opcode": att_op,
+        "type": opcode_name(att_op),
+        "handle": att_handle,
+        "value_hex": value_hex,
+        "raw_hex": raw_hex,
+    }
+
+def iter_events_stream(path: str, reassembler: Optional[L2capReassembler] = None) -> Iterator[dict]:
+    """Reference engine: per-record f.read() and byte slicing at every layer."""
+    with open(path, "rb") as f:
+        parse_btsnoop_header(f)
+
+        # Android btsnoop timestamps are usually in microseconds since 0000-01-01 (?) with an offset.
+        # For our purposes we keep the raw ts field as ts_us-ish ordering key.
+        # flags bit0 usually indicates direction; we'll normalize as TX/RX heuristically:
+        # - Many btsnoop variants: flags=0 for sent, 1 for received; some invert.
+        # We'll expose both flags and derived dir.
+        while True:
+            rec = parse_btsnoop_record(f)
+            if rec is None:
+                break
+            ts, flags, data = rec
+
+            pt = h4_packet_type(data)
+            if pt != 0x02:
+                continue  # only ACL carries ATT
+
+            acl = parse_hci_acl(data)
+            if not acl:
+                continue
+            handle, pb, bc, acl_payload = acl
+
+            if reassembler is not None:
+                frame = reassembler.push((handle, flags & 0x1), pb, bc, ts, acl_payload)
+                if frame is None:
+                    continue
+                acl_payload, pb, bc = frame
+
+            l2 = parse_l2cap(acl_payload)
+            if not l2:
+                continue
+            cid, l2payload = l2
+
+            # ATT is on CID 0x0004 (LE ATT)
+            if cid != ATT_CID:
+                continue
+
+            att = parse_att(l2payload)
+            if not att:
+                continue
+            att_op, att_handle, att_value = att
+
+            yield make_event(ts, flags, cid, pb, bc, att_op, att_handle, att_value.hex(), acl_payload.hex())
+
+def iter_records_mmap(buf, pos: int, end: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Walk btsnoop record headers in buf[pos:end]; yields (ts, flags, data_start, data_end)."""
+    unpack_hdr = RECORD_HDR.unpack_from
+    hdr_len = RECORD_HDR.size
+    while pos < end:
+        if end - pos < hdr_len:
+            raise EOFError
+        _orig_len, incl_len, flags, _drops, ts = unpack_hdr(buf, pos)
+        pos += hdr_len
+        if end - pos < incl_len:
+            raise EOFError
+        yield ts, flags, pos, pos + incl_len
+        pos += incl_len
+
+def acl_fragment_at(buf, start: int, stop: int) -> Optional[Tuple[int, int, int]]:
+    """Offset-only parse_hci_acl: (handle_pb_bc, acl_start, acl_stop) for an H4 ACL record.
+
+    Slice bounds are clamped exactly like the reference slices so truncated
+    records decode the same way.
+    """
+    if stop - start < 1 + 4 or buf[start] != 0x02:
+        return None
+    handle_pb_bc, dlen = ACL_HDR.unpack_from(buf, start + 1)
+    acl_start = start + 5
+    return handle_pb_bc, acl_start, min(acl_start + dlen, stop)
+
+def att_event_at(buf, ts: int, flags: int, pb: int, bc: int, acl_start: int, acl_stop: int) -> Optional[dict]:
+    """Offset-only equivalent of parse_l2cap -> parse_att over buf[acl_start:acl_stop]."""
+    if acl_stop - acl_start < 4:
+        return None
+    l2len, cid = L2CAP_HDR.unpack_from(buf, acl_start)
+    if cid != ATT_CID:
+        return None
+    att_start = acl_start + 4
+    att_stop = min(att_start + l2len, acl_stop)
+    if att_stop <= att_start:
+        return None
+    op = buf[att_start]
+    if op in ATT_HANDLE_OPCODES:
+        if att_stop - att_start < 3:
+            return None
+        att_handle = ATT_HANDLE.unpack_from(buf, att_start + 1)[0]
+        value_start = att_start + 3
+    else:
+        att_handle = None
+        value_start = att_start + 1
+    return make_event(
+        ts, flags, cid, pb, bc, op, att_handle,
+        buf[value_start:att_stop].hex(),
+        buf[acl_start:acl_stop].hex(),
+    )
+
+def iter_events_mmap(path: str, reassembler: Optional[L2capReassembler] = None,
+                     start: Optional[int] = None, end: Optional[int] = None) -> Iterator[dict]:
+    """mmap engine: same output as iter_events_stream without per-record copies.
+
+    start/end restrict decoding to a byte range that begins and ends on record
+    boundaries (see build_record_index); by default the whole file is decoded.
+    """
+    with open(path, "rb") as f:
+        parse_btsnoop_header(f)
+        size = os.fstat(f.fileno()).st_size
+        start = BTSNOOP_HEADER_LEN if start is None else start
+        end = size if end is None else end
+        if size <= BTSNOOP_HEADER_LEN or start >= end:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = memoryview(mm)
+            try:
+                for ts, flags, start, stop in iter_records_mmap(buf, start, end):
+                    acl = acl_fragment_at(buf, start, stop)
+                    if acl is None:
+                        continue
+                    handle_pb_bc, acl_start, acl_stop = acl
+                    pb = (handle_pb_bc >> 12) & 0x3
+                    bc = (handle_pb_bc >> 14) & 0x3
+                    if reassembler is None:
+                        event = att_event_at(buf, ts, flags, pb, bc, acl_start, acl_stop)
+                    else:
+                        frame = reassembler.push((handle_pb_bc & 0x0FFF, flags & 0x1), pb, bc, ts,
+                                                 buf[acl_start:acl_stop])
+                        if frame is None:
+                            continue
+                        frame, pb, bc = frame
+                        event = att_event_at(frame, ts, flags, pb, bc, 0, len(frame))
+                        del frame  # drop any view into the map before it closes
+                    if event is not None:
+                        yield event
+            finally:
+                buf.release()
+
+ENGINES = {
+    "stream": iter_events_stream,
+    "mmap": iter_events_mmap,
+}
+
+def build_record_index(path: str, reassemble: bool = True) -> Tuple[array.array, int, bool]:
+    """First pass: walk record headers and collect the offsets where a shard may start.
+
+    Without reassembly that is every record. With reassembly a tracking
+    L2capReassembler is run alongside, and only records reached while it holds
+    no partial frame are listed, so every shard starts from the same (empty)
+    reassembly state the serial pass has at that point.
+
+    Returns (offsets, end, truncated). end is the offset just past the last
+    complete record; truncated is True when a partial record follows it.
+    """
+    tracker = L2capReassembler() if reassemble else None
+    offsets = array.array("Q")
+    with open(path, "rb") as f:
+        parse_btsnoop_header(f)
+        size = os.fstat(f.fileno()).st_size
+        if size <= BTSNOOP_HEADER_LEN:
+            return offsets, BTSNOOP_HEADER_LEN, False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            unpack_incl = struct.Struct(">4xI").unpack_from
+            hdr_len = RECORD_HDR.size
+            pos = BTSNOOP_HEADER_LEN
+            while pos < size:
+                if size - pos < hdr_len:
+                    return offsets, pos, True
+                incl_len = unpack_incl(mm, pos)[0]
+                if size - pos - hdr_len < incl_len:
+                    return offsets, pos, True
+                if tracker is None:
+                    offsets.append(pos)
+                else:
+                    if not tracker.has_partials():
+                        offsets.append(pos)
+                    _orig_len, _incl_len, flags, _drops, ts = RECORD_HDR.unpack_from(mm, pos)
+                    acl = acl_fragment_at(mm, pos + hdr_len, pos + hdr_len + incl_len)
+                    if acl is not None:
+                        handle_pb_bc, acl_start, acl_stop = acl
+                        tracker.push((handle_pb_bc & 0x0FFF, flags & 0x1), (handle_pb_bc >> 12) & 0x3,
+                                     (handle_pb_bc >> 14) & 0x3, ts, mm[acl_start:acl_stop])
+                pos += hdr_len + incl_len
+    return offsets, pos, False
+
+def plan_shards(offsets: array.array, end: int, shards: int) -> List[Tuple[int, int]]:
+    """Split the indexed records into contiguous byte ranges of roughly equal size."""
+    if not offsets:
+        return []
+    first = offsets[0]
+    target = max(1, (end - first) // max(1, shards))
+    ranges = []
+    start = first
+    next_cut = first + target
+    for off in offsets:
+        if off >= next_cut and off > start:
+            ranges.append((start, off))
+            start = off
+            next_cut = off + target
+    ranges.append((start, end))
+    return ranges
+
+def decode_shard(job: Tuple[str, bool, str, int, int]):
+    """Process-pool worker: decode one record range (+ reassembly stats).
+
+    Returns a JSONL chunk for fmt "jsonl", or a list of columnar rows for "npz".
+    """
+    path, reassemble, fmt, start, end = job
+    reassembler = L2capReassembler() if reassemble else None
+    events = iter_events_mmap(path, reassembler, start, end)
+    if fmt == "npz":
+        chunk = [columnar_row(event) for event in events]
+    else:
+        chunk = "".join(json.dumps(event) + "\n" for event in events)
+    return chunk, (reassembler.stats if reassembler else {})
+
+def columnar_row(event: dict) -> tuple:
+    return (event["ts"], event["flags"] & 0x1, event["att_opcode"], event["handle"],
+            bytes.fromhex(event["value_hex"]))
+
+def open_columnar_writer(path: str):
+    repo_root = pathlib.Path(__file__).resolve().parents[2]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from capture_columnar import ColumnarWriter
+    return ColumnarWriter(path, source="btsnoop_ble_extract", ts_kind="btsnoop_us")
+
+def write_events_parallel(path: str, out_f, jobs: int, reassemble: bool = True, fmt: str = "jsonl") -> dict:
+    offsets, end, truncated = build_record_index(path, reassemble)
+    # Over-split so a shard full of ATT traffic doesn't leave the other workers idle.
+    ranges = plan_shards(offsets, end, jobs * 4)
+    stats = {}
+    jobs_iter = ((path, reassemble, fmt, a, b) for a, b in ranges)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # Keep at most 2x jobs shards in flight so decoded output never piles up in the parent;
+        # taking results from the head of the window keeps record order, matching the serial output.
+        for job in itertools.islice(jobs_iter, 2 * jobs):
+            pending.append(pool.submit(decode_shard, job))
+        while pending:
+            chunk, shard_stats = pending.popleft().result()
+            job = next(jobs_iter, None)
+            if job is not None:
+                pending.append(pool.submit(decode_shard, job))
+            if fmt == "npz":
+                for row in chunk:
+                    out_f.append(*row)
+            else:
+                out_f.write(chunk)
+            merge_stats(stats, shard_stats)
+    if truncated:
+        # The serial engines raise after emitting every complete record; keep that behavior.
+        raise EOFError
+    return stats
+
+
+def print_reassembly_stats(stats: dict) -> None:
+    if any(stats.values()):
+        parts = " ".join(f"{k}={v}" for k, v in sorted(stats.items()) if v)
+        print(f"reassembly: {parts}", file=sys.stderr)
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("btsnoop", help="Path to btsnoop_hci.log")
-    ap.add_argument("--out", default="-", help="Output JSONL path (default stdout)")
+    ap.add_argument("--out", default="-", help="Output path (default stdout; required for --format npz)")
+    ap.add_argument("--format", choices=["jsonl", "npz"], default="jsonl",
+                    help="Output format (default jsonl; npz = columnar, needs numpy)")
+    ap.add_argument("--engine", choices=sorted(ENGINES), default="mmap",
+                    help="Parser engine (default mmap; stream is the reference implementation)")
+    ap.add_argument("--no-reassemble", action="store_true",
+                    help="Decode each ACL fragment on its own (pre-reassembly behavior)")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Decode record ranges in N worker processes (mmap engine only; 0 = all cores; default 1 = serial)")
     args = ap.parse_args()
+    if args.jobs < 0:
+        ap.error("--jobs must be >= 0")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    if args.jobs > 1 and args.engine != "mmap":
+        ap.error("--jobs requires --engine mmap")
 
-    out_f = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
-    try:
-        with open(args.btsnoop, "rb") as f:
-            parse_btsnoop_header(f)
-
-            # Android btsnoop timestamps are usually in microseconds since 0000-01-01 (?) with an offset.
-            # For our purposes we keep the raw ts field as ts_us-ish ordering key.
-            # flags bit0 usually indicates direction; we'll normalize as TX/RX heuristically:
-            # - Many btsnoop variants: flags=0 for sent, 1 for received; some invert.
-            # We'll expose both flags and derived dir.
-            while True:
-                rec = parse_btsnoop_record(f)
-                if rec is None:
-                    break
-                ts, flags, data = rec
-
-                pt = h4_packet_type(data)
-                if pt != 0x02:
-                    continue  # only ACL carries ATT
-
-                acl = parse_hci_acl(data)
-                if not acl:
-                    continue
-                _handle, pb, bc, acl_payload = acl
-
-                l2 = parse_l2cap(acl_payload)
-                if not l2:
-                    continue
-                cid, l2payload = l2
+    if args.format == "npz" and args.out == "-":
+        ap.error("--format npz needs --out PATH")
 
-                # ATT is on CID 0x0004 (LE ATT)
-                if cid != 0x0004:
-                    continue
-
-                att = parse_att(l2payload)
-                if not att:
-                    continue
-                att_op, att_handle, att_value = att
-
-                event = {
-                    "ts": ts,
-                    "flags": flags,
-                    "dir": "RX" if (flags & 0x1) else "TX",
-                    "cid": cid,
-                    "pb": pb,
-                    "bc": bc,
-                    "att_opcode": att_op,
-                    "type": opcode_name(att_op),
-                    "handle": att_handle,
-                    "value_hex": att_value.hex(),
-                    "raw_hex": acl_payload.hex(),
-                }
+    reassemble = not args.no_reassemble
+    if args.format == "npz":
+        out_f = open_columnar_writer(args.out)
+    else:
+        out_f = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        if args.jobs > 1:
+            print_reassembly_stats(write_events_parallel(args.btsnoop, out_f, args.jobs, reassemble, args.format))
+            return
+        reassembler = L2capReassembler() if reassemble else None
+        for event in ENGINES[args.engine](args.btsnoop, reassembler):
+            if args.format == "npz":
+                out_f.append(*columnar_row(event))
+            else:
                 out_f.write(json.dumps(event) + "\n")
+        if reassembler is not None:
+            print_reassembly_stats(reassembler.stats)
     finally:
         if out_f is not sys.stdout:
             out_f.close()
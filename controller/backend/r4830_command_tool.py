@@ -7,17 +7,35 @@ Frame format:
   checksum = (cmd_id + value0 + value1 + value2 + value3) & 0xFF
 
 This tool is intentionally strict and supports a `--force` flag for risky values.
+
+`profile apply` takes a YAML/JSON profile of CONTROL_SPECS values, checks every
+value with enforce_safety, diffs it against the charger's current settings
+(decoded from the 0x6905 settings frame) and only sends the frames that change
+something. The live part reuses charger_ctl.py / charger_acks.py from the repo
+root, so all changed frames are pipelined and each one is ack-checked.
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import datetime as _dt
+import functools
+import json
 import struct
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
+
+try:
+    import yaml
+    _YAML_IMPORT_ERROR: Optional[Exception] = None
+except Exception as exc:  # pragma: no cover - env-specific dependency
+    yaml = None  # type: ignore[assignment]
+    _YAML_IMPORT_ERROR = exc
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
 
 
 @dataclass(frozen=True)
@@ -117,7 +135,8 @@ CONTROL_SPECS: Dict[str, ControlSpec] = {
         description="Soft start time",
         unit="s",
         safe_min=0.0,
-        safe_max=600.0,
+        safe_max=255.0,
+        notes="The 0x6905 settings frame reports it in one byte (offset 88), so 255 s is the readable maximum.",
     ),
     "power_limit": ControlSpec(
         key="power_limit",
@@ -137,6 +156,34 @@ CONTROL_SPECS: Dict[str, ControlSpec] = {
 }
 
 
+# Where each control's current value sits in the 0x6905 settings frame
+# (offsets as decoded by controller/frontend/app.js), read back in the same
+# protocol encoding encode_cmd06 sends:
+#   ("f32", off)            raw float32 LE
+#   ("u8", off) / ("u16", off)
+#   ("flag_inv", off)       0/1 status byte whose command value is the inverse
+#                           (anything else: unknown, so the control is always sent)
+#   ("bit", off, mask)      1 if set
+#   ("bit_inv", off, mask)  1 if clear
+# equal_distribution (0x2F) has no known 6905 field, so a profile always sends it.
+SETTINGS_6905_PREFIX = bytes.fromhex("6905")
+SETTINGS_6905_MIN_LEN = 91
+SETTINGS_6905_FIELDS: Dict[str, tuple] = {
+    "output_voltage_set": ("f32", 2),
+    "output_current_set": ("f32", 6),
+    "manual_control": ("u8", 18),          # cmd 0x0B power-on output, 0 = open
+    "power_off_current": ("f32", 44),
+    "current_path": ("flag_inv", 77),      # 1 = output on (app.js); cmd 0x0C sends 0 = on
+    "two_stage_voltage": ("f32", 78),
+    "two_stage_current": ("f32", 82),
+    "manual_output": ("u8", 86),
+    "self_stop": ("bit", 87, 0x02),
+    "two_stage_enable": ("bit_inv", 87, 0x04),
+    "soft_start_time": ("u8", 88),         # one byte, hence soft_start_time's 255 s safe_max
+    "power_limit": ("u16", 89),
+}
+
+
 BOOL_TRUE = {"1", "true", "on", "open", "enable", "enabled", "yes"}
 BOOL_FALSE = {"0", "false", "off", "close", "closed", "disable", "disabled", "no"}
 
@@ -160,21 +207,29 @@ def parse_bool(raw: str) -> int:
     raise ValueError(f"Invalid bool value: {raw}")
 
 
-def encode_value(value_type: str, raw_value: str) -> tuple[bytes, str]:
+def parse_value(value_type: str, raw_value: str) -> tuple[Any, str]:
+    """Command value as a number (bool -> 0/1) plus its normalized text form."""
     if value_type == "bool":
         n = parse_bool(raw_value)
-        return struct.pack("<I", n), str(n)
+        return n, str(n)
     if value_type == "u32":
         n = int(raw_value, 0)
         if not (0 <= n <= 0xFFFFFFFF):
             raise ValueError(f"u32 out of range: {n}")
-        return struct.pack("<I", n), str(n)
+        return n, str(n)
     if value_type == "float":
         f = float(raw_value)
-        return struct.pack("<f", f), f"{f:g}"
+        return f, f"{f:g}"
     raise ValueError(f"Unsupported value_type: {value_type}")
 
 
+def encode_value(value_type: str, raw_value: str) -> tuple[bytes, str]:
+    value, normalized = parse_value(value_type, raw_value)
+    if value_type == "float":
+        return struct.pack("<f", value), normalized
+    return struct.pack("<I", value), normalized
+
+
 def calc_checksum(cmd_id: int, value_bytes: bytes) -> int:
     return (cmd_id + sum(value_bytes)) & 0xFF
 
@@ -186,6 +241,88 @@ def encode_cmd06(cmd_id: int, value_bytes: bytes) -> bytes:
     return bytes([0x06, cmd_id]) + value_bytes + bytes([csum])
 
 
+# Ready-to-send frames for the setpoints that get used over and over: every
+# 0.1 step of each float control's safe range, every integer of each u32
+# control's safe range and both states of each bool control (~7k frames,
+# built on first use). Anything off the grid goes through an LRU instead.
+FRAME_TABLE_STEPS_PER_UNIT = 10
+_frame_table: Optional[Dict[str, Dict[int, bytes]]] = None
+
+
+def _table_key(control: ControlSpec, value: float) -> Optional[int]:
+    if control.value_type == "float":
+        # Exact grid values only: a near miss would get the neighbouring float32.
+        k = round(float(value) * FRAME_TABLE_STEPS_PER_UNIT)
+        return k if k / FRAME_TABLE_STEPS_PER_UNIT == float(value) else None
+    return int(value) if float(value).is_integer() else None
+
+
+def frame_table() -> Dict[str, Dict[int, bytes]]:
+    global _frame_table
+    if _frame_table is None:
+        table: Dict[str, Dict[int, bytes]] = {}
+        for key, control in CONTROL_SPECS.items():
+            if control.value_type == "bool":
+                keys = range(2)
+            elif control.safe_min is None or control.safe_max is None:
+                continue
+            elif control.value_type == "float":
+                keys = range(
+                    round(control.safe_min * FRAME_TABLE_STEPS_PER_UNIT),
+                    round(control.safe_max * FRAME_TABLE_STEPS_PER_UNIT) + 1,
+                )
+            else:
+                keys = range(int(control.safe_min), int(control.safe_max) + 1)
+            if control.value_type == "float":
+                values = [k / FRAME_TABLE_STEPS_PER_UNIT for k in keys]
+            else:
+                values = list(keys)
+            table[key] = dict(zip(keys, encode_control_bulk(key, values)))
+        _frame_table = table
+    return _frame_table
+
+
+@functools.lru_cache(maxsize=4096)
+def _encode_control_uncached(cmd_id: int, value_type: str, value: float) -> bytes:
+    try:
+        value_bytes = struct.pack("<f", value) if value_type == "float" else struct.pack("<I", int(value))
+    except struct.error as exc:
+        raise ValueError(f"{value_type} value out of range: {value}") from exc
+    return encode_cmd06(cmd_id, value_bytes)
+
+
+def encode_control(key: str, value: float) -> bytes:
+    """0x06 frame setting CONTROL_SPECS[key] to value (no safety check; see enforce_safety)."""
+    control = CONTROL_SPECS[key]
+    k = _table_key(control, value)
+    if k is not None:
+        frame = frame_table().get(key, {}).get(k)
+        if frame is not None:
+            return frame
+    return _encode_control_uncached(control.cmd_id, control.value_type, float(value))
+
+
+def encode_control_bulk(key: str, values) -> List[bytes]:
+    """Encode many setpoints for one control in one pass (e.g. a ramp schedule)."""
+    control = CONTROL_SPECS[key]
+    values = list(values)
+    n = len(values)
+    code = "f" if control.value_type == "float" else "I"
+    try:
+        raw = struct.pack(f"<{n}{code}", *(values if code == "f" else map(int, values)))
+    except struct.error as exc:
+        raise ValueError(f"{control.value_type} value out of range for {key}: {exc}") from exc
+    cmd_id = control.cmd_id
+    out = bytearray(7 * n)
+    out[0::7] = b"\x06" * n
+    out[1::7] = bytes((cmd_id,)) * n
+    for j in range(4):
+        out[2 + j :: 7] = raw[j::4]
+    out[6::7] = bytes((cmd_id + a + b + c + d) & 0xFF for a, b, c, d in zip(raw[0::4], raw[1::4], raw[2::4], raw[3::4]))
+    block = bytes(out)
+    return [block[i : i + 7] for i in range(0, 7 * n, 7)]
+
+
 def decode_cmd06(payload_hex: str) -> dict:
     data = bytes.fromhex(payload_hex.strip())
     if len(data) != 7:
@@ -236,6 +373,264 @@ def enforce_safety(
         )
 
 
+def is_settings_6905(frame: bytes) -> bool:
+    return len(frame) >= SETTINGS_6905_MIN_LEN and frame[:2] == SETTINGS_6905_PREFIX
+
+
+def decode_6905_state(frame: bytes) -> Dict[str, bytes]:
+    """Current value of every control found in a 0x6905 frame, as the 4 value bytes of its 0x06 command."""
+    if not is_settings_6905(frame):
+        raise ValueError(f"not a 0x6905 settings frame: {frame[:2].hex()} ({len(frame)} bytes)")
+    state: Dict[str, bytes] = {}
+    for key, field in SETTINGS_6905_FIELDS.items():
+        kind, off = field[0], field[1]
+        if kind == "f32":
+            state[key] = bytes(frame[off : off + 4])
+            continue
+        if kind == "u8":
+            n = frame[off]
+        elif kind == "flag_inv":
+            if frame[off] not in (0, 1):
+                continue
+            n = 1 - frame[off]
+        elif kind == "u16":
+            n = frame[off] | (frame[off + 1] << 8)
+        elif kind == "bit":
+            n = 1 if frame[off] & field[2] else 0
+        else:
+            n = 0 if frame[off] & field[2] else 1
+        state[key] = struct.pack("<I", n)
+    return state
+
+
+def format_value_bytes(value_type: str, value_bytes: bytes) -> str:
+    if value_type == "float":
+        return f"{struct.unpack('<f', value_bytes)[0]:g}"
+    return str(struct.unpack("<I", value_bytes)[0])
+
+
+def load_profile(path: Path) -> Dict[str, str]:
+    """Read a {control_key: value} profile (YAML or JSON) into build-style value strings."""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        if _YAML_IMPORT_ERROR is not None:
+            raise ValueError("Missing dependency 'PyYAML' for YAML profiles. Install with: python3 -m pip install pyyaml")
+        raw = yaml.safe_load(text)
+    else:
+        try:
+            raw = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"{path}: invalid JSON: {exc}") from exc
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path}: profile must be a mapping of control -> value")
+    unknown = sorted(set(raw) - set(CONTROL_SPECS))
+    if unknown:
+        raise ValueError(f"{path}: unknown control(s): {', '.join(unknown)}")
+
+    profile: Dict[str, str] = {}
+    for key, value in raw.items():
+        if value is None:
+            continue
+        control = CONTROL_SPECS[key]
+        if isinstance(value, bool):
+            value = int(value)
+        if control.value_type == "u32" and isinstance(value, float) and value.is_integer():
+            value = int(value)
+        profile[key] = str(value)
+    return profile
+
+
+@dataclass
+class PlannedWrite:
+    control: ControlSpec
+    normalized: str
+    payload: bytes
+    current: Optional[bytes]  # None when the 6905 frame doesn't carry this control
+
+    @property
+    def changed(self) -> bool:
+        return self.current is None or self.current != self.payload[2:6]
+
+
+def plan_profile(
+    profile: Dict[str, str],
+    state: Dict[str, bytes],
+    input_voltage: Optional[float],
+    force: bool,
+) -> List[PlannedWrite]:
+    """Safety-check every profile value, then pair it with the device's current value.
+
+    Setpoints come before toggles, so output is never switched on against a
+    stale setpoint; the current path (output on/off) goes last.
+    """
+    plan: List[PlannedWrite] = []
+    for key, value in profile.items():
+        control = CONTROL_SPECS[key]
+        enforce_safety(control, control.value_type, value, input_voltage, force)
+        number, normalized = parse_value(control.value_type, value)
+        plan.append(PlannedWrite(control, normalized, encode_control(key, number), state.get(key)))
+    plan.sort(key=lambda w: (w.control.key == "current_path", w.control.value_type == "bool"))
+    return plan
+
+
+def print_plan(plan: List[PlannedWrite]) -> None:
+    for w in plan:
+        c = w.control
+        cur = "?" if w.current is None else format_value_bytes(c.value_type, w.current)
+        mark = "send" if w.changed else "same"
+        unit = f" {c.unit}" if c.unit else ""
+        print(f"  [{mark}] {c.key:20s} {cur} -> {w.normalized}{unit}  {w.payload.hex()}")
+    n = sum(1 for w in plan if w.changed)
+    print(f"{n} of {len(plan)} control(s) to send")
+
+
+def _last_6905_from_log(path: Path) -> bytes:
+    """Last RX 0x6905 frame in a JSONL capture (two_run_rx_capture or btsnoop_ble_extract)."""
+    if str(_REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(_REPO_ROOT))
+    import capture_loader
+
+    found: Optional[bytes] = None
+    for _, frame in capture_loader.iter_capture(str(path), direction="RX", prefixes=["6905"], fields=()):
+        if is_settings_6905(frame):
+            found = frame
+    if found is None:
+        raise ValueError(f"{path}: no RX 0x6905 settings frame found")
+    return found
+
+
+def _state_frame_from_args(args: argparse.Namespace) -> Optional[bytes]:
+    if args.state_hex:
+        try:
+            return bytes.fromhex(args.state_hex)
+        except ValueError as exc:
+            raise ValueError(f"Invalid --state-hex: {exc}") from exc
+    if args.state_log:
+        return _last_6905_from_log(Path(args.state_log))
+    return None
+
+
+def _live_modules(args: argparse.Namespace):
+    if str(_REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(_REPO_ROOT))
+    import charger_ctl
+    import charger_sim
+    charger_sim.install_from_args(args, charger_ctl)
+    from charger_acks import AckTracker
+    from charger_framing import FrameReassembler
+    from charger_scheduler import POLL_FRAMES, PRIORITY_POLL
+
+    if charger_ctl._BLEAK_IMPORT_ERROR is not None:
+        raise ValueError("Missing dependency 'bleak' for live apply. Install with: python3 -m pip install bleak")
+    return charger_ctl, AckTracker, FrameReassembler, POLL_FRAMES, PRIORITY_POLL
+
+
+async def _apply_live(args: argparse.Namespace, profile: Dict[str, str], state_frame: Optional[bytes]) -> int:
+    charger_ctl, AckTracker, FrameReassembler, poll_frames, priority_poll = _live_modules(args)
+
+    print("Scanning for charger...")
+    dev = await charger_ctl.find_charger(args.scan_timeout)
+    if not dev:
+        print("Not found (ensure charger is on and advertising, and no other app is connected).")
+        return 3
+    print(f"Found: {dev.name} {dev.address}")
+
+    async with charger_ctl.BleakClient(dev.address) as client:
+        acks = AckTracker()
+        reasm = FrameReassembler()
+        got_state = asyncio.Event()
+        latest: Dict[str, Any] = {}
+
+        def on_notify(_sender: Any, data: bytearray) -> None:
+            # The 106-byte 0x6905 frame spans several notifications at the default MTU.
+            for b in reasm.feed(data):
+                if acks.feed(b):
+                    continue
+                if is_settings_6905(b):
+                    latest["6905"] = b
+                    got_state.set()
+                    continue
+                parsed = charger_ctl.parse_3006(b)
+                if parsed:
+                    latest["vin"] = parsed[0][0]
+
+        await client.start_notify(charger_ctl.UUID_FFE2, on_notify)
+        write_uuid, _ = await charger_ctl.select_write_uuid(client, args.write_uuid)
+        sched = charger_ctl.make_scheduler(client, write_uuid, name=dev.address)
+        sched.keepalive(1.0)
+        try:
+            if state_frame is None:
+                for frame in poll_frames:
+                    sched.submit(frame, priority_poll, "poll")
+                try:
+                    await asyncio.wait_for(got_state.wait(), args.state_timeout)
+                except asyncio.TimeoutError:
+                    print(f"No 0x6905 settings frame within {args.state_timeout:g}s; pass --state-hex/--state-log.")
+                    return 4
+                state_frame = latest["6905"]
+
+            input_voltage = args.input_voltage
+            if input_voltage is None and "vin" in latest:
+                input_voltage = latest["vin"]
+                print(f"Input voltage from telemetry: {input_voltage:.1f} V")
+            plan = plan_profile(profile, decode_6905_state(state_frame), input_voltage, args.force)
+            print_plan(plan)
+            todo = [w for w in plan if w.changed]
+            if not todo:
+                return 0
+
+            results = await acks.send_many(
+                sched, [w.payload for w in todo], timeout_s=args.ack_timeout, retries=args.retries, note="profile"
+            )
+            failed = 0
+            for w, r in zip(todo, results):
+                print(f"  {w.control.key:20s} {r.describe()}")
+                if not r.ok:
+                    failed += 1
+            if failed:
+                print(f"{failed} control(s) not acknowledged", file=sys.stderr)
+                return 5
+            return 0
+        finally:
+            await sched.close()
+            try:
+                await client.stop_notify(charger_ctl.UUID_FFE2)
+            except Exception:
+                pass
+
+
+def cmd_profile_apply(args: argparse.Namespace) -> int:
+    profile = load_profile(Path(args.profile))
+    missing = [k for k in CONTROL_SPECS if k not in profile]
+    if missing:
+        print(f"Not in profile (left unchanged): {', '.join(missing)}")
+    state_frame = _state_frame_from_args(args)
+
+    if args.dry_run:
+        state = decode_6905_state(state_frame) if state_frame is not None else {}
+        print_plan(plan_profile(profile, state, args.input_voltage, args.force))
+        return 0
+    return asyncio.run(_apply_live(args, profile, state_frame))
+
+
+def cmd_profile_dump(args: argparse.Namespace) -> int:
+    state_frame = _state_frame_from_args(args)
+    if state_frame is None:
+        raise ValueError("profile dump needs --state-hex or --state-log")
+    state = decode_6905_state(state_frame)
+    out: Dict[str, Any] = {}
+    for key, raw in state.items():
+        control = CONTROL_SPECS[key]
+        if control.value_type == "float":
+            out[key] = round(struct.unpack("<f", raw)[0], 3)
+        elif control.value_type == "bool":
+            out[key] = struct.unpack("<I", raw)[0] == 1
+        else:
+            out[key] = struct.unpack("<I", raw)[0]
+    print(json.dumps(out, indent=2))
+    return 0
+
+
 def save_payload(path: Path, label: str, payload_hex: str) -> None:
     ts = _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds")
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -268,8 +663,13 @@ def cmd_build(args: argparse.Namespace) -> int:
         value_type = args.type
 
     enforce_safety(control, value_type, args.value, args.input_voltage, args.force)
-    value_bytes, normalized = encode_value(value_type, args.value)
-    payload = encode_cmd06(cmd_id, value_bytes)
+    if control is not None:
+        number, normalized = parse_value(value_type, args.value)
+        payload = encode_control(control.key, number)
+        value_bytes = payload[2:6]
+    else:
+        value_bytes, normalized = encode_value(value_type, args.value)
+        payload = encode_cmd06(cmd_id, value_bytes)
     payload_hex = payload.hex()
 
     print(f"payload_hex={payload_hex}")
@@ -302,6 +702,13 @@ def cmd_decode(args: argparse.Namespace) -> int:
     return 0
 
 
+def _sim_args(p: argparse.ArgumentParser) -> None:
+    if str(_REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(_REPO_ROOT))
+    import charger_sim
+    charger_sim.add_sim_args(p)
+
+
 def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description="Build/decode R4830 0x06 BLE command payloads.")
     sub = ap.add_subparsers(dest="subcmd", required=True)
@@ -324,6 +731,31 @@ def build_parser() -> argparse.ArgumentParser:
     sp_decode.add_argument("payload_hex")
     sp_decode.set_defaults(func=cmd_decode)
 
+    sp_profile = sub.add_parser("profile", help="Apply or dump a charging profile")
+    profile_sub = sp_profile.add_subparsers(dest="profile_cmd", required=True)
+
+    def _state_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--state-hex", help="Current 0x6905 settings frame as hex (default: read it from the charger)")
+        p.add_argument("--state-log", help="JSONL capture log; the last RX 0x6905 frame is used as current state")
+
+    sp_apply = profile_sub.add_parser("apply", help="Send only the profile values that differ from the charger")
+    sp_apply.add_argument("profile", help="YAML or JSON file mapping control keys to values")
+    _state_args(sp_apply)
+    sp_apply.add_argument("--dry-run", action="store_true", help="Print the plan, don't connect")
+    sp_apply.add_argument("--input-voltage", type=float, help="Safety context in volts (default: live 3006 Vin)")
+    sp_apply.add_argument("--force", action="store_true", help="Bypass safety guards")
+    sp_apply.add_argument("--scan-timeout", type=float, default=20.0)
+    sp_apply.add_argument("--state-timeout", type=float, default=5.0, help="Seconds to wait for a 0x6905 frame")
+    sp_apply.add_argument("--ack-timeout", type=float, default=1.5, help="Per-command ack timeout in seconds")
+    sp_apply.add_argument("--retries", type=int, default=2, help="Resends per command on ack timeout")
+    sp_apply.add_argument("--write-uuid", choices=["FFE3", "FFE2"], default="FFE3")
+    _sim_args(sp_apply)
+    sp_apply.set_defaults(func=cmd_profile_apply)
+
+    sp_dump = profile_sub.add_parser("dump", help="Print a 0x6905 settings frame as a JSON profile")
+    _state_args(sp_dump)
+    sp_dump.set_defaults(func=cmd_profile_dump)
+
     return ap
 
 
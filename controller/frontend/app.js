@@ -5,6 +5,8 @@ const UUIDS = {
 };
 
 const MAX_LOG_ROWS = 200;
+const BRIDGE_DEFAULT_URL = "ws://127.0.0.1:8787/ws";
+const BRIDGE_WRITE_TIMEOUT_MS = 8000;
 const MAX_SAVE_TRACK = 40;
 
 const dom = {
@@ -17,6 +19,7 @@ const dom = {
   logBody: document.getElementById("log-body"),
   saveTrack: document.getElementById("save-track"),
   connectBtn: document.getElementById("connect-btn"),
+  bridgeBtn: document.getElementById("bridge-btn"),
   disconnectBtn: document.getElementById("disconnect-btn"),
   discoverBtn: document.getElementById("discover-btn"),
   rawHex: document.getElementById("raw-hex"),
@@ -66,6 +69,7 @@ const state = {
   saveTrack: [],
   keepaliveTimer: null,
   pendingAcks: new Map(),
+  bridge: null,
   telemetry: makeEmptyTelemetry(),
   outputEnabledFrom6905: null,
   outputEnabledFrom3006: null,
@@ -790,7 +794,17 @@ async function discoverCharacteristics() {
   dom.txUuid.textContent = describeChar(state.txChar, tx.serviceUuid);
 }
 
+function bridgeOpen() {
+  return Boolean(state.bridge && state.bridge.ws.readyState === WebSocket.OPEN);
+}
+
 function ensureConnected() {
+  if (state.bridge) {
+    if (!bridgeOpen() || !state.bridge.chargerConnected) {
+      throw new Error("Bridge not connected to charger");
+    }
+    return;
+  }
   if (!state.device || !state.device.gatt || !state.device.gatt.connected || !state.txChar) {
     throw new Error("Not connected");
   }
@@ -799,6 +813,13 @@ function ensureConnected() {
 async function writeTx(bytes, note = "") {
   ensureConnected();
   const data = bytes instanceof Uint8Array ? bytes : Uint8Array.from(bytes);
+  if (state.bridge) {
+    const result = await bridgeWrite(data, note);
+    if (result.state === "failed" || result.state === "write_failed") {
+      throw new Error(result.error || "Bridge write failed");
+    }
+    return result;
+  }
   if (state.txChar.properties.writeWithoutResponse) {
     await state.txChar.writeValueWithoutResponse(data);
   } else {
@@ -809,6 +830,11 @@ async function writeTx(bytes, note = "") {
 
 async function sendWithOptionalAck(bytes, note, timeoutMs = 1700) {
   const arr = bytes instanceof Uint8Array ? bytes : Uint8Array.from(bytes);
+  if (state.bridge) {
+    // The bridge waits for the 03 ack (with retries) before answering.
+    const result = await writeTx(arr, note);
+    return { state: result.state, ackStatus: result.status, hex: null };
+  }
   const frameType = arr[0];
   const expectsAck = arr.length >= 2 && (frameType === 0x05 || frameType === 0x06);
   const cmdId = expectsAck ? arr[1] : null;
@@ -1009,7 +1035,10 @@ function startKeepaliveLoop() {
   const everyMs = Math.max(200, Number.parseInt(dom.keepaliveMs.value, 10) || 1000);
   dom.keepaliveMs.value = String(everyMs);
   state.keepaliveTimer = window.setInterval(async () => {
-    if (!state.device || !state.device.gatt || !state.device.gatt.connected) {
+    const linkUp = state.bridge
+      ? bridgeOpen()
+      : state.device && state.device.gatt && state.device.gatt.connected;
+    if (!linkUp) {
       clearKeepaliveLoop();
       dom.keepaliveEnabled.checked = false;
       return;
@@ -1044,6 +1073,123 @@ function handleDisconnected() {
   dom.txUuid.textContent = "-";
 }
 
+function bridgeUrl() {
+  const fromQuery = new URLSearchParams(window.location.search).get("bridge");
+  if (fromQuery) {
+    return fromQuery;
+  }
+  if (window.location.protocol === "http:" || window.location.protocol === "https:") {
+    const proto = window.location.protocol === "https:" ? "wss:" : "ws:";
+    return `${proto}//${window.location.host}/ws`;
+  }
+  return BRIDGE_DEFAULT_URL;
+}
+
+function bridgeWrite(bytes, note) {
+  const bridge = state.bridge;
+  const id = bridge.nextId;
+  bridge.nextId += 1;
+  addLog("TX", bytes, note);
+  return new Promise((resolve) => {
+    const timer = window.setTimeout(() => {
+      bridge.pending.delete(id);
+      resolve({ state: "timeout" });
+    }, BRIDGE_WRITE_TIMEOUT_MS);
+    bridge.pending.set(id, { resolve, timer });
+    bridge.ws.send(JSON.stringify({ type: "write", id, hex: bytesToHex(bytes), note }));
+  });
+}
+
+function applyBridgeTelemetry(fields) {
+  const t = state.telemetry;
+  for (const [key, value] of Object.entries(fields)) {
+    // Keep values the browser learned from 0x06 echoes until the bridge has its own.
+    if (value != null && key in t) {
+      t[key] = value;
+    }
+  }
+  t.lastRxAt = new Date();
+  renderTelemetry();
+}
+
+function handleBridgeMessage(msg) {
+  switch (msg.type) {
+    case "hello":
+    case "status":
+      state.bridge.chargerConnected = Boolean(msg.connected);
+      if (msg.device && msg.device.name) {
+        setDeviceName(`${msg.device.name} (bridge)`);
+      }
+      setConnectionState(state.bridge.chargerConnected);
+      if (!state.bridge.chargerConnected) {
+        setMessage("Bridge up, charger not connected");
+      }
+      return;
+    case "telemetry":
+      // Keyframes carry every field ("t"); in between only fields past their deadband ("d").
+      applyBridgeTelemetry((msg.key ? msg.t : msg.d) || {});
+      return;
+    case "rx": {
+      const bytes = hexToBytes(msg.hex || "");
+      if (bytes) {
+        addLog("RX", bytes, "bridge");
+      }
+      return;
+    }
+    case "write_result": {
+      const waiter = state.bridge.pending.get(msg.id);
+      if (!waiter) {
+        return;
+      }
+      state.bridge.pending.delete(msg.id);
+      window.clearTimeout(waiter.timer);
+      waiter.resolve(msg);
+      return;
+    }
+    default:
+      return;
+  }
+}
+
+function handleBridgeClosed() {
+  if (!state.bridge) {
+    return;
+  }
+  for (const waiter of state.bridge.pending.values()) {
+    window.clearTimeout(waiter.timer);
+    waiter.resolve({ state: "failed", error: "bridge closed" });
+  }
+  state.bridge = null;
+  handleDisconnected();
+}
+
+function connectBridge() {
+  if (state.device && state.device.gatt && state.device.gatt.connected) {
+    throw new Error("Disconnect BLE before using the bridge");
+  }
+  const url = bridgeUrl();
+  setMessage(`Connecting to bridge ${url}...`);
+  return new Promise((resolve, reject) => {
+    const ws = new WebSocket(url);
+    state.bridge = { ws, nextId: 1, pending: new Map(), chargerConnected: false };
+    ws.addEventListener("open", () => {
+      dom.rxUuid.textContent = "bridge";
+      dom.txUuid.textContent = url;
+      dom.disconnectBtn.disabled = false;
+      resolve();
+    });
+    ws.addEventListener("message", (event) => {
+      try {
+        handleBridgeMessage(JSON.parse(event.data));
+      } catch (error) {
+        console.error(error);
+      }
+    });
+    ws.addEventListener("error", () => reject(new Error(`Bridge unreachable at ${url}`)));
+    ws.addEventListener("close", handleBridgeClosed);
+  });
+}
+
 async function connectDevice() {
   if (!navigator.bluetooth) {
     throw new Error("Web Bluetooth is not available in this browser");
@@ -1067,6 +1213,11 @@ async function connectDevice() {
 async function disconnectDevice() {
   clearKeepaliveLoop();
   dom.keepaliveEnabled.checked = false;
+  if (state.bridge) {
+    state.bridge.ws.close();
+    handleBridgeClosed();
+    return;
+  }
   if (state.device && state.device.gatt && state.device.gatt.connected) {
     state.device.gatt.disconnect();
   }
@@ -1075,6 +1226,10 @@ async function disconnectDevice() {
 
 async function rediscover() {
   ensureConnected();
+  if (state.bridge) {
+    setMessage("Characteristics are managed by the bridge");
+    return;
+  }
   await discoverCharacteristics();
   setMessage("Services rediscovered");
 }
@@ -1099,6 +1254,15 @@ function init() {
     }
   });
 
+  dom.bridgeBtn.addEventListener("click", async () => {
+    try {
+      await connectBridge();
+    } catch (error) {
+      console.error(error);
+      setMessage(`Bridge failed: ${String(error.message || error)}`);
+    }
+  });
+
   dom.disconnectBtn.addEventListener("click", async () => {
     try {
       await disconnectDevice();
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Infer numeric fields in captured RX frames and propose ble_definitions.yaml entries.
+
+Every RX frame of a prefix (all captures, all runs) is stacked into one uint8
+matrix, and every offset is read at once as u8, u16 LE, u32 LE and float32 LE
+(one column per offset and type, no per-frame Python). Each candidate
+is scored by:
+
+  plausible   float32: finite, zero or 1e-3..1e6 in magnitude;
+              u16/u32: high bytes no busier than the low byte (entropy)
+  smooth      mean |step| between consecutive frames of a run vs. the spread
+              (or the magnitude) of the values; a misaligned read jumps
+              around, a real field drifts
+  correlated  best |r| with a known field elsewhere in the frame (Pin vs. Vin,
+              Iout vs. Pin, ...) or with the change notes / --values of the runs
+
+Candidates are then picked greedily without overlap, so a float at 22..25
+wins over the u8/u16 reads inside it. Constant offsets, the checksum byte,
+integers with one moving byte and floats that only move in their lowest
+byte are skipped (the u8 read covers those). Output is a YAML fragment to review and merge by hand:
+
+  python3 field_infer.py capture_compare_LOGS --prefix 3006
+  python3 field_infer.py a.jsonl b.npz --prefix 6905 --values 0 1 --out proposals.yaml
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rx_diff  # noqa: E402
+from rx_diff import capture_columnar  # noqa: E402
+
+# (yaml type, width)
+TYPES: Tuple[Tuple[str, int], ...] = (
+    ("uint8", 1),
+    ("uint16_le", 2),
+    ("uint32_le", 4),
+    ("float32_le", 4),
+)
+# Ties go to the reading that explains more bytes with one value.
+TYPE_BONUS = {"uint8": 0.0, "uint16_le": 0.02, "uint32_le": 0.03, "float32_le": 0.05}
+
+WEIGHT_PLAUSIBLE = 0.45
+WEIGHT_SMOOTH = 0.35
+WEIGHT_CORRELATED = 0.20
+
+# Already-mapped fields (controller/frontend/app.js, charger_bridge.py); used as correlation anchors.
+KNOWN_FIELDS: Dict[str, Tuple[Tuple[str, int, str], ...]] = {
+    "3006": (
+        ("input_voltage", 2, "float32_le"),
+        ("input_current", 6, "float32_le"),
+        ("input_frequency_hz", 10, "float32_le"),
+        ("temperature_1", 14, "float32_le"),
+        ("temperature_2", 18, "float32_le"),
+        ("output_voltage", 22, "float32_le"),
+        ("output_current", 26, "float32_le"),
+        ("input_power", 30, "float32_le"),
+        ("efficiency", 34, "float32_le"),
+        ("output_enable", 38, "uint8"),
+    ),
+    "6905": (
+        ("output_voltage_setpoint", 2, "float32_le"),
+        ("output_current_setpoint", 6, "float32_le"),
+        ("power_on_output", 18, "uint8"),
+        ("power_off_current", 44, "float32_le"),
+        ("output_enable", 77, "uint8"),
+        ("two_stage_voltage", 78, "float32_le"),
+        ("two_stage_current", 82, "float32_le"),
+        ("manual_control", 86, "uint8"),
+        ("settings_flags", 87, "uint8"),
+        ("soft_start_s", 88, "uint8"),
+        ("power_limit_watts", 89, "uint16_le"),
+    ),
+}
+
+
+@dataclass
+class Candidate:
+    offset: int
+    kind: str
+    width: int
+    score: float
+    plausible: float
+    smooth: float
+    correlated: float
+    corr_with: str
+    vmin: float
+    vmax: float
+    name: str = ""
+    known: bool = False
+
+
+def _width(kind: str) -> int:
+    return dict(TYPES)[kind]
+
+
+def _read_columns(np, mat, kind: str):
+    """(n, L - w + 1) float64 values of every offset read as `kind`."""
+    n, length = mat.shape
+    w = _width(kind)
+    m = length - w + 1
+    if w == 1:
+        return mat.astype(np.float64)
+    acc = np.zeros((n, m), dtype=np.uint32)
+    for k in range(w):
+        acc |= mat[:, k : k + m].astype(np.uint32) << np.uint32(8 * k)
+    if kind == "float32_le":
+        with np.errstate(invalid="ignore"):
+            return acc.view(np.float32).astype(np.float64)
+    return acc.astype(np.float64)
+
+
+def _byte_entropy(np, mat):
+    n, length = mat.shape
+    hist = np.bincount(
+        (mat.astype(np.intp) + np.arange(length, dtype=np.intp) * 256).ravel(), minlength=length * 256
+    ).reshape(length, 256)
+    p = hist / float(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)
+
+
+def _plausibility(np, kind: str, values, entropy):
+    m = values.shape[1]
+    if kind == "float32_le":
+        mag = np.abs(values)
+        ok = np.isfinite(values) & ((values == 0) | ((mag >= 1e-3) & (mag <= 1e6)))
+        return ok.mean(axis=0)
+    if kind == "uint8":
+        return np.ones(m)
+    w = _width(kind)
+    low = entropy[:m]
+    high = np.max(np.stack([entropy[k : k + m] for k in range(1, w)]), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.clip(np.where(high <= low, 1.0, low / high), 0.0, 1.0)
+
+
+def _smoothness(np, values, same_run):
+    """How little a value moves from one frame to the next, by the better of two yardsticks.
+
+    - against its own spread: 1 - mean |step| / (1.128 * std), where 1.128 std
+      is the mean |step| of white noise, so a drifting value scores high;
+    - against its magnitude: 1 - mean |step| / |median|, so a steady reading
+      with sensor noise (50.00 +- 0.01 Hz) scores high while the low mantissa
+      bytes of that same float, read as an integer, do not.
+    """
+    v = np.where(np.isfinite(values), values, np.nan)
+    with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+        step = np.abs(np.diff(v, axis=0))[same_run]
+        spread = np.nanstd(v, axis=0)
+        level = np.abs(np.nanmedian(v, axis=0))
+        mean_step = np.nanmean(step, axis=0) if step.shape[0] else np.zeros(v.shape[1])
+        vs_spread = np.where(spread > 0, mean_step / (1.128 * spread), 1.0)
+        vs_level = np.where(level > 0, mean_step / level, 1.0)
+    ratio = np.minimum(np.nan_to_num(vs_spread, nan=1.0), np.nan_to_num(vs_level, nan=1.0))
+    return np.clip(1.0 - ratio, 0.0, 1.0)
+
+
+def _zscore(np, x):
+    x = np.where(np.isfinite(x), x, 0.0)
+    xc = x - x.mean(axis=0)
+    norm = np.sqrt((xc * xc).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(norm > 0, xc / norm, 0.0)
+
+
+def infer_fields(
+    np,
+    mat,
+    run_index,
+    prefix: str,
+    run_targets=None,
+    target_names: Sequence[str] = (),
+) -> List[Candidate]:
+    """Score every (offset, type) read of a (frames x bytes) matrix; return the non-overlapping best."""
+    n, length = mat.shape
+    usable = length - 1  # last byte is the checksum
+    entropy = _byte_entropy(np, mat)
+    same_run = run_index[1:] == run_index[:-1]
+    # Running count of non-constant bytes, to count them inside any span in O(1).
+    busy = np.concatenate(([0], np.cumsum(entropy > 0)))
+
+    anchors: List[Tuple[str, int, int, object]] = []
+    for name, off, kind in KNOWN_FIELDS.get(prefix, ()):
+        if off + _width(kind) <= usable:
+            col = _read_columns(np, mat[:, off : off + _width(kind)], kind)[:, 0]
+            anchors.append((name, off, _width(kind), col))
+    anchor_names = [a[0] for a in anchors]
+    za = _zscore(np, np.stack([a[3] for a in anchors], axis=1)) if anchors else None
+    zt = None
+    if run_targets is not None and run_targets.shape[1]:
+        zt = _zscore(np, run_targets[run_index])
+
+    scored: List[Candidate] = []
+    for kind, w in TYPES:
+        values = _read_columns(np, mat, kind)[:, : usable - w + 1]
+        m = values.shape[1]
+        if m <= 0:
+            continue
+        varying = ~(values == values[0]).all(axis=0) & ~(np.isnan(values) & np.isnan(values[0])).all(axis=0)
+        if w > 1:
+            # An integer with a single moving byte is just that u8 scaled, and a float whose
+            # only moving byte is its lowest is mantissa noise; leave those to the u8 read.
+            if kind == "float32_le":
+                varying &= (busy[w : w + m] - busy[1 : m + 1]) >= 1
+            else:
+                varying &= (busy[w : w + m] - busy[:m]) >= 2
+        plausible = _plausibility(np, kind, values, entropy)
+        smooth = _smoothness(np, values, same_run)
+
+        zc = _zscore(np, values)
+        corr = np.zeros(m)
+        corr_idx = np.full(m, -1)
+        if za is not None:
+            r = np.abs(zc.T @ za)
+            offs = np.arange(m)
+            for j, (_, aoff, aw, _) in enumerate(anchors):
+                # A read overlapping the anchor is the anchor (or a piece of it), not evidence.
+                r[(offs < aoff + aw) & (offs + w > aoff), j] = 0.0
+            corr_idx = r.argmax(axis=1)
+            corr = r.max(axis=1)
+        if zt is not None:
+            rt = np.abs(zc.T @ zt)
+            better = rt.max(axis=1) > corr
+            corr = np.where(better, rt.max(axis=1), corr)
+            corr_idx = np.where(better, len(anchors) + rt.argmax(axis=1), corr_idx)
+
+        score = WEIGHT_PLAUSIBLE * plausible + WEIGHT_SMOOTH * smooth + WEIGHT_CORRELATED * corr
+        finite = np.where(np.isfinite(values), values, np.nan)
+        with np.errstate(invalid="ignore"):
+            vmin = np.nanmin(np.where(np.isnan(finite).all(axis=0), 0.0, finite), axis=0)
+            vmax = np.nanmax(np.where(np.isnan(finite).all(axis=0), 0.0, finite), axis=0)
+        names = anchor_names + list(target_names)
+        for off in np.flatnonzero(varying):
+            off = int(off)
+            k = int(corr_idx[off])
+            scored.append(
+                Candidate(
+                    offset=off,
+                    kind=kind,
+                    width=w,
+                    score=float(score[off]),
+                    plausible=float(plausible[off]),
+                    smooth=float(smooth[off]),
+                    correlated=float(corr[off]),
+                    corr_with=names[k] if 0 <= k < len(names) else "",
+                    vmin=float(vmin[off]),
+                    vmax=float(vmax[off]),
+                )
+            )
+
+    known = {(off, kind): name for name, off, kind in KNOWN_FIELDS.get(prefix, ())}
+    taken = [False] * length
+    picked: List[Candidate] = []
+    for c in sorted(scored, key=lambda c: (-(c.score + TYPE_BONUS[c.kind]), c.offset)):
+        span = range(c.offset, c.offset + c.width)
+        if any(taken[i] for i in span):
+            continue
+        for i in span:
+            taken[i] = True
+        c.known = (c.offset, c.kind) in known
+        c.name = known.get((c.offset, c.kind), f"unknown_{prefix}_off{c.offset:02d}")
+        picked.append(c)
+    picked.sort(key=lambda c: c.offset)
+    return picked
+
+
+def _confidence(score: float) -> str:
+    if score >= 0.8:
+        return "high"
+    if score >= 0.6:
+        return "medium"
+    return "low"
+
+
+def _num(v: float) -> str:
+    if v == int(v) and abs(v) < 1e15:
+        return str(int(v))
+    return f"{v:.6g}"
+
+
+def proposals_yaml(results: Dict[str, Tuple[int, int, List[Candidate]]], sources: int, min_score: float) -> str:
+    """YAML fragment in ble_definitions.yaml style (hand-formatted so PyYAML is not required)."""
+    lines = [
+        f"# Proposed by field_infer.py from {sources} capture file(s); review before merging into",
+        "# ble_definitions.yaml. Scores: plausible / smooth / correlated, see field_infer.py.",
+        "rx_frames:",
+    ]
+    for prefix, (length, frames, cands) in results.items():
+        lines.append(f'  "{prefix}":')
+        lines.append(f"    length: {length}")
+        lines.append(f"    frames_analysed: {frames}")
+        lines.append("    fields:")
+        shown = [c for c in cands if c.score >= min_score or c.known]
+        if not shown:
+            lines.append("      {}")
+        for c in shown:
+            lines.append(f"      {c.name}:")
+            lines.append(f"        offset: {c.offset}")
+            lines.append(f'        type: "{c.kind}"')
+            lines.append(f'        confidence: "{_confidence(c.score)}"')
+            lines.append(f"        score: {c.score:.2f}")
+            lines.append(f"        observed: {{min: {_num(c.vmin)}, max: {_num(c.vmax)}}}")
+            corr = f', corr_with: "{c.corr_with}"' if c.corr_with and c.correlated > 0 else ""
+            lines.append(
+                f"        evidence: {{plausible: {c.plausible:.2f}, smooth: {c.smooth:.2f}, "
+                f"correlated: {c.correlated:.2f}{corr}}}"
+            )
+            if c.known:
+                lines.append("        matches_known_mapping: true")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Sequence[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("paths", nargs="+", help="Captures (JSONL / .npz) or directories of captures")
+    ap.add_argument("--prefix", action="append", choices=["6905", "3006"], help="Prefixes to analyse (default: both)")
+    ap.add_argument("--values", nargs="+", type=float, help="Setting value of each run, in load order")
+    ap.add_argument("--min-score", type=float, default=0.5, help="Hide unknown candidates below this score")
+    ap.add_argument("--out", help="Write the YAML proposals here instead of stdout")
+    args = ap.parse_args(argv)
+
+    try:
+        capture_columnar._require_numpy()
+        np = capture_columnar.np
+        prefixes = args.prefix or ["3006", "6905"]
+        files = rx_diff._expand_batch_paths(args.paths)
+        t0 = time.perf_counter()
+        runs = rx_diff._load_batch_runs(files, prefixes)
+        if not runs:
+            raise RuntimeError("No RX frames for the requested prefixes")
+        run_targets, target_names = rx_diff._batch_targets(np, runs, args.values)
+        t_load = time.perf_counter() - t0
+
+        results: Dict[str, Tuple[int, int, List[Candidate]]] = {}
+        t1 = time.perf_counter()
+        for prefix in prefixes:
+            mat, run_index, length, _ = rx_diff._batch_matrix(np, runs, prefix)
+            if mat is None or mat.shape[0] < 2:
+                continue
+            results[prefix] = (length, int(mat.shape[0]), infer_fields(np, mat, run_index, prefix, run_targets, target_names))
+        t_infer = time.perf_counter() - t1
+    except (OSError, RuntimeError) as exc:
+        print(f"ERROR: {exc}", file=sys.stderr)
+        return 2
+
+    text = proposals_yaml(results, len(files), args.min_score)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"wrote {args.out}")
+    else:
+        sys.stdout.write(text)
+    frames = sum(r[1] for r in results.values())
+    print(f"# {frames} frame(s): load {t_load:.2f}s, inference {t_infer:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
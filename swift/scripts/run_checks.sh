@@ -30,6 +30,15 @@ if [[ "${RUN_BUILD:-0}" == "1" ]]; then
   go "$FLUTTER" build macos --debug
 fi
 
+# Optional: Python hot-path benchmarks; BENCH_BASELINE=<name> fails the run on regressions
+if [[ "${RUN_BENCH:-0}" == "1" ]]; then
+  if [[ -n "${BENCH_BASELINE:-}" ]]; then
+    go python3 "$ROOT/../bench/run_bench.py" --compare "$BENCH_BASELINE"
+  else
+    go python3 "$ROOT/../bench/run_bench.py"
+  fi
+fi
+
 echo "" | tee -a "$LOG_FILE"
 echo "[run_checks] done" | tee -a "$LOG_FILE"
 echo "[run_checks] log: $LOG_FILE" | tee -a "$LOG_FILE"
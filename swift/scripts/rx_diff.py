@@ -6,18 +6,45 @@ Primary use:
 2) change exactly one setting in OEM app
 3) collect run2 in app
 4) run this script to isolate byte/bit changes
+
+Runs may be JSONL logs or columnar .npz captures (see capture_columnar.py at
+the repo root); .npz files are loaded without any JSON parsing.
+
+Batch mode (--batch) takes any number of captures (files or directories) and
+stacks every RX frame of a prefix into one uint8 matrix, one row per frame,
+tagged with its run and with the change notes logged before that run. One
+vectorized pass gives per-offset variance, entropy, the share of variance
+that sits between runs (settings) rather than within them (live telemetry),
+and correlation with each change note, plus candidate field boundaries:
+
+  python3 rx_diff.py --batch capture_compare_LOGS --prefix 6905
+  python3 rx_diff.py --batch a.jsonl b.jsonl c.npz --values 0 1 1 0
+
+Streaming mode (--streaming) replaces the per-payload Counter of the two-run
+diff with a 256-bin histogram per byte position (per prefix and frame
+length), filled in chunks. Memory no longer grows with capture length, the
+"dominant" frame is the per-offset mode, and besides dominant-byte changes
+it reports offsets whose value distribution moved between the runs.
 """
 
 from __future__ import annotations
 
 import argparse
 import collections
-import json
+import operator
 import os
+import pathlib
 import sys
 from dataclasses import dataclass
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+_REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import capture_columnar  # noqa: E402
+import capture_loader  # noqa: E402
+
 
 @dataclass
 class FrameStats:
@@ -25,81 +52,217 @@ class FrameStats:
     dominant_hex: str
     dominant_count: int
     bytes_data: List[int]
+    histogram: Optional[object] = None  # (len, 256) counts, streaming mode only
+
+
+STREAM_CHUNK_FRAMES = 4096
+
+
+def _dominant_row(np, mat) -> Tuple[int, int]:
+    """(count, first_index) of the most common row of a uint8 matrix; ties -> earliest row.
+
+    Rows are hashed to u64 so np.unique runs on a flat array; np.unique(axis=0)
+    is an order of magnitude slower on 100k+ rows. The winner is re-counted
+    exactly and the slow path is used if a hash collision skewed it.
+    """
+    h = np.full(mat.shape[0], 0xCBF29CE484222325, dtype=np.uint64)
+    prime = np.uint64(0x100000001B3)
+    with np.errstate(over="ignore"):
+        for col in mat.T:
+            h ^= col
+            h *= prime
+    _, first, counts = np.unique(h, return_index=True, return_counts=True)
+    k = int(np.lexsort((first, -counts))[0])
+    count, idx = int(counts[k]), int(first[k])
+    if int((mat == mat[idx]).all(axis=1).sum()) == count:
+        return count, idx
+    _, first, counts = np.unique(mat, axis=0, return_index=True, return_counts=True)
+    k = int(np.lexsort((first, -counts))[0])
+    return int(counts[k]), int(first[k])
+
+
+def _collect_rx_by_prefix_columnar(path: str, wanted_prefixes: Sequence[str]) -> Dict[str, FrameStats]:
+    np = capture_columnar.np
+    cols = capture_columnar.load_columnar(path)
+    rx = cols.dir == capture_columnar.DIR_RX
+    if not rx.any():
+        raise RuntimeError(f"No RX entries found in {path}")
+    prefix16 = cols.prefix16()
+    starts = cols.offsets[:-1]
+    lengths = cols.lengths
 
-
-def _safe_json(line: str) -> Optional[dict]:
-    try:
-        value = json.loads(line)
-    except json.JSONDecodeError:
-        return None
-    if isinstance(value, dict):
-        return value
-    return None
-
-
-def _hex_to_bytes(hex_str: str) -> Optional[List[int]]:
-    clean = "".join(ch for ch in hex_str if ch in "0123456789abcdefABCDEF")
-    if not clean or len(clean) % 2 != 0:
-        return None
-    try:
-        return list(bytes.fromhex(clean))
-    except ValueError:
-        return None
-
-
-def _event_prefix(evt: dict) -> Optional[str]:
-    decoded = evt.get("decoded")
-    if isinstance(decoded, dict):
-        prefix = decoded.get("pkt_prefix")
-        if isinstance(prefix, str) and len(prefix) >= 4:
-            return prefix[:4].lower()
-    payload_hex = evt.get("payload_hex")
-    if isinstance(payload_hex, str) and len(payload_hex) >= 4:
-        return payload_hex[:4].lower()
-    return None
+    out: Dict[str, FrameStats] = {}
+    for prefix in wanted_prefixes:
+        rows = np.flatnonzero(rx & (prefix16 == int(prefix, 16)))
+        if rows.size == 0:
+            continue
+        # Dominant payload per length bucket via unique rows; ties go to the payload seen
+        # first, matching Counter.most_common on the JSONL path.
+        best: Optional[Tuple[int, int, bytes]] = None
+        for length in np.unique(lengths[rows]):
+            sel = rows[lengths[rows] == length]
+            mat = cols.payload[starts[sel][:, None] + np.arange(length)]
+            count, first = _dominant_row(np, mat)
+            cand = (count, -int(sel[first]), mat[first].tobytes())
+            if best is None or cand[:2] > best[:2]:
+                best = cand
+        assert best is not None
+        dominant = best[2]
+        out[prefix] = FrameStats(
+            count=int(rows.size),
+            dominant_hex=dominant.hex(),
+            dominant_count=best[0],
+            bytes_data=list(dominant),
+        )
+    return out
 
 
 def _collect_rx_by_prefix(path: str, wanted_prefixes: Sequence[str]) -> Dict[str, FrameStats]:
-    counters: Dict[str, collections.Counter[str]] = {
+    if capture_columnar.is_columnar_path(path):
+        return _collect_rx_by_prefix_columnar(path, wanted_prefixes)
+    counters: Dict[str, collections.Counter[bytes]] = {
         p: collections.Counter() for p in wanted_prefixes
     }
-    total_rx = 0
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            evt = _safe_json(raw)
-            if not evt:
-                continue
-            if str(evt.get("direction", "")).upper() != "RX":
-                continue
-            total_rx += 1
-            prefix = _event_prefix(evt)
-            if prefix not in counters:
-                continue
-            payload = evt.get("payload_hex")
-            if not isinstance(payload, str):
-                continue
-            counters[prefix][payload.lower()] += 1
+    load = capture_loader.LoadStats()
+    frames = capture_loader.iter_capture(path, direction="RX", prefixes=wanted_prefixes, fields=(), stats=load)
+    # Count in one C-level pass, then split the few distinct payloads by prefix (first-seen order kept).
+    for payload, n in collections.Counter(map(operator.itemgetter(1), frames)).items():
+        counters[payload[:2].hex()][payload] = n
 
     out: Dict[str, FrameStats] = {}
     for prefix in wanted_prefixes:
         c = counters[prefix]
         if not c:
             continue
-        dominant_hex, dominant_count = c.most_common(1)[0]
-        data = _hex_to_bytes(dominant_hex)
-        if data is None:
-            continue
+        dominant, dominant_count = c.most_common(1)[0]
         out[prefix] = FrameStats(
             count=sum(c.values()),
-            dominant_hex=dominant_hex,
+            dominant_hex=dominant.hex(),
             dominant_count=dominant_count,
-            bytes_data=data,
+            bytes_data=list(dominant),
         )
+    if load.direction_lines == 0:
+        raise RuntimeError(f"No RX entries found in {path}")
+    return out
+
+
+class OffsetHistogram:
+    """256-bin value histogram per byte position for frames of one length.
+
+    Frames are buffered into chunks of STREAM_CHUNK_FRAMES and folded in with
+    one bincount, so memory is O(length * 256) however long the capture is.
+    """
+
+    def __init__(self, np, length: int) -> None:
+        self._np = np
+        self.length = length
+        self.frames = 0
+        self._counts = np.zeros(length * 256, dtype=np.int64)
+        self._base = np.arange(length, dtype=np.intp) * 256
+        self._pending = bytearray()
+        self._pending_frames = 0
+
+    def add(self, data: bytes) -> None:
+        self._pending += data
+        self._pending_frames += 1
+        if self._pending_frames >= STREAM_CHUNK_FRAMES:
+            self.flush()
+
+    def add_matrix(self, mat) -> None:
+        np = self._np
+        self._counts += np.bincount((mat.astype(np.intp) + self._base).ravel(), minlength=self._counts.size)
+        self.frames += int(mat.shape[0])
+
+    def flush(self) -> None:
+        if not self._pending_frames:
+            return
+        mat = self._np.frombuffer(bytes(self._pending), dtype=self._np.uint8).reshape(-1, self.length)
+        self._pending = bytearray()
+        self._pending_frames = 0
+        self.add_matrix(mat)
+
+    def table(self):
+        self.flush()
+        return self._counts.reshape(self.length, 256)
+
+
+def _stats_from_histograms(hists: Dict[int, OffsetHistogram]) -> Optional[FrameStats]:
+    if not hists:
+        return None
+    total = sum(h.frames + h._pending_frames for h in hists.values())
+    # The most common length wins, like the most common payload on the Counter path.
+    h = max(hists.values(), key=lambda h: h.frames + h._pending_frames)
+    table = h.table()
+    dominant = bytes(int(v) for v in table.argmax(axis=1))
+    return FrameStats(
+        count=total,
+        dominant_hex=dominant.hex(),
+        # Frames that agree with the mode at the least settled offset: an upper bound on
+        # how many whole frames equal the per-offset mode.
+        dominant_count=int(table.max(axis=1).min()),
+        bytes_data=list(dominant),
+        histogram=table,
+    )
+
+
+def _collect_rx_streaming(path: str, wanted_prefixes: Sequence[str]) -> Dict[str, FrameStats]:
+    capture_columnar._require_numpy()
+    np = capture_columnar.np
+    hists: Dict[str, Dict[int, OffsetHistogram]] = {p: {} for p in wanted_prefixes}
+    total_rx = 0
+    if capture_columnar.is_columnar_path(path):
+        cols = capture_columnar.load_columnar(path)
+        rx = cols.dir == capture_columnar.DIR_RX
+        total_rx = int(rx.sum())
+        prefix16 = cols.prefix16()
+        starts = cols.offsets[:-1]
+        lengths = cols.lengths
+        for prefix in wanted_prefixes:
+            rows = np.flatnonzero(rx & (prefix16 == int(prefix, 16)))
+            for length in np.unique(lengths[rows]):
+                length = int(length)
+                sel = rows[lengths[rows] == length]
+                h = hists[prefix].setdefault(length, OffsetHistogram(np, length))
+                for k in range(0, sel.size, STREAM_CHUNK_FRAMES):
+                    chunk = sel[k : k + STREAM_CHUNK_FRAMES]
+                    h.add_matrix(cols.payload[starts[chunk][:, None] + np.arange(length)])
+    else:
+        load = capture_loader.LoadStats()
+        for _, data in capture_loader.iter_capture(path, direction="RX", prefixes=wanted_prefixes, fields=(), stats=load):
+            by_len = hists[data[:2].hex()]
+            h = by_len.get(len(data))
+            if h is None:
+                h = by_len[len(data)] = OffsetHistogram(np, len(data))
+            h.add(data)
+        total_rx = load.direction_lines
     if total_rx == 0:
         raise RuntimeError(f"No RX entries found in {path}")
+    out: Dict[str, FrameStats] = {}
+    for prefix in wanted_prefixes:
+        stats = _stats_from_histograms(hists[prefix])
+        if stats is not None:
+            out[prefix] = stats
     return out
 
 
+def _histogram_shifts(
+    prefix: str,
+    a: FrameStats,
+    b: FrameStats,
+    ignore_dynamic: bool,
+    threshold: float,
+) -> List[Tuple[int, float]]:
+    """Offsets whose value distribution moved by at least `threshold` (total variation distance)."""
+    ha, hb = a.histogram, b.histogram
+    if ha is None or hb is None or ha.shape != hb.shape:
+        return []
+    pa = ha / max(1, int(ha[0].sum()))
+    pb = hb / max(1, int(hb[0].sum()))
+    tv = 0.5 * abs(pa - pb).sum(axis=1)
+    ignored = _ignore_offsets(prefix, ignore_dynamic)
+    return [(i, float(tv[i])) for i in range(tv.shape[0]) if i not in ignored and tv[i] >= threshold]
+
+
 def _label(prefix: str, off: int) -> str:
     if prefix == "6905":
         labels = {
@@ -181,18 +344,370 @@ def _resolve_paths(run1: Optional[str], run2: Optional[str], logs_dir: str) -> T
     files = [
         os.path.join(logs_dir, n)
         for n in os.listdir(logs_dir)
-        if n.startswith("ble_events_") and n.endswith(".jsonl")
+        if n.startswith("ble_events_") and (n.endswith(".jsonl") or n.endswith(".npz"))
     ]
     files.sort(key=os.path.getmtime, reverse=True)
     if len(files) < 2:
-        raise RuntimeError("Need at least two ble_events_*.jsonl files")
+        raise RuntimeError("Need at least two ble_events_*.jsonl/.npz files")
     return files[1], files[0]
 
 
+# --- batch (N-run) mode ---
+
+HEATMAP_SHADES = " .:-=+*#%@"
+
+
+@dataclass
+class BatchRun:
+    path: str
+    run: str
+    notes: Tuple[str, ...]  # change notes this run comes after
+    frames: Dict[str, List[bytes]]
+
+    @property
+    def label(self) -> str:
+        return f"{os.path.basename(self.path)}:{self.run}"
+
+
+@dataclass
+class OffsetStats:
+    n_frames: int
+    n_runs: int
+    length: int
+    variance: object      # (L,) float64
+    entropy: object       # (L,) float64, bits
+    distinct: object      # (L,) int
+    dominant: object      # (L,) uint8
+    run_share: object     # (L,) between-run variance / total variance
+    corr: object          # (L, K) correlation with each target column
+    target_names: List[str]
+
+
+def _expand_batch_paths(paths: Sequence[str]) -> List[str]:
+    out: List[str] = []
+    for p in paths:
+        if os.path.isdir(p):
+            names = sorted(
+                n for n in os.listdir(p) if n.endswith((".jsonl", ".txt", ".npz")) and not n.startswith(".")
+            )
+            out.extend(os.path.join(p, n) for n in names)
+        else:
+            out.append(p)
+    return out
+
+
+def _place_notes(runs: List[BatchRun], file_notes: Sequence[str]) -> List[BatchRun]:
+    """two_run_rx_capture.py appends the "between" note to the end of both run files:
+    run1 is the side before the change and run2 the side after it. Other run
+    tags keep the notes that were logged ahead of their frames."""
+    for r in runs:
+        if r.run == "run1":
+            r.notes = ()
+        elif r.run == "run2":
+            r.notes = tuple(file_notes)
+    return runs
+
+
+def _batch_runs_jsonl(path: str, wanted_prefixes: Sequence[str]) -> List[BatchRun]:
+    runs: Dict[Tuple[str, Tuple[str, ...]], BatchRun] = {}
+    notes: List[str] = []
+    seen: Tuple[str, ...] = ()  # tuple(notes), rebuilt only when a note arrives
+    current = "run"
+    frames = capture_loader.iter_capture(
+        path, direction="RX", prefixes=wanted_prefixes, markers=True, fields=("run",)
+    )
+    key: Tuple[str, Tuple[str, ...]] = ("", ())
+    run: Optional[BatchRun] = None
+    for evt, data in frames:
+        if data is None:
+            event = evt.get("event")
+            if event == "change_note":
+                notes.append(str(evt.get("note", "")))
+                seen = tuple(notes)
+            elif event == "run_start":
+                current = str(evt.get("run") or current)
+            continue
+        # fields=("run",) only ever returns string values.
+        tag = evt.get("run") or current
+        if run is None or tag != key[0] or seen is not key[1]:
+            key = (tag, seen)
+            run = runs.get(key)
+            if run is None:
+                run = runs[key] = BatchRun(path, tag, seen, {p: [] for p in wanted_prefixes})
+        run.frames[data[:2].hex()].append(data)
+    return _place_notes(list(runs.values()), notes)
+
+
+def _batch_runs_columnar(path: str, wanted_prefixes: Sequence[str]) -> List[BatchRun]:
+    np = capture_columnar.np
+    cols = capture_columnar.load_columnar(path)
+    rx = cols.dir == capture_columnar.DIR_RX
+    prefix16 = cols.prefix16()
+    starts = cols.offsets[:-1]
+    lengths = cols.lengths
+
+    # Markers keep the row they were logged at; split the rows into segments at run_start/change_note.
+    segments: List[Tuple[int, str, Tuple[str, ...]]] = [(0, "run", ())]
+    notes: List[str] = []
+    for m in sorted(cols.meta.get("markers", []), key=lambda m: m.get("row", 0)):
+        event = m.get("event")
+        if event == "change_note":
+            notes.append(str(m.get("note", "")))
+        elif event == "run_start":
+            pass
+        else:
+            continue
+        run = str(m.get("run") or segments[-1][1]) if event == "run_start" else segments[-1][1]
+        segments.append((int(m.get("row", 0)), run, tuple(notes)))
+
+    bounds = [seg[0] for seg in segments] + [len(cols)]
+    runs: Dict[Tuple[str, Tuple[str, ...]], BatchRun] = {}
+    for k, (row0, tag, seg_notes) in enumerate(segments):
+        row1 = bounds[k + 1]
+        if row1 <= row0:
+            continue
+        key = (tag, seg_notes)
+        for prefix in wanted_prefixes:
+            sel = row0 + np.flatnonzero(rx[row0:row1] & (prefix16[row0:row1] == int(prefix, 16)))
+            if sel.size == 0:
+                continue
+            run = runs.get(key)
+            if run is None:
+                run = runs[key] = BatchRun(path, tag, seg_notes, {p: [] for p in wanted_prefixes})
+            run.frames[prefix].extend(
+                cols.payload[starts[i] : starts[i] + lengths[i]].tobytes() for i in sel
+            )
+    return _place_notes(list(runs.values()), notes)
+
+
+def _load_batch_runs(paths: Sequence[str], wanted_prefixes: Sequence[str]) -> List[BatchRun]:
+    runs: List[BatchRun] = []
+    for path in paths:
+        if capture_columnar.is_columnar_path(path):
+            runs.extend(_batch_runs_columnar(path, wanted_prefixes))
+        else:
+            runs.extend(_batch_runs_jsonl(path, wanted_prefixes))
+    return runs
+
+
+def _batch_matrix(np, runs: Sequence[BatchRun], prefix: str):
+    """(matrix, run_index, length, skipped) for the most common frame length of this prefix."""
+    lengths = collections.Counter(len(b) for r in runs for b in r.frames.get(prefix, ()))
+    if not lengths:
+        return None, None, 0, 0
+    length, count = lengths.most_common(1)[0]
+    blobs: List[bytes] = []
+    run_index: List[int] = []
+    for i, r in enumerate(runs):
+        keep = [b for b in r.frames.get(prefix, ()) if len(b) == length]
+        blobs.extend(keep)
+        run_index.extend([i] * len(keep))
+    mat = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(-1, length)
+    skipped = sum(lengths.values()) - count
+    return mat, np.asarray(run_index, dtype=np.intp), length, skipped
+
+
+def _batch_targets(np, runs: Sequence[BatchRun], values: Optional[Sequence[float]]):
+    """(R, K) per-run target matrix and column names: explicit --values, else one 0/1 column per change note."""
+    if values is not None:
+        if len(values) != len(runs):
+            raise RuntimeError(f"--values needs one number per run ({len(runs)} runs found)")
+        return np.asarray(values, dtype=np.float64)[:, None], ["value"]
+    names: List[str] = []
+    for r in runs:
+        for n in r.notes:
+            if n not in names:
+                names.append(n)
+    t = np.zeros((len(runs), len(names)), dtype=np.float64)
+    for i, r in enumerate(runs):
+        for n in r.notes:
+            t[i, names.index(n)] = 1.0
+    return t, names
+
+
+def batch_offset_stats(np, mat, run_index, run_targets, target_names: List[str]) -> OffsetStats:
+    """All per-offset statistics for one (frames x offsets) uint8 matrix in a handful of array ops."""
+    n, length = mat.shape
+    x = mat.astype(np.float64)
+    mean = x.mean(axis=0)
+    xc = x - mean
+    variance = (xc * xc).mean(axis=0)
+
+    # 256-bin histogram per offset with a single bincount over (offset, value) pairs.
+    hist = np.bincount(
+        (mat.astype(np.intp) + (np.arange(length, dtype=np.intp) * 256)).ravel(),
+        minlength=length * 256,
+    ).reshape(length, 256)
+    p = hist / float(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.where(p > 0, p * np.log2(p), 0.0).sum(axis=1)
+
+    # Between-run share of the variance: rows are grouped by run, so reduceat gives per-run sums.
+    runs_present, first = np.unique(run_index, return_index=True)
+    run_sums = np.add.reduceat(x, first, axis=0)
+    run_counts = np.diff(np.append(first, n)).astype(np.float64)
+    run_means = run_sums / run_counts[:, None]
+    between = ((run_means - mean) ** 2 * run_counts[:, None]).sum(axis=0) / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        run_share = np.where(variance > 0, between / variance, 0.0)
+
+    k = run_targets.shape[1]
+    if k:
+        y = run_targets[run_index]
+        yc = y - y.mean(axis=0)
+        denom = np.sqrt((xc * xc).sum(axis=0))[:, None] * np.sqrt((yc * yc).sum(axis=0))[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.where(denom > 0, (xc.T @ yc) / denom, 0.0)
+    else:
+        corr = np.zeros((length, 0))
+
+    return OffsetStats(
+        n_frames=n,
+        n_runs=int(runs_present.size),
+        length=length,
+        variance=variance,
+        entropy=entropy,
+        distinct=(hist > 0).sum(axis=1),
+        dominant=hist.argmax(axis=1).astype(np.uint8),
+        run_share=run_share,
+        corr=corr,
+        target_names=target_names,
+    )
+
+
+def field_boundaries(stats: OffsetStats) -> List[Tuple[int, int, str]]:
+    """Candidate (start, width, kind) fields from runs of adjacent non-constant offsets.
+
+    A float32/u32 whose top byte stays constant shows up as 3 active bytes, so
+    3-byte runs are widened to 4; longer runs are cut into 4-byte words from
+    their first offset (the layout of 0x3006 and of the 0x6905 float block).
+    The last byte is the frame checksum and is reported on its own.
+    """
+    active = [int(d) > 1 for d in stats.distinct]
+    out: List[Tuple[int, int, str]] = []
+    last = stats.length - 1
+    if active[last]:
+        active[last] = False
+        out_checksum = [(last, 1, "checksum")]
+    else:
+        out_checksum = []
+    i = 0
+    while i < last:
+        if not active[i]:
+            i += 1
+            continue
+        j = i
+        while j < last and active[j]:
+            j += 1
+        width = j - i
+        if width == 1:
+            kind = "flag/enum u8" if int(stats.distinct[i]) <= 4 else "u8"
+            out.append((i, 1, kind))
+        elif width == 2:
+            out.append((i, 2, "u16"))
+        elif width <= 4:
+            out.append((i, min(4, last - i), "u32/f32"))
+            j = max(j, min(i + 4, last))
+        else:
+            for k in range(i, j, 4):
+                w = min(4, last - k)
+                out.append((k, w, "u32/f32" if w == 4 else f"tail {w}B"))
+            j = max(j, min(i + ((width + 3) // 4) * 4, last))
+        i = j
+    return out + out_checksum
+
+
+def _heatmap_row(values, scale: float) -> str:
+    top = len(HEATMAP_SHADES) - 1
+    return "".join(
+        HEATMAP_SHADES[min(top, int(round(top * float(v) / scale)))] if scale > 0 else " " for v in values
+    )
+
+
+def _print_batch_prefix(np, prefix: str, stats: OffsetStats, skipped: int, top: int) -> None:
+    print(
+        f"batch {prefix}: frames={stats.n_frames} runs={stats.n_runs} len={stats.length}"
+        + (f" (skipped {skipped} frame(s) of other lengths)" if skipped else "")
+    )
+    log_var = np.log1p(stats.variance)
+    var_scale = float(log_var.max())
+    best_corr = np.abs(stats.corr).max(axis=1) if stats.corr.shape[1] else None
+    print("  heatmap (log variance, scaled to this prefix | best |corr|), 16 offsets per row:")
+    for row in range(0, stats.length, 16):
+        sl = slice(row, min(row + 16, stats.length))
+        var_txt = _heatmap_row(log_var[sl], var_scale)
+        corr_txt = _heatmap_row(best_corr[sl], 1.0) if best_corr is not None else ""
+        print(f"    {row:03d} |{var_txt:<16}|" + (f" |{corr_txt:<16}|" if best_corr is not None else ""))
+
+    order = np.flatnonzero(stats.distinct > 1)
+    if best_corr is not None:
+        order = order[np.argsort(-best_corr[order], kind="stable")]
+    else:
+        order = order[np.argsort(-stats.run_share[order], kind="stable")]
+    if top:
+        order = order[:top]
+    if order.size == 0:
+        print("  no varying offsets")
+    else:
+        print("  off  label             var      H(bits) distinct dom  run_share" + ("  corr" if best_corr is not None else ""))
+        for off in order:
+            off = int(off)
+            line = (
+                f"  {off:03d}  {_label(prefix, off):<16}  {stats.variance[off]:8.1f}  {stats.entropy[off]:6.2f}"
+                f"  {int(stats.distinct[off]):7d}  0x{int(stats.dominant[off]):02X}  {stats.run_share[off]:8.2f}"
+            )
+            if best_corr is not None:
+                k = int(np.argmax(np.abs(stats.corr[off])))
+                line += f"  {stats.corr[off, k]:+.2f} [{stats.target_names[k]}]"
+            print(line)
+
+    fields = field_boundaries(stats)
+    if fields:
+        print("  candidate fields:")
+        for start, width, kind in fields:
+            share = float(stats.run_share[start : start + width].max())
+            zone = "setting" if share >= 0.5 else "live"
+            print(f"    off {start:03d}..{start + width - 1:03d}  {kind:<13} {zone}")
+    print()
+
+
+def run_batch(paths: Sequence[str], prefixes: Sequence[str], values: Optional[Sequence[float]], top: int) -> int:
+    capture_columnar._require_numpy()
+    np = capture_columnar.np
+    files = _expand_batch_paths(paths)
+    if not files:
+        raise RuntimeError("No capture files given")
+    runs = _load_batch_runs(files, prefixes)
+    if not runs:
+        raise RuntimeError("No RX frames for the requested prefixes")
+    run_targets, target_names = _batch_targets(np, runs, values)
+    print(f"batch: {len(files)} file(s), {len(runs)} run(s)")
+    for i, r in enumerate(runs):
+        counts = " ".join(f"{p}={len(r.frames.get(p, ()))}" for p in prefixes)
+        note = f" after: {'; '.join(r.notes)}" if r.notes else ""
+        print(f"  [{i}] {r.label} {counts}{note}")
+    if target_names:
+        print("targets: " + ", ".join(target_names))
+    print()
+
+    for prefix in prefixes:
+        mat, run_index, _, skipped = _batch_matrix(np, runs, prefix)
+        if mat is None:
+            print(f"batch {prefix}: no frames")
+            print()
+            continue
+        keep = np.unique(run_index)
+        stats = batch_offset_stats(np, mat, run_index, run_targets, target_names)
+        if keep.size < 2:
+            print(f"batch {prefix}: only one run has frames; run_share/correlation are not meaningful")
+        _print_batch_prefix(np, prefix, stats, skipped, top)
+    return 0
+
+
 def main(argv: Sequence[str]) -> int:
     ap = argparse.ArgumentParser(description=__doc__)
-    ap.add_argument("--run1", help="Path to run1 ble_events_*.jsonl")
-    ap.add_argument("--run2", help="Path to run2 ble_events_*.jsonl")
+    ap.add_argument("--run1", help="Path to run1 ble_events_*.jsonl (or columnar .npz)")
+    ap.add_argument("--run2", help="Path to run2 ble_events_*.jsonl (or columnar .npz)")
     ap.add_argument(
         "--logs-dir",
         default=os.path.join(os.path.dirname(__file__), "..", "logs"),
@@ -204,6 +719,35 @@ def main(argv: Sequence[str]) -> int:
         choices=["6905", "3006"],
         help="Frame prefixes to compare (default: both)",
     )
+    ap.add_argument(
+        "--batch",
+        nargs="+",
+        metavar="PATH",
+        help="N-run mode: captures or directories of captures to analyse together",
+    )
+    ap.add_argument(
+        "--values",
+        nargs="+",
+        type=float,
+        help="Batch mode: the setting value of each run, in the order listed (default: change notes)",
+    )
+    ap.add_argument(
+        "--top",
+        type=int,
+        default=0,
+        help="Batch mode: only list the N most correlated / run-dependent offsets (default: all)",
+    )
+    ap.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Two-run mode: per-offset histograms instead of whole payloads (constant memory)",
+    )
+    ap.add_argument(
+        "--shift-threshold",
+        type=float,
+        default=0.5,
+        help="Streaming mode: report offsets whose value distribution moved this much (0..1)",
+    )
     ap.add_argument(
         "--no-ignore-dynamic",
         action="store_true",
@@ -212,13 +756,20 @@ def main(argv: Sequence[str]) -> int:
     args = ap.parse_args(argv)
 
     prefixes = args.prefix or ["6905", "3006"]
+    if args.batch:
+        try:
+            return run_batch(args.batch, prefixes, args.values, args.top)
+        except (OSError, RuntimeError) as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            return 2
     run1, run2 = _resolve_paths(args.run1, args.run2, args.logs_dir)
     print(f"run1: {run1}")
     print(f"run2: {run2}")
     print()
 
-    s1 = _collect_rx_by_prefix(run1, prefixes)
-    s2 = _collect_rx_by_prefix(run2, prefixes)
+    collect = _collect_rx_streaming if args.streaming else _collect_rx_by_prefix
+    s1 = collect(run1, prefixes)
+    s2 = collect(run2, prefixes)
 
     for prefix in prefixes:
         a = s1.get(prefix)
@@ -252,6 +803,21 @@ def main(argv: Sequence[str]) -> int:
                     print(
                         f"    flags: run1={_settings_flag_bits(va)} | run2={_settings_flag_bits(vb)}"
                     )
+        if args.streaming:
+            changed = {off for off, _, _ in diffs}
+            shifts = [
+                (off, tv)
+                for off, tv in _histogram_shifts(
+                    prefix, a, b, not args.no_ignore_dynamic, args.shift_threshold
+                )
+                if off not in changed
+            ]
+            if shifts:
+                print(f"shift {prefix}: {len(shifts)} offset(s) with a moved distribution, same mode")
+                for off, tv in shifts:
+                    label = _label(prefix, off)
+                    label_txt = f" [{label}]" if label else ""
+                    print(f"  off {off:03d}{label_txt}: tv={tv:.2f}")
         print()
 
     return 0
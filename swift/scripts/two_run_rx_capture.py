@@ -6,6 +6,9 @@ Flow:
 2) Ask for a short change note, then wait for Enter so you can change one setting in OEM app.
 3) Auto-connect again, capture N RX frames, disconnect.
 4) Run rx_diff.py on the two new logs.
+
+With --columnar each finished log is also written as a columnar .npz capture
+(capture_columnar.py at the repo root) and rx_diff runs on those instead.
 """
 
 from __future__ import annotations
@@ -13,13 +16,13 @@ from __future__ import annotations
 import argparse
 import asyncio
 import datetime as dt
-import hashlib
 import json
+import os
 import pathlib
-import re
 import sys
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 try:
     from bleak import BleakClient, BleakScanner
@@ -36,6 +39,27 @@ DEFAULT_SERVICE_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
 DEFAULT_RX_UUID = "0000ffe2-0000-1000-8000-00805f9b34fb"
 DEFAULT_TX_UUID = "0000ffe3-0000-1000-8000-00805f9b34fb"
 DEFAULT_CAPTURE_DIR = pathlib.Path("/Users/globel/r4830_project/swift/scripts/capture_compare_LOGS")
+# Mid-run link loss: a few quick reconnects, never past the run's --timeout.
+RECONNECT_ATTEMPTS = 5
+RECONNECT_BACKOFF_MAX_S = 5.0
+LINK_CLOSE_GRACE_S = 2.0
+
+_REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import capture_columnar  # noqa: E402
+import charger_sim  # noqa: E402
+import charger_session  # noqa: E402
+from charger_framing import FrameReassembler  # noqa: E402
+from charger_scheduler import WriteScheduler  # noqa: E402
+from charger_session import (  # noqa: E402
+    DEFAULT_CACHE_PATH,
+    STARTUP_KICK,
+    ChargerSession,
+    LinkCache,
+)
+from charger_session import uuid16 as _uuid16  # noqa: E402
 
 
 def _now_iso() -> str:
@@ -46,30 +70,6 @@ def _hex(data: bytes) -> str:
     return data.hex()
 
 
-def _uuid16(raw: str) -> str:
-    lower = raw.lower()
-    match = re.search(r"([0-9a-f]{4})(?:-0000-1000-8000-00805f9b34fb)?$", lower)
-    if match:
-        return match.group(1)
-    return lower[-4:]
-
-
-def _build_password_auth_chunks(password: str, max_chunk_bytes: int = 20) -> List[bytes]:
-    normalized = password.strip()
-    digest = hashlib.md5(normalized.encode("utf-8")).hexdigest().upper()
-    data = digest.encode("ascii") + b"\x00"
-    cmd_id = 0x02
-    frame = bytes([len(data) + 2, cmd_id]) + data
-    checksum = sum(frame[1:]) & 0xFF
-    frame += bytes([checksum])
-    if max_chunk_bytes <= 0 or len(frame) <= max_chunk_bytes:
-        return [frame]
-    chunks = []
-    for i in range(0, len(frame), max_chunk_bytes):
-        chunks.append(frame[i : i + max_chunk_bytes])
-    return chunks
-
-
 def _decode_payload(payload: bytes) -> Dict[str, Any]:
     out: Dict[str, Any] = {"len": len(payload), "hex": _hex(payload)}
     if len(payload) >= 2:
@@ -199,103 +199,155 @@ async def _find_device(
     raise RuntimeError("charger not found")
 
 
-def _pick_chars_from_services(services: Any, preferred_rx: str, preferred_tx: str) -> Tuple[str, str]:
-    rx_candidates: List[Tuple[str, Any]] = []
-    tx_candidates: List[Tuple[str, Any]] = []
-
-    for svc in services:
-        for chr_obj in svc.characteristics:
-            props = set(chr_obj.properties)
-            if "notify" in props or "indicate" in props:
-                rx_candidates.append((str(chr_obj.uuid), chr_obj))
-            if "write" in props or "write-without-response" in props:
-                tx_candidates.append((str(chr_obj.uuid), chr_obj))
-
-    pref_rx_16 = _uuid16(preferred_rx)
-    pref_tx_16 = _uuid16(preferred_tx)
-
-    def _find_pref(cands: Sequence[Tuple[str, Any]], target_16: str) -> Optional[str]:
-        for uuid, _ in cands:
-            if _uuid16(uuid) == target_16:
-                return uuid
-        return None
-
-    rx_uuid = _find_pref(rx_candidates, pref_rx_16) or (rx_candidates[0][0] if rx_candidates else "")
-    tx_uuid = _find_pref(tx_candidates, pref_tx_16) or (tx_candidates[0][0] if tx_candidates else "")
-
-    if not rx_uuid:
-        raise RuntimeError("no RX notify/indicate characteristic found")
-    if not tx_uuid:
-        raise RuntimeError("no TX write characteristic found")
-    return rx_uuid, tx_uuid
-
-
 def _append_jsonl(path: pathlib.Path, event: Dict[str, Any]) -> None:
     with path.open("a", encoding="utf-8") as f:
         f.write(json.dumps(event, separators=(",", ":")) + "\n")
 
 
+class _JsonlWriter:
+    """Buffered JSONL log for one run.
+
+    put() only enqueues, so BLE callbacks never touch the disk. A writer task
+    serializes events in batches and writes them from a worker thread once
+    max_batch events are waiting or flush_interval_s has passed; the file is
+    fsynced only on close() (the run boundary). Events that can't be queued
+    are counted as dropped, events that waited longer than late_after_s
+    before reaching the file as late.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        max_batch: int = 256,
+        flush_interval_s: float = 0.25,
+        max_queue: int = 10000,
+        late_after_s: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.max_batch = max_batch
+        self.flush_interval_s = flush_interval_s
+        self.late_after_s = late_after_s
+        self._queue: "asyncio.Queue[Optional[Tuple[float, Dict[str, Any]]]]" = asyncio.Queue(max_queue)
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._file: Any = None
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.late = 0
+        self.max_lag_s = 0.0
+
+    def start(self) -> "_JsonlWriter":
+        self._file = self.path.open("a", encoding="utf-8")
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def put(self, event: Dict[str, Any]) -> None:
+        if self._closed:
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait((time.monotonic(), event))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+        await asyncio.to_thread(self._sync_and_close)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "late": self.late,
+            "max_lag_ms": round(self.max_lag_s * 1000.0, 1),
+        }
+
+    def _sync_and_close(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def _write_lines(self, text: str) -> None:
+        self._file.write(text)
+        self._file.flush()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval_s
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            text = "".join(json.dumps(evt, separators=(",", ":")) + "\n" for _, evt in batch)
+            await asyncio.to_thread(self._write_lines, text)
+            now = time.monotonic()
+            for queued_at, _ in batch:
+                lag = now - queued_at
+                if lag > self.max_lag_s:
+                    self.max_lag_s = lag
+                if lag > self.late_after_s:
+                    self.late += 1
+            self.written += len(batch)
+            self.batches += 1
+
+
 def _sanitize_note(raw: Optional[str]) -> str:
     if raw is None:
         return ""
     return " ".join(raw.strip().split())
 
 
-async def _keepalive_task(
+def _make_scheduler(
     client: BleakClient,
     tx_uuid: str,
     run_tag: str,
-    jsonl_file: pathlib.Path,
-    interval_s: float,
-) -> None:
-    while client.is_connected:
-        try:
-            payload = bytes.fromhex("020606")
-            await client.write_gatt_char(tx_uuid, payload, response=False)
-            _append_jsonl(
-                jsonl_file,
-                _json_event(
-                    direction="TX",
-                    payload=payload,
-                    run_tag=run_tag,
-                    note="keepalive",
-                    characteristic_uuid=tx_uuid,
-                ),
-            )
-        except Exception:
-            pass
-        await asyncio.sleep(interval_s)
+    log: _JsonlWriter,
+) -> WriteScheduler:
+    """Keepalive + poll writes share one queue; each successful write is logged as TX."""
 
+    async def _write(payload: bytes) -> None:
+        await client.write_gatt_char(tx_uuid, payload, response=False)
 
-async def _poll_task(
-    client: BleakClient,
-    tx_uuid: str,
-    run_tag: str,
-    jsonl_file: pathlib.Path,
-    interval_s: float,
-) -> None:
-    frames = ["020101", "020404", "020505"]
-    while client.is_connected:
-        for frame in frames:
-            if not client.is_connected:
-                break
-            try:
-                payload = bytes.fromhex(frame)
-                await client.write_gatt_char(tx_uuid, payload, response=False)
-                _append_jsonl(
-                    jsonl_file,
-                    _json_event(
-                        direction="TX",
-                        payload=payload,
-                        run_tag=run_tag,
-                        note=f"poll:{frame}",
-                        characteristic_uuid=tx_uuid,
-                    ),
-                )
-            except Exception:
-                pass
-            await asyncio.sleep(0.05)
-        await asyncio.sleep(interval_s)
+    def _on_write(payload: bytes, note: Optional[str], _prio: int, _latency: float, error: Optional[Exception]) -> None:
+        if error is not None:
+            return
+        log.put(
+            _json_event(
+                direction="TX",
+                payload=payload,
+                run_tag=run_tag,
+                note=note,
+                characteristic_uuid=tx_uuid,
+            ),
+        )
+
+    # 50 ms gap matches the old spacing between poll frames.
+    return WriteScheduler(_write, min_gap_s=0.05, on_write=_on_write, name=run_tag)
 
 
 async def _capture_run(
@@ -315,129 +367,152 @@ async def _capture_run(
     password: str,
     keepalive_interval_s: float,
     poll_interval_s: float,
-) -> RunResult:
-    _append_jsonl(out_path, {"event": "run_start", "run": run_tag, "ts": _now_iso()})
-    print(f"[{run_tag}] scanning...")
-    device, matched_by = await _find_device(
-        timeout_s=scan_timeout_s,
-        address=address,
-        name_contains=name_contains,
-        service_uuid=service_uuid,
-        preferred_rx_uuid=preferred_rx_uuid,
-        preferred_tx_uuid=preferred_tx_uuid,
-        company_id=company_id,
-        mfg_prefix=mfg_prefix,
-    )
-    dev_name = getattr(device, "name", "") or "unknown"
-    dev_addr = getattr(device, "address", "") or "unknown"
-    print(f"[{run_tag}] found {dev_name} ({dev_addr}) via {matched_by}")
-
-    rx_count = 0
-    tx_count = 0
-    done = asyncio.Event()
-
-    async with BleakClient(device) as client:
-        await client.connect()
-        if not client.is_connected:
-            raise RuntimeError(f"[{run_tag}] connect failed")
-        print(f"[{run_tag}] connected")
-
-        # UUID-direct mode first (works across bleak versions and matches known charger UUIDs).
-        rx_uuid = preferred_rx_uuid
-        tx_uuid = preferred_tx_uuid
-        # If services are already available, refine selection from discovered properties.
-        try:
-            services = getattr(client, "services", None)
-            if services:
-                rx_uuid, tx_uuid = _pick_chars_from_services(services, preferred_rx_uuid, preferred_tx_uuid)
-        except Exception:
-            # Keep UUID-direct defaults when service introspection is unavailable.
-            pass
-        print(f"[{run_tag}] RX={_uuid16(rx_uuid)} TX={_uuid16(tx_uuid)}")
+    link_cache: Optional[LinkCache] = None,
+    link_cache_path: Optional[pathlib.Path] = None,
+) -> Tuple[RunResult, Optional[LinkCache]]:
+    """One capture; returns the result and the link cache for the next run (address + RX/TX, no rescan)."""
+    log = _JsonlWriter(out_path).start()
+    try:
+        log.put({"event": "run_start", "run": run_tag, "ts": _now_iso()})
+
+        rx_count = 0
+        tx_count = 0
+        done = asyncio.Event()
+        reasm = FrameReassembler()
+        loop = asyncio.get_running_loop()
+        deadline: Optional[float] = None
+
+        async def _find() -> Any:
+            print(f"[{run_tag}] scanning...")
+            device, matched_by = await _find_device(
+                timeout_s=scan_timeout_s,
+                address=address,
+                name_contains=name_contains,
+                service_uuid=service_uuid,
+                preferred_rx_uuid=preferred_rx_uuid,
+                preferred_tx_uuid=preferred_tx_uuid,
+                company_id=company_id,
+                mfg_prefix=mfg_prefix,
+            )
+            dev_name = getattr(device, "name", "") or "unknown"
+            dev_addr = getattr(device, "address", "") or "unknown"
+            print(f"[{run_tag}] found {dev_name} ({dev_addr}) via {matched_by}")
+            return device
 
         def _on_notify(_: Any, data: bytearray) -> None:
+            # Log whole frames: at small MTUs one frame spans several notifications.
             nonlocal rx_count
-            payload = bytes(data)
-            rx_count += 1
-            _append_jsonl(
-                out_path,
-                _json_event(
-                    direction="RX",
-                    payload=payload,
-                    run_tag=run_tag,
-                    characteristic_uuid=rx_uuid,
-                    note=f"rx:{rx_count}",
-                ),
-            )
+            for payload in reasm.feed(data):
+                rx_count += 1
+                log.put(
+                    _json_event(
+                        direction="RX",
+                        payload=payload,
+                        run_tag=run_tag,
+                        characteristic_uuid=session.rx_uuid,
+                        note=f"rx:{rx_count}",
+                    ),
+                )
             if rx_count >= frames_target:
                 done.set()
 
-        await client.start_notify(rx_uuid, _on_notify)
-        _append_jsonl(
-            out_path,
-            {"event": "rx_subscribe", "run": run_tag, "ts": _now_iso(), "characteristic_uuid": rx_uuid},
-        )
-
-        # Auth always sent (blank password still required for many sessions).
-        auth_chunks = _build_password_auth_chunks(password, max_chunk_bytes=20)
-        for i, chunk in enumerate(auth_chunks, start=1):
-            await client.write_gatt_char(tx_uuid, chunk, response=False)
-            tx_count += 1
-            _append_jsonl(
-                out_path,
-                _json_event(
-                    direction="TX",
-                    payload=chunk,
-                    run_tag=run_tag,
-                    characteristic_uuid=tx_uuid,
-                    note=f"auth:{i}/{len(auth_chunks)}",
-                ),
-            )
-            await asyncio.sleep(0.06)
-
-        # Startup kick (same as Flutter app quick-start behavior).
-        for frame in ("020101", "020404", "020505"):
-            payload = bytes.fromhex(frame)
-            await client.write_gatt_char(tx_uuid, payload, response=False)
+        def _on_tx(payload: bytes, note: str) -> None:
+            # Auth (always sent; blank password still required for many sessions) and startup kick.
+            nonlocal tx_count
             tx_count += 1
-            _append_jsonl(
-                out_path,
+            log.put(
                 _json_event(
                     direction="TX",
                     payload=payload,
                     run_tag=run_tag,
-                    characteristic_uuid=tx_uuid,
-                    note=f"startup:{frame}",
+                    characteristic_uuid=session.tx_uuid,
+                    note=note,
                 ),
             )
-            await asyncio.sleep(0.12)
 
-        keepalive = asyncio.create_task(
-            _keepalive_task(client, tx_uuid, run_tag, out_path, keepalive_interval_s)
+        session = ChargerSession(
+            find=_find,
+            on_notify=_on_notify,
+            cache=link_cache,
+            cache_path=link_cache_path,
+            address=address,
+            preferred_rx=preferred_rx_uuid,
+            preferred_tx=preferred_tx_uuid,
+            password=password,
+            kick=STARTUP_KICK,
+            on_tx=_on_tx,
+            backoff_max_s=RECONNECT_BACKOFF_MAX_S,
+            max_attempts=RECONNECT_ATTEMPTS,
+            name=run_tag,
         )
-        poller = asyncio.create_task(_poll_task(client, tx_uuid, run_tag, out_path, poll_interval_s))
-
+        first_link = asyncio.Event()
+
+        async def _on_link(client: BleakClient) -> bool:
+            # Called again after every reconnect; the capture deadline runs from the first link.
+            nonlocal deadline
+            if deadline is None:
+                deadline = loop.time() + timeout_s
+                first_link.set()
+            print(f"[{run_tag}] RX={_uuid16(session.rx_uuid)} TX={_uuid16(session.tx_uuid)}")
+            log.put(
+                {
+                    "event": "rx_subscribe",
+                    "run": run_tag,
+                    "ts": _now_iso(),
+                    "characteristic_uuid": session.rx_uuid,
+                    "connect": session.connects,
+                    "cached_link": session.cached_connect,
+                },
+            )
+            scheduler = _make_scheduler(client, session.tx_uuid, run_tag, log).start()
+            scheduler.keepalive(keepalive_interval_s)
+            scheduler.poll(poll_interval_s)
+            try:
+                await asyncio.wait_for(done.wait(), timeout=max(0.0, deadline - loop.time()))
+                return True
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                reasm.reset()
+                await scheduler.close()
+                if scheduler.errors:
+                    print(f"[{run_tag}] {scheduler.errors} background write(s) failed (last: {scheduler.last_error})")
+
+        run_task = asyncio.create_task(session.run(_on_link))
+        linked_task = asyncio.create_task(first_link.wait())
         try:
-            await asyncio.wait_for(done.wait(), timeout=timeout_s)
-            print(f"[{run_tag}] captured {rx_count}/{frames_target} RX frames")
+            await asyncio.wait({run_task, linked_task}, return_when=asyncio.FIRST_COMPLETED)
+            # From the first link on, --timeout bounds the whole run, reconnect attempts included.
+            remaining = timeout_s if deadline is None else max(0.0, deadline - loop.time())
+            captured = await asyncio.wait_for(run_task, timeout=remaining + LINK_CLOSE_GRACE_S)
         except asyncio.TimeoutError:
-            print(f"[{run_tag}] timeout; captured {rx_count}/{frames_target} RX frames")
+            captured = False
         finally:
-            keepalive.cancel()
-            poller.cancel()
-            await asyncio.gather(keepalive, poller, return_exceptions=True)
-            try:
-                await client.stop_notify(rx_uuid)
-            except Exception:
-                pass
-
-    print(f"[{run_tag}] disconnected")
-    finished_at = dt.datetime.now()
-    _append_jsonl(
-        out_path,
-        {"event": "run_end", "run": run_tag, "ts": _now_iso(), "rx_count": rx_count, "tx_count": tx_count},
-    )
-    return RunResult(path=str(out_path), rx_count=rx_count, tx_count=tx_count, finished_at=finished_at)
+            linked_task.cancel()
+        if captured:
+            print(f"[{run_tag}] captured {rx_count}/{frames_target} RX frames")
+        else:
+            print(f"[{run_tag}] timeout; captured {rx_count}/{frames_target} RX frames")
+
+        print(f"[{run_tag}] disconnected")
+        finished_at = dt.datetime.now()
+        log.put(
+            {
+                "event": "run_end",
+                "run": run_tag,
+                "ts": _now_iso(),
+                "rx_count": rx_count,
+                "tx_count": tx_count,
+                "rx_framing": reasm.stats(),
+                "link": session.stats(),
+            },
+        )
+    finally:
+        await log.close()
+    if log.dropped or log.late:
+        print(f"[{run_tag}] log: {log.dropped} event(s) dropped, {log.late} late (max lag {log.max_lag_s * 1000.0:.0f} ms)")
+    result = RunResult(path=str(out_path), rx_count=rx_count, tx_count=tx_count, finished_at=finished_at)
+    return result, session.cache
 
 
 def _default_logs_dir() -> pathlib.Path:
@@ -482,10 +557,25 @@ def _parse_args(argv: Sequence[str]) -> argparse.Namespace:
     ap.add_argument("--poll-seconds", type=float, default=2.0, help="poll loop interval (default: 2.0)")
     ap.add_argument("--logs-dir", default=str(_default_logs_dir()), help="output directory for capture txt logs")
     ap.add_argument("--no-diff", action="store_true", help="skip automatic rx_diff at the end")
+    ap.add_argument(
+        "--columnar",
+        action="store_true",
+        help="also write each run as a columnar .npz capture (needs numpy) and diff those",
+    )
+    ap.add_argument(
+        "--link-cache",
+        default=str(DEFAULT_CACHE_PATH),
+        help="remember the charger address + RX/TX UUIDs here so runs connect without a scan",
+    )
+    ap.add_argument("--no-link-cache", action="store_true", help="scan before every run; ignore the link cache")
+    charger_sim.add_sim_args(ap)
     return ap.parse_args(argv)
 
 
 async def _run(args: argparse.Namespace) -> int:
+    sim = charger_sim.install_from_args(args, sys.modules[__name__], charger_session)
+    # Run 2 reuses run 1's link either way; the on-disk cache also carries it to the next invocation.
+    link_cache_path = None if (sim or args.no_link_cache) else pathlib.Path(args.link_cache).expanduser()
     if _BLEAK_IMPORT_ERROR is not None:
         raise RuntimeError(
             "Missing dependency 'bleak'. Install with: "
@@ -494,14 +584,17 @@ async def _run(args: argparse.Namespace) -> int:
 
     if args.frames <= 0:
         raise RuntimeError("--frames must be > 0")
+    if args.columnar and capture_columnar._NUMPY_IMPORT_ERROR is not None:
+        capture_columnar._require_numpy()
 
     logs_dir = pathlib.Path(args.logs_dir).expanduser().resolve()
     logs_dir.mkdir(parents=True, exist_ok=True)
     temp_stamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
     run1_path = logs_dir / f".capture_{temp_stamp}_run1.tmp"
     run2_path = logs_dir / f".capture_{temp_stamp}_run2.tmp"
+    link_cache: Optional[LinkCache] = None
 
-    run1 = await _capture_run(
+    run1, link_cache = await _capture_run(
         run_tag="run1",
         out_path=run1_path,
         frames_target=args.frames,
@@ -517,6 +610,8 @@ async def _run(args: argparse.Namespace) -> int:
         password=args.password,
         keepalive_interval_s=args.keepalive_seconds,
         poll_interval_s=args.poll_seconds,
+        link_cache=link_cache,
+        link_cache_path=link_cache_path,
     )
 
     change_note = _sanitize_note(args.change_note)
@@ -546,7 +641,7 @@ async def _run(args: argparse.Namespace) -> int:
     input("Run 1 complete. Change one setting in OEM app, then press Enter for run 2...")
     print()
 
-    run2 = await _capture_run(
+    run2, link_cache = await _capture_run(
         run_tag="run2",
         out_path=run2_path,
         frames_target=args.frames,
@@ -562,6 +657,8 @@ async def _run(args: argparse.Namespace) -> int:
         password=args.password,
         keepalive_interval_s=args.keepalive_seconds,
         poll_interval_s=args.poll_seconds,
+        link_cache=link_cache,
+        link_cache_path=link_cache_path,
     )
     if change_note:
         _append_jsonl(
@@ -587,6 +684,15 @@ async def _run(args: argparse.Namespace) -> int:
     print(f"  run1: {run1.path}  (RX={run1.rx_count}, TX={run1.tx_count})")
     print(f"  run2: {run2.path}  (RX={run2.rx_count}, TX={run2.tx_count})")
 
+    diff_inputs = [run1_final, run2_final]
+    if args.columnar:
+        diff_inputs = []
+        for final in (run1_final, run2_final):
+            npz_path = final.with_suffix(".npz")
+            rows = capture_columnar.convert_jsonl(str(final), str(npz_path))
+            print(f"  columnar: {npz_path}  (rows={rows})")
+            diff_inputs.append(npz_path)
+
     if args.no_diff:
         return 0
 
@@ -601,9 +707,9 @@ async def _run(args: argparse.Namespace) -> int:
         sys.executable,
         str(diff_script),
         "--run1",
-        str(run1_final),
+        str(diff_inputs[0]),
         "--run2",
-        str(run2_final),
+        str(diff_inputs[1]),
     )
     await proc.wait()
     return int(proc.returncode or 0)